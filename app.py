@@ -1,7 +1,8 @@
 import streamlit as st
-import bcrypt
 
-from setup.db import initialize_database, authenticate_user, create_user, set_default_categories
+from setup.db import authenticate_user, create_user, delete_user, set_default_categories
+from setup.resources import database, preload_modules, recurring_scheduler
+from setup.scheduler import request_purge
 
 def login_form():
     st.subheader("Login to your Account")
@@ -38,6 +39,24 @@ def registration_form():
             except Exception as e:
                 st.error(f"Could not create account: {e}")
 
+def delete_account_form():
+    with st.sidebar.expander("Delete Account"):
+        st.warning("This permanently deletes your account and all of its data.")
+        with st.form("delete_account_form", clear_on_submit=True):
+            password = st.text_input("Confirm password", type="password")
+            submitted = st.form_submit_button("Delete My Account")
+
+            if submitted:
+                if not authenticate_user(st.session_state.username, password):
+                    st.error("Incorrect password.")
+                    return
+                delete_user(st.session_state.user_id)
+                request_purge()
+                st.session_state.logged_in = False
+                del st.session_state.user_id
+                del st.session_state.username
+                st.success("Your account has been deleted.")
+
 def main():
     st.set_page_config(
         page_title="Budget Tracker",
@@ -46,7 +65,8 @@ def main():
         initial_sidebar_state="expanded"
     )
 
-    initialize_database()
+    database()
+    recurring_scheduler()
 
     st.sidebar.title("Navigation")
     if 'logged_in' not in st.session_state:
@@ -58,6 +78,8 @@ def main():
             st.session_state.logged_in = False
             del st.session_state.user_id
             del st.session_state.username
+        else:
+            delete_account_form()
             
     st.title("Welcome to your Budget Tracker")
     st.markdown("Use the navigation panel on the left to get started.")
@@ -72,5 +94,9 @@ def main():
     else:
         st.success("You are logged in. Use the sidebar to navigate to other pages.")
 
+    # Everything above is already on its way to the browser; warm the chart
+    # pages' imports while the user reads it.
+    preload_modules()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""Compare per-call connections with the shared pool under concurrent sessions.
+
+Each simulated Streamlit session repeatedly renders the Dashboard data path
+(summary, budgets and spend per category) from its own thread.
+
+    python -m benchmarks.bench_connection_pool --sessions 16 --renders 200
+"""
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import datagen
+from setup import cache, db
+
+
+def render_dashboard(user_id):
+    today = datetime.date.today()
+    db.fetch_summary_data(user_id, str(today.replace(day=1)), str(today + datetime.timedelta(days=1)))
+    db.get_budgets_for_month(user_id, today.month, today.year)
+    db.get_total_spent_per_category(user_id, today.month, today.year)
+    db.get_user_categories(user_id)
+
+
+def run_sessions(sessions, renders, user_ids):
+    def session(n):
+        timings = []
+        for r in range(renders):
+            started = time.perf_counter()
+            render_dashboard(user_ids[(n + r) % len(user_ids)])
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        timings = [t for result in executor.map(session, range(sessions)) for t in result]
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'renders_per_sec': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--renders', type=int, default=100)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=2000, help='transactions per user')
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db.configure_database(os.path.join(scratch, 'bench.db'), pool_size=args.pool_size)
+        # Measure SQLite itself, not the query result cache.
+        cache.configure_cache(size=0)
+        user_ids = datagen.generate(users=args.users, transactions=args.transactions, years=1,
+                                    seed=42, username_prefix='bench')
+        for label, pool_size in (('per-call connect', 0), ('pooled', args.pool_size)):
+            db.configure_database(pool_size=pool_size)
+            result = run_sessions(args.sessions, args.renders, user_ids)
+            print(f"{label:>16}: {result['renders_per_sec']:>8} renders/s  "
+                  f"p50 {result['p50_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms")
+        db.close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Time forecast.forecast_month_end for a user with many categories and years of history.
+
+Seeds one user with datagen (--categories expense categories and
+--transactions rows spread over --years years, with a budget for every
+category this month), then reports the median and worst forecast latency with the query
+cache disabled against the --budget-ms target.
+
+    python -m benchmarks.bench_forecast --categories 200 --years 10
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks import datagen
+from setup import cache, db, forecast
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=300000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db.configure_database(os.path.join(scratch, 'forecast.db'))
+        cache.configure_cache(size=0)
+        started = time.perf_counter()
+        user_id, = datagen.generate(users=1, transactions=args.transactions, years=args.years, seed=11,
+                                    username_prefix='forecast', categories=args.categories, budgets='current')
+        print(f"seeded {args.categories} categories and {args.transactions:,} transactions "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        today = datetime.date.today()
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = forecast.forecast_month_end(user_id, today.month, today.year, today)
+            timings.append((time.perf_counter() - started) * 1000)
+        db.close_pool()
+
+    overshooting = sum(1 for *_, overshoot in result['categories'] if overshoot)
+    median, worst = statistics.median(timings), max(timings)
+    print(f"forecast: median {median:.1f} ms, max {worst:.1f} ms over {args.repeat} runs "
+          f"({len(result['categories'])} categories, {overshooting} projected to overshoot)")
+    if median > args.budget_ms:
+        print(f"median exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Measure the per-row Python object overhead removed by setup.frames.
+
+Compares building the Insights/Transactions DataFrame from
+fetch_transaction_history's list of tuples (plus pd.to_datetime) with the
+columnar transactions_frame path, reporting time and peak traced memory.
+
+    python -m benchmarks.bench_frames --rows 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks import datagen
+from setup import cache, db, frames
+
+
+def tuple_path(user_id):
+    df = pd.DataFrame(db.fetch_transaction_history(user_id), columns=['ID', 'Date', 'Category', 'Type', 'Amount', 'Note'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def columnar_path(user_id):
+    return frames.transactions_frame(user_id)
+
+
+def measure(func, user_id):
+    # Time without tracing first; tracemalloc slows allocation-heavy code down.
+    started = time.perf_counter()
+    df = func(user_id)
+    elapsed = time.perf_counter() - started
+    del df
+    tracemalloc.start()
+    df = func(user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2**20, df.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db.configure_database(os.path.join(scratch, 'frames.db'))
+        # Measure SQLite itself, not the query result cache.
+        cache.configure_cache(size=0)
+        db.initialize_database()
+        for rows in args.rows:
+            user_id, = datagen.generate(users=1, transactions=rows, years=10, seed=3, username_prefix=f"frames{rows}_",
+                                        categories=25, income_every=2, budgets=None)
+            for label, func in (('tuples + DataFrame', tuple_path), ('columnar frame', columnar_path)):
+                elapsed_ms, peak_mb, frame_mb = measure(func, user_id)
+                print(f"{rows:>9} rows  {label:>18}: {elapsed_ms:9.1f} ms  peak {peak_mb:8.1f} MiB  frame {frame_mb:7.1f} MiB")
+        db.close_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Login-storm benchmark for the bcrypt worker pool.
+
+Many simulated sessions log in at once, some with unknown usernames or
+wrong passwords. Throughput is compared for one hashing worker (the old
+inline behaviour) and for a pool of --workers, and the latency of failed
+logins for known and unknown usernames is reported so constant-time
+behaviour can be checked.
+
+    python -m benchmarks.bench_login_storm --sessions 32 --logins 4 --rounds 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from setup import auth, cache, db
+
+
+def storm(sessions, logins, users, rng):
+    attempts = []
+    for _ in range(sessions * logins):
+        kind = rng.choices(['ok', 'wrong_password', 'unknown_user'], weights=[8, 1, 1])[0]
+        name = f"storm{rng.randrange(users)}" if kind != 'unknown_user' else f"nobody{rng.randrange(10**6)}"
+        attempts.append((kind, name, 'password' if kind == 'ok' else 'wrong'))
+
+    def attempt(args):
+        kind, name, password = args
+        started = time.perf_counter()
+        user = db.authenticate_user(name, password)
+        assert (user is not None) == (kind == 'ok'), kind
+        return kind, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(attempt, attempts))
+    elapsed = time.perf_counter() - started
+    by_kind = {}
+    for kind, seconds in results:
+        by_kind.setdefault(kind, []).append(seconds * 1000)
+    return len(results) / elapsed, {kind: statistics.median(values) for kind, values in by_kind.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=4, help='logins per session')
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=10, help='bcrypt cost factor')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    cache.configure_cache(size=0)
+    auth.configure_auth(rounds=args.rounds)
+    with tempfile.TemporaryDirectory() as scratch:
+        db.configure_database(os.path.join(scratch, 'logins.db'))
+        db.initialize_database()
+        for n in range(args.users):
+            db.create_user(f"storm{n}", 'password')
+        for label, workers in (('1 worker', 1), (f"{args.workers} workers", args.workers)):
+            auth.configure_auth(workers=workers)
+            throughput, medians = storm(args.sessions, args.logins, args.users, random.Random(1))
+            latency = '  '.join(f"{kind} p50 {ms:.1f} ms" for kind, ms in sorted(medians.items()))
+            print(f"{label:>12}: {throughput:7.1f} logins/s  {latency}")
+        db.close_pool()
+
+
+if __name__ == '__main__':
+    main()
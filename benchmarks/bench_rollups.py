@@ -0,0 +1,83 @@
+"""Compare raw SUM queries with the monthly_category_totals rollup.
+
+Seeds a single user with datagen (20 categories, --transactions rows
+spread over --years years) and times the Dashboard/Budgets aggregates both ways.
+
+    python -m benchmarks.bench_rollups --transactions 1000000
+"""
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import datagen
+from setup import cache, db
+
+RAW_SUMMARY = """
+    SELECT c.category_type, SUM(t.amount_minor) / 100.0
+    FROM transactions t
+    JOIN categories c ON t.category_id = c.id
+    WHERE t.user_id = ? AND t.day >= ? AND t.day < ?
+    GROUP BY c.category_type
+"""
+
+RAW_SPENT = """
+    SELECT c.id, c.category_name, SUM(t.amount_minor) / 100.0
+    FROM transactions t
+    JOIN categories c ON t.category_id = c.id
+    WHERE t.user_id = ? AND c.category_type = 'expense'
+    AND t.day >= ? AND t.day < ?
+    GROUP BY c.id
+"""
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def raw_query(sql, params):
+    with db.get_db_connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db.configure_database(os.path.join(scratch, 'rollups.db'))
+        # Measure SQLite itself, not the query result cache.
+        cache.configure_cache(size=0)
+        started = time.perf_counter()
+        user_id, = datagen.generate(users=1, transactions=args.transactions, years=args.years, seed=7,
+                                    username_prefix='bench', categories=20, income_every=5, budgets=None)
+        print(f"seeded {args.transactions} transactions in {time.perf_counter() - started:.1f}s")
+
+        today = datetime.date.today()
+        year_start = str(today.replace(year=today.year - 1, day=1))
+        tomorrow = str(today + datetime.timedelta(days=1))
+        month_range = db.month_date_range(today.month, today.year)
+        cases = [
+            ('12-month summary', lambda: raw_query(RAW_SUMMARY, (user_id, db.to_day(year_start), db.to_day(tomorrow))),
+             lambda: db.fetch_summary_data(user_id, year_start, tomorrow)),
+            ('spent per category', lambda: raw_query(RAW_SPENT, (user_id, *map(db.to_day, month_range))),
+             lambda: db.get_total_spent_per_category(user_id, today.month, today.year)),
+        ]
+        for label, raw, rollup in cases:
+            raw_ms, rollup_ms = timed(raw, args.repeat), timed(rollup, args.repeat)
+            print(f"{label:>20}: raw {raw_ms:9.2f} ms  rollup {rollup_ms:9.2f} ms  ({raw_ms / rollup_ms:.1f}x)")
+        db.close_pool()
+
+
+if __name__ == '__main__':
+    main()
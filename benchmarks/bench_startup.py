@@ -0,0 +1,112 @@
+"""Cold-start benchmark for app.py and every page.
+
+For each script, its top-level imports are replayed in a fresh interpreter
+under `python -X importtime` and the cumulative import time is reported
+along with the slowest packages. Then the first render of each script is
+timed in a fresh process with Streamlit's AppTest, logged in as a
+synthetic user, so imports done inside the page (plotly_express()) and the
+first queries are included.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --output startup.json
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import datagen
+from setup import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ['app.py'] + [os.path.join('pages', name) for name in sorted(os.listdir(os.path.join(ROOT, 'pages')))
+                        if name.endswith('.py')]
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)')
+
+RENDER_SNIPPET = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+if sys.argv[2] != 'logged_out':
+    at.session_state.logged_in = True
+    at.session_state.user_id = int(sys.argv[2])
+    at.session_state.username = 'startup0'
+started = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - started
+assert not at.exception, [e.value for e in at.exception]
+print(elapsed * 1000)
+"""
+
+
+def top_level_imports(path):
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_time(source, env):
+    """Return (total_ms, {top-level package: self_ms}) for one cold run of source."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', source], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    total = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        if len(indent) == 1:
+            total += int(cumulative_us)
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return total / 1000, {name: us / 1000 for name, us in packages.items()}
+
+
+def first_render(script, user, env):
+    result = subprocess.run([sys.executable, '-c', RENDER_SNIPPET, os.path.join(ROOT, script), user],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='fresh processes per measurement')
+    parser.add_argument('--transactions', type=int, default=20000, help='transactions for the synthetic user')
+    parser.add_argument('--top', type=int, default=5, help='slowest packages to list per script')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, BUDGET_TRACKER_DB=os.path.join(scratch, 'startup.db'), PYTHONPATH=ROOT)
+        db.configure_database(env['BUDGET_TRACKER_DB'])
+        user_id, = datagen.generate(users=1, transactions=args.transactions, username_prefix='startup')
+        db.close_pool()
+        for script in SCRIPTS:
+            imports = [import_time(top_level_imports(os.path.join(ROOT, script)), env) for _ in range(args.runs)]
+            renders = [first_render(script, 'logged_out' if script == 'app.py' else str(user_id), env)
+                       for _ in range(args.runs)]
+            slowest = sorted(imports[-1][1].items(), key=lambda item: -item[1])[:args.top]
+            results[script] = {
+                'import_ms': round(statistics.median(total for total, _ in imports), 1),
+                'first_render_ms': round(statistics.median(renders), 1),
+                'slowest_packages_ms': {name: round(ms, 1) for name, ms in slowest},
+            }
+            top = ', '.join(f"{name} {ms:.0f}" for name, ms in slowest)
+            print(f"{script:32} imports {results[script]['import_ms']:7.1f} ms  "
+                  f"first render {results[script]['first_render_ms']:7.1f} ms  ({top})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Compare the legacy REAL/TEXT transactions layout with integer storage.
+
+Builds the same --rows transactions twice in separate database files: once
+with REAL amounts and ISO TEXT dates (schema version 6) and once with
+integer minor units and day numbers (version 7), each with the same date
+indexes. Rows are generated in SQL, so 10M rows take a minute or two. It
+reports the size of each table and index (from dbstat), median timings of
+range scans and aggregates, and the full-table total from each layout.
+
+    python -m benchmarks.bench_storage --rows 10000000
+    python -m benchmarks.bench_storage --rows 1000000 --output storage.json
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from setup.backends import SQLiteBackend
+
+LAYOUTS = {
+    'legacy': {
+        'table': """
+            CREATE TABLE transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, category_id INTEGER,
+                amount REAL NOT NULL, transaction_date TEXT NOT NULL, note TEXT)
+        """,
+        'amount': "amount_minor / 100.0",
+        'date': "date(day * 86400, 'unixepoch')",
+        'columns': "amount, transaction_date",
+        'date_column': 'transaction_date',
+        'amount_column': 'amount',
+        'sum': "SUM(amount)",
+        'month': "substr(transaction_date, 1, 7)",
+    },
+    'compact': {
+        'table': """
+            CREATE TABLE transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, category_id INTEGER,
+                amount_minor INTEGER NOT NULL, day INTEGER NOT NULL, note TEXT)
+        """,
+        'amount': "amount_minor",
+        'date': "day",
+        'columns': "amount_minor, day",
+        'date_column': 'day',
+        'amount_column': 'amount_minor',
+        'sum': "SUM(amount_minor) / 100.0",
+        'month': "strftime('%Y-%m', day * 86400, 'unixepoch')",
+    },
+}
+
+# Same pseudo-random rows for both layouts: 10 years of days ending
+# 2026-01-01, amounts between 0.01 and 500.00, 20 categories per user.
+SOURCE = """
+    WITH RECURSIVE n (i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+    SELECT 1 + i % ? AS user_id, 1 + (i * 7919) % 20 AS category_id,
+           1 + (i * 104729) % 50000 AS amount_minor,
+           20454 - 3652 + (i * 2654435761) % 3652 AS day
+    FROM n
+"""
+LAST_DAY = 20454
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def build(path, layout, rows, users):
+    spec = LAYOUTS[layout]
+    conn = SQLiteBackend(path).connect()
+    conn.execute(spec['table'])
+    started = time.perf_counter()
+    conn.execute(f"""
+        INSERT INTO transactions (user_id, category_id, {spec['columns']}, note)
+        SELECT user_id, category_id, {spec['amount']}, {spec['date']}, NULL FROM ({SOURCE})
+    """, (rows, users))
+    date = spec['date_column']
+    conn.execute(f"CREATE INDEX idx_transactions_user_date ON transactions (user_id, {date})")
+    conn.execute(f"CREATE INDEX idx_transactions_user_category_date ON transactions (user_id, category_id, {date})")
+    conn.execute("CREATE INDEX idx_transactions_category ON transactions (category_id)")
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return conn, time.perf_counter() - started
+
+
+def object_sizes(conn):
+    return {name: size for name, size in conn.execute(
+        "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name HAVING name NOT LIKE 'sqlite_%' ORDER BY name")}
+
+
+def day_param(layout, day):
+    if layout == 'compact':
+        return day
+    return (EPOCH + datetime.timedelta(days=day)).isoformat()
+
+
+def cases(layout, users):
+    spec = LAYOUTS[layout]
+    date = spec['date_column']
+    year_ago = day_param(layout, LAST_DAY - 365)
+    end = day_param(layout, LAST_DAY)
+    return {
+        'user 12-month sum': (f"SELECT {spec['sum']} FROM transactions WHERE user_id = ? AND {date} >= ? AND {date} < ?",
+                              (users // 2, year_ago, end)),
+        'user 12-month rows': (f"SELECT id, {date}, {spec['amount_column']} FROM transactions "
+                               f"WHERE user_id = ? AND {date} >= ? AND {date} < ? ORDER BY {date} DESC, id DESC",
+                               (users // 2, year_ago, end)),
+        'all users, last 30 days (scan)': (f"SELECT COUNT(*), {spec['sum']} FROM transactions WHERE {date} >= ?",
+                                           (day_param(layout, LAST_DAY - 30),)),
+        'monthly totals, one user': (f"SELECT {spec['month']}, {spec['sum']} FROM transactions "
+                                     f"WHERE user_id = ? GROUP BY 1", (users // 2,)),
+        'full-table sum': (f"SELECT {spec['sum']} FROM transactions", ()),
+    }
+
+
+def timed(conn, sql, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for layout in LAYOUTS:
+            conn, seconds = build(os.path.join(scratch, f'{layout}.db'), layout, args.rows, args.users)
+            sizes = object_sizes(conn)
+            timings = {label: timed(conn, sql, params, args.repeat)
+                       for label, (sql, params) in cases(layout, args.users).items()}
+            total = conn.execute(f"SELECT {LAYOUTS[layout]['sum']} FROM transactions").fetchone()[0]
+            results[layout] = {'build_s': round(seconds, 1), 'sizes': sizes, 'timings_ms': timings, 'total': total}
+            conn.close()
+            print(f"{layout}: built {args.rows:,} rows in {seconds:.1f}s, "
+                  f"{sum(sizes.values()) / 2 ** 20:,.1f} MiB")
+
+    legacy, compact = results['legacy'], results['compact']
+    print(f"\n{'object':40} {'legacy MiB':>12} {'compact MiB':>12} {'ratio':>7}")
+    for name in sorted(set(legacy['sizes']) | set(compact['sizes'])):
+        old, new = legacy['sizes'].get(name, 0), compact['sizes'].get(name, 0)
+        print(f"{name:40} {old / 2 ** 20:12.1f} {new / 2 ** 20:12.1f} {new / old if old else 0:7.2f}")
+    print(f"\n{'query':40} {'legacy ms':>12} {'compact ms':>12} {'speedup':>7}")
+    for label in legacy['timings_ms']:
+        old, new = legacy['timings_ms'][label], compact['timings_ms'][label]
+        print(f"{label:40} {old:12.2f} {new:12.2f} {old / new:6.1f}x")
+    print(f"\nfull-table total: legacy {legacy['total']!r}, compact {compact['total']!r}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Stress concurrent writes and compare per-call commits with the single-writer queue.
+
+--processes app processes, each with --threads sessions, insert
+--writes transactions apiece into one shared database file, all starting
+together. Three write paths are measured:
+
+  direct   every session commits on its own pooled connection and waits in
+           SQLite's busy handler for up to --lock-timeout seconds (how the
+           data layer wrote before the writer queue)
+  queue-1  db.add_transaction through the writer thread, one write per commit
+  queue    db.add_transaction with group commit (WRITE_BATCH_SIZE writes per commit)
+
+For each it reports writes/sec, the share of writes that failed (almost
+always "database is locked"), p50/p95/max latency per write and, for the
+queue, writes per commit and lock retries across processes. It also
+checks that every write reported as committed is in the table and exits
+non-zero if any is missing.
+
+    python -m benchmarks.bench_write_queue --processes 4 --threads 8 --writes 200
+    python -m benchmarks.bench_write_queue --lock-timeout 0.05 --output writes.json
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from setup import cache, db, writer
+
+MODES = {'direct': None, 'queue-1': 1, 'queue': writer.WRITE_BATCH_SIZE}
+
+
+def seed(path, sessions):
+    db.configure_database(path)
+    db.initialize_database()
+    ids = []
+    for n in range(sessions):
+        user_id = db.create_user(f"writer{n}", 'x')
+        db.add_category(user_id, 'Groceries', 'expense')
+        ids.append((user_id, db.get_user_categories(user_id)[0][0]))
+    db.close_pool()
+    return ids
+
+
+def direct_write(user_id, category_id, note, lock_timeout):
+    with db.get_db_connection() as conn:
+        conn.execute(f"PRAGMA busy_timeout = {int(lock_timeout * 1000)}")
+        conn.execute(db.TRANSACTION_INSERT, (user_id, category_id, 1.0, str(datetime.date.today()), note))
+        conn.commit()
+
+
+def worker(path, mode, sessions, writes, lock_timeout, start_at):
+    """Run one process's sessions; returns (latencies, errors, elapsed, writer stats)."""
+    db.configure_database(path, pool_size=len(sessions))
+    cache.configure_cache(size=0)
+    if MODES[mode] is not None:
+        writer.configure_writer(batch_size=MODES[mode], lock_timeout=lock_timeout)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def session(user_id, category_id):
+        local_latencies, local_errors = [], []
+        for n in range(writes):
+            started = time.perf_counter()
+            try:
+                if mode == 'direct':
+                    direct_write(user_id, category_id, f"stress {n}", lock_timeout)
+                else:
+                    db.add_transaction(user_id, category_id, 1.0, str(datetime.date.today()), f"stress {n}")
+            except Exception as exc:
+                local_errors.append(str(exc))
+            local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            errors.extend(local_errors)
+
+    threads = [threading.Thread(target=session, args=ids) for ids in sessions]
+    time.sleep(max(start_at - time.time(), 0))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = db.writer_stats()
+    db.close_pool()
+    return latencies, errors, elapsed, stats
+
+
+def run_mode(path, mode, sessions, processes, writes, lock_timeout):
+    per_process = [sessions[n::processes] for n in range(processes)]
+    start_at = time.time() + 1.0
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes) as pool:
+        results = pool.starmap(worker, [(path, mode, chunk, writes, lock_timeout, start_at) for chunk in per_process])
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = [error for result in results for error in result[1]]
+    elapsed = max(result[2] for result in results)
+    writer_stats = [result[3] for result in results if result[3]]
+    commits = sum(stats['commits'] for stats in writer_stats)
+    succeeded = len(latencies) - len(errors)
+    return {
+        'writes': len(latencies),
+        'errors': len(errors),
+        'error_rate': len(errors) / len(latencies) if latencies else 0.0,
+        'locked_errors': sum('locked' in error for error in errors),
+        'writes_per_sec': succeeded / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'writes_per_commit': succeeded / commits if commits else None,
+        'busy_retries': sum(stats['busy_retries'] for stats in writer_stats) if writer_stats else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='sessions per process')
+    parser.add_argument('--writes', type=int, default=200, help='writes per session')
+    parser.add_argument('--lock-timeout', type=float, default=writer.WRITE_LOCK_TIMEOUT,
+                        help='seconds a write may wait for the database lock')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for mode in args.modes:
+            path = os.path.join(scratch, f'{mode}.db')
+            sessions = seed(path, args.processes * args.threads)
+            results[mode] = run_mode(path, mode, sessions, args.processes, args.writes, args.lock_timeout)
+            # Every write reported as successful must be in the table.
+            db.configure_database(path)
+            with db.get_db_connection() as conn:
+                results[mode]['rows'] = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+            db.close_pool()
+
+    print(f"{args.processes} processes x {args.threads} sessions x {args.writes} writes, "
+          f"lock timeout {args.lock_timeout}s")
+    print(f"{'mode':8} {'writes/s':>10} {'errors':>8} {'err rate':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'max ms':>8} {'per commit':>10} {'retries':>8}")
+    lost = 0
+    for mode, r in results.items():
+        lost += r['writes'] - r['errors'] - r['rows']
+        per_commit = f"{r['writes_per_commit']:.1f}" if r['writes_per_commit'] else '-'
+        retries = r['busy_retries'] if r['busy_retries'] is not None else '-'
+        print(f"{mode:8} {r['writes_per_sec']:10,.0f} {r['errors']:8,} {r['error_rate']:9.2%} {r['p50_ms']:8.2f} "
+              f"{r['p95_ms']:8.2f} {r['max_ms']:8.1f} {per_commit:>10} {retries:>8}")
+    if lost:
+        print(f"{lost} writes reported as committed are missing from the database")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 1 if lost else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
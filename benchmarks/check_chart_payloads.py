@@ -0,0 +1,77 @@
+"""Fail if any Insights figure serializes to more than charts.CHART_PAYLOAD_LIMIT bytes.
+
+Seeds one user with --years years of synthetic history, builds every
+Insights figure for every granularity and viewport width in WIDTHS the way
+the page does, and measures the JSON Plotly sends to the browser. The raw,
+unreduced daily figures are reported for comparison.
+
+    python -m benchmarks.check_chart_payloads
+    python -m benchmarks.check_chart_payloads --years 20 --transactions 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks import datagen
+from setup import cache, charts, db, insights
+
+WIDTHS = [None, 400, 2560]
+
+
+def payload_bytes(fig):
+    return len(fig.to_json().encode('utf-8'))
+
+
+def payload_limit(width):
+    """CHART_PAYLOAD_LIMIT, scaled up for viewports wider than CHART_WIDTH_PX."""
+    return charts.CHART_PAYLOAD_LIMIT * max(1, (width or charts.CHART_WIDTH_PX) / charts.CHART_WIDTH_PX)
+
+
+def figure_payloads(user_id, widths=WIDTHS):
+    """Yield (granularity, figure name, width, bytes, points) for every Insights figure the page can build."""
+    for granularity, freq in insights.GRANULARITIES.items():
+        balance = insights.net_balance_frame(user_id, freq)
+        spend = insights.category_spend_frame(user_id, freq)
+        for width in widths:
+            for name, fig in (('balance', charts.balance_figure(balance, granularity, width)),
+                              ('category spend', charts.category_spend_figure(spend, granularity, width))):
+                yield granularity, name, width, payload_bytes(fig), sum(len(trace.x) for trace in fig.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--transactions', type=int, default=200000)
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        db.configure_database(os.path.join(scratch, 'charts.db'))
+        cache.configure_cache(size=0)
+        user_id, = datagen.generate(users=1, transactions=args.transactions, years=args.years,
+                                    username_prefix='charts')
+        from setup.resources import plotly_express
+        px = plotly_express()
+
+        raw_balance = insights.net_balance_frame(user_id, 'D')
+        raw_spend = insights.category_spend_frame(user_id, 'D')
+        unreduced = {
+            'balance': payload_bytes(px.line(raw_balance, x='Period', y='Balance', markers=True)),
+            'category spend': payload_bytes(px.bar(raw_spend, x='Period', y='Amount', color='Category')),
+        }
+        for name, size in unreduced.items():
+            print(f"  --  unreduced daily {name}: {size:,} bytes")
+
+        for granularity, name, width, size, points in figure_payloads(user_id):
+            limit = payload_limit(width)
+            status = 'FAIL' if size > limit else 'ok'
+            failures += size > limit
+            print(f"{status:>4}  {granularity} {name} at {width or charts.CHART_WIDTH_PX}px: "
+                  f"{size:,} bytes, {points:,} points (limit {limit:,.0f})")
+        db.close_pool()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Fail if any hot data-layer query plans a full table scan.
+
+Every statement issued by the functions in HOT_CALLS is captured with
+sqlite3's trace callback and re-run through EXPLAIN QUERY PLAN.
+
+    python -m benchmarks.check_query_plans
+"""
+import datetime
+import os
+import sys
+import tempfile
+
+from setup import cache, db, forecast, insights
+
+TODAY = datetime.date.today()
+MONTH_START = str(TODAY.replace(day=1))
+TOMORROW = str(TODAY + datetime.timedelta(days=1))
+
+HOT_CALLS = [
+    (db.fetch_summary_data, (1, MONTH_START, TOMORROW)),
+    (db.get_total_spent_per_category, (1, TODAY.month, TODAY.year)),
+    (db.get_budgets_for_month, (1, TODAY.month, TODAY.year)),
+    (db.get_dashboard_snapshot, (1, MONTH_START, TOMORROW, TODAY.month, TODAY.year)),
+    (db.fetch_transaction_history, (1, MONTH_START, TOMORROW)),
+    (db.fetch_transaction_page, (1, MONTH_START, TOMORROW, 50, (str(TODAY), 10))),
+    (db.count_transactions, (1, MONTH_START, TOMORROW)),
+    (db.search_transactions, (1, 'rent')),
+    (db.search_transactions, (1, None, (1, 2), 'expense', 10.0, 500.0)),
+    (db.get_user_categories, (1,)),
+    (insights.net_balance_frame, (1, 'D')),
+    (insights.net_balance_frame, (1, 'M')),
+    (insights.category_spend_frame, (1, 'W')),
+    (forecast.forecast_month_end, (1, TODAY.month, TODAY.year, TODAY)),
+]
+
+
+def capture_statements(func, args):
+    statements = []
+    with db.get_db_connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        func(*args)
+    finally:
+        with db.get_db_connection() as conn:
+            conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+
+def full_scans(conn, statement):
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+    # Scans of materialized subqueries or constant rows are fine; scanning a table or index is not.
+    # A virtual table "scan" is a lookup unless the module was given no constraint ("INDEX 0:").
+    return [row['detail'] for row in plan
+            if row['detail'].startswith('SCAN ') and not row['detail'].startswith(('SCAN (', 'SCAN CONSTANT'))
+            and not ('VIRTUAL TABLE INDEX' in row['detail'] and not row['detail'].endswith('INDEX 0:'))]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        # A single pooled connection guarantees the hot calls reuse the traced one.
+        db.configure_database(os.path.join(scratch, 'plans.db'), pool_size=1)
+        # Every call must reach SQLite for its statements to be traced.
+        cache.configure_cache(size=0)
+        db.initialize_database()
+        for func, args in HOT_CALLS:
+            name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+            statements = capture_statements(func, args)
+            with db.get_db_connection() as conn:
+                scans = [detail for statement in statements for detail in full_scans(conn, statement)]
+            status = 'FAIL' if scans else 'ok'
+            failures += bool(scans)
+            print(f"{status:>4}  {name}{args}" + (f"  ({'; '.join(scans)})" if scans else ''))
+        db.close_pool()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
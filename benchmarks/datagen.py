@@ -0,0 +1,146 @@
+"""Generate realistic synthetic users, categories, transactions and budgets.
+
+    python -m benchmarks.datagen --db scratch.db --users 1000 --transactions 100000
+
+Every generated user gets the default categories plus a few extra ones,
+salary on the first of each month, rent and bills monthly, and a long tail
+of randomly timed expenses with per-category amount ranges. Benchmarks
+that need a fixed shape instead pass categories=N: each user then gets N
+numbered categories (every income_every-th one income, the rest expense)
+and transactions spread uniformly over them and over the years of history.
+Budgets cover each expense category for every generated month, only the
+current month, or none. Everything is written with executemany in large
+transactions; all users share the password "password".
+"""
+import argparse
+import datetime
+import random
+import time
+
+import bcrypt
+
+from setup import db
+
+PASSWORD = 'password'
+
+DEFAULT_CATEGORIES = [
+    ('Groceries', 'expense'), ('Bills', 'expense'), ('Rent', 'expense'),
+    ('Salary', 'income'), ('Freelance', 'income'), ('Savings', 'savings'),
+]
+EXTRA_EXPENSES = ['Dining', 'Transport', 'Utilities', 'Entertainment', 'Health', 'Shopping', 'Travel']
+AMOUNT_RANGES = {
+    'Groceries': (5, 150), 'Bills': (20, 300), 'Rent': (800, 2500), 'Dining': (8, 120),
+    'Transport': (2, 60), 'Utilities': (30, 250), 'Entertainment': (5, 200), 'Health': (10, 400),
+    'Shopping': (10, 500), 'Travel': (50, 2000), 'Freelance': (100, 3000), 'Savings': (50, 1000),
+}
+INSERT_BATCH = 50000
+
+
+def _insert_batches(conn, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == INSERT_BATCH:
+            conn.executemany(db.TRANSACTION_INSERT, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(db.TRANSACTION_INSERT, batch)
+
+
+def _user_transactions(rng, user_id, categories, count, start, days):
+    by_name = {name: (cat_id, cat_type) for cat_id, name, cat_type in categories}
+    months = sorted({(start + datetime.timedelta(days=d)).replace(day=1) for d in range(days)})
+    generated = 0
+    for month in months:
+        for name, day in (('Salary', 1), ('Rent', 1), ('Bills', 5), ('Savings', 2)):
+            if generated >= count:
+                return
+            amount = 5000.0 if name == 'Salary' else round(rng.uniform(*AMOUNT_RANGES[name]), 2)
+            yield (user_id, by_name[name][0], amount, str(month.replace(day=day)), f"Monthly {name.lower()}")
+            generated += 1
+    variable = [(cat_id, name) for cat_id, name, cat_type in categories
+                if name not in ('Salary', 'Rent', 'Bills', 'Savings')]
+    for _ in range(count - generated):
+        cat_id, name = rng.choice(variable)
+        low, high = AMOUNT_RANGES.get(name, (5, 200))
+        yield (user_id, cat_id, round(rng.uniform(low, high), 2),
+               str(start + datetime.timedelta(days=rng.randrange(days))), rng.choice([None, '', name.lower()]))
+
+
+def _uniform_transactions(rng, user_id, categories, count, start, days):
+    category_ids = [cat_id for cat_id, _, _ in categories]
+    for _ in range(count):
+        yield (user_id, rng.choice(category_ids), round(rng.uniform(1, 500), 2),
+               str(start + datetime.timedelta(days=rng.randrange(days))), None)
+
+
+def generate(users=10, transactions=10000, years=3, seed=0, username_prefix='user',
+             categories=None, income_every=0, budgets='history'):
+    """Populate the configured database and return the generated user ids.
+
+    categories=None generates the realistic default categories and spending
+    pattern; an int generates that many numbered categories with uniform
+    transactions. budgets is 'history' (every month), 'current' or None.
+    """
+    if budgets not in ('history', 'current', None):
+        raise ValueError(f"Unknown budgets option {budgets!r}; expected 'history', 'current' or None")
+    db.initialize_database()
+    rng = random.Random(seed)
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+    today = datetime.date.today()
+    days = years * 365
+    start = today - datetime.timedelta(days=days - 1)
+    user_ids = []
+    with db.get_db_connection() as conn:
+        for n in range(users):
+            conn.execute("BEGIN IMMEDIATE")
+            user_id = conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                                   (f"{username_prefix}{n}", password_hash)).lastrowid
+            if categories is None:
+                category_rows = list(DEFAULT_CATEGORIES)
+                category_rows += [(name, 'expense')
+                                  for name in rng.sample(EXTRA_EXPENSES, rng.randint(2, len(EXTRA_EXPENSES)))]
+                transaction_rows = _user_transactions
+            else:
+                category_rows = [(f"Category {n:03d}", 'income' if income_every and n % income_every == 0 else 'expense')
+                                 for n in range(categories)]
+                transaction_rows = _uniform_transactions
+            user_categories = []
+            for name, kind in category_rows:
+                cat_id = conn.execute("INSERT INTO categories (user_id, category_name, category_type) VALUES (?, ?, ?)",
+                                      (user_id, name, kind)).lastrowid
+                user_categories.append((cat_id, name, kind))
+            _insert_batches(conn, transaction_rows(rng, user_id, user_categories, transactions, start, days))
+            month = (start if budgets == 'history' else today).replace(day=1)
+            budget_rows = []
+            while budgets and month <= today:
+                budget_rows += [(user_id, cat_id, float(rng.randrange(100, 3000, 50)), month.month, month.year)
+                                for cat_id, name, kind in user_categories if kind == 'expense']
+                month = (month + datetime.timedelta(days=32)).replace(day=1)
+            conn.executemany("INSERT INTO budgets (user_id, category_id, budget_amount, month, year) VALUES (?, ?, ?, ?, ?)",
+                             budget_rows)
+            conn.commit()
+            user_ids.append(user_id)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='scratch_budget_tracker.db', help='database file to populate')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--transactions', type=int, default=10000, help='transactions per user')
+    parser.add_argument('--years', type=int, default=3, help='years of history per user')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    db.configure_database(args.db)
+    started = time.perf_counter()
+    user_ids = generate(args.users, args.transactions, args.years, args.seed)
+    elapsed = time.perf_counter() - started
+    total = len(user_ids) * args.transactions
+    print(f"Generated {len(user_ids)} users and {total:,} transactions in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) into {args.db}")
+    db.close_pool()
+
+
+if __name__ == '__main__':
+    main()
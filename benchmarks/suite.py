@@ -0,0 +1,209 @@
+"""End-to-end benchmark of the data layer and every page.
+
+Generates a scratch database with benchmarks.datagen, times each
+setup.db function and renders pages/1_Dashboard.py through
+pages/5_Insights.py headlessly with Streamlit's AppTest. Results are p50/p95
+latency and peak traced memory per case, written as JSON so two runs can be
+compared:
+
+    python -m benchmarks.suite --users 20 --transactions 20000 --output base.json
+    python -m benchmarks.suite --users 20 --transactions 20000 --compare base.json
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from setup import cache, db
+from benchmarks import datagen
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages')
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def measure(func, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    # Peak memory is taken from one extra traced run so tracing does not skew the timings.
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return {
+        'runs': runs,
+        'p50_ms': round(_percentile(timings, 0.50), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def db_cases(user_ids, rng):
+    today = datetime.date.today()
+    month_start = str(today.replace(day=1))
+    tomorrow = str(today + datetime.timedelta(days=1))
+    year_ago = str(today - datetime.timedelta(days=365))
+    users = itertools.cycle(user_ids)
+    counter = itertools.count()
+
+    def categories(user_id):
+        return db.get_user_categories.uncached(user_id)
+
+    def expense_category(user_id):
+        return next(c[0] for c in categories(user_id) if c[2] == 'expense')
+
+    def add_then_delete_transaction():
+        user_id = next(users)
+        db.add_transaction(user_id, expense_category(user_id), 12.5, str(today), 'bench')
+        with db.get_db_connection() as conn:
+            transaction_id = conn.execute("SELECT MAX(id) FROM transactions WHERE user_id = ?", (user_id,)).fetchone()[0]
+        db.update_transaction(transaction_id, expense_category(user_id), 13.5, str(today), 'bench edit')
+        db.delete_transaction(transaction_id)
+
+    def add_update_delete_category():
+        user_id = next(users)
+        name = f"Bench {next(counter)}"
+        db.add_category(user_id, name, 'expense')
+        category_id = next(c[0] for c in categories(user_id) if c[1] == name)
+        db.update_category(category_id, name + ' renamed', 'expense')
+        db.delete_category(category_id)
+
+    def import_batch():
+        user_id = next(users)
+        rows = [(str(today - datetime.timedelta(days=rng.randrange(90))), 'Groceries', 'expense', 9.99, None) for _ in range(1000)]
+        db.import_transactions(user_id, [rows])
+
+    return {
+        'db.fetch_summary_data.month': lambda: db.fetch_summary_data(next(users), month_start, tomorrow),
+        'db.fetch_summary_data.year': lambda: db.fetch_summary_data(next(users), year_ago, tomorrow),
+        'db.get_total_spent_per_category': lambda: db.get_total_spent_per_category(next(users), today.month, today.year),
+        'db.get_budgets_for_month': lambda: db.get_budgets_for_month(next(users), today.month, today.year),
+        'db.get_user_categories': lambda: db.get_user_categories(next(users)),
+        'db.get_username_by_id': lambda: db.get_username_by_id(next(users)),
+        'db.fetch_transaction_history.month': lambda: db.fetch_transaction_history(next(users), month_start, tomorrow),
+        'db.fetch_transaction_history.all': lambda: db.fetch_transaction_history(next(users)),
+        'db.fetch_transaction_page': lambda: db.fetch_transaction_page(next(users), year_ago, tomorrow, 50),
+        'db.count_transactions': lambda: db.count_transactions(next(users), year_ago, tomorrow),
+        'db.get_transaction_by_id': lambda: db.get_transaction_by_id(rng.randint(1, 1000)),
+        'db.authenticate_user': lambda: db.authenticate_user(f"user{rng.randrange(len(user_ids))}", datagen.PASSWORD),
+        'db.set_budget': lambda: (lambda u: db.set_budget(u, expense_category(u), today.month, today.year, 250.0))(next(users)),
+        'db.transaction_write_cycle': add_then_delete_transaction,
+        'db.category_write_cycle': add_update_delete_category,
+        'db.import_transactions.1k': import_batch,
+    }
+
+
+def page_cases(user_ids):
+    from streamlit.testing.v1 import AppTest
+
+    users = itertools.cycle(user_ids)
+    cases = {}
+    for page in sorted(p for p in os.listdir(PAGES_DIR) if p.endswith('.py')):
+        def render(page=page):
+            app = AppTest.from_file(os.path.join(PAGES_DIR, page), default_timeout=600)
+            app.session_state.logged_in = True
+            app.session_state.user_id = next(users)
+            app.session_state.username = 'bench'
+            app.run()
+            if app.exception:
+                raise RuntimeError(f"{page} raised: {app.exception[0].value}")
+        cases[f"page.{page[:-3]}"] = render
+    return cases
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous or not previous['p50_ms']:
+            continue
+        ratio = current['p50_ms'] / previous['p50_ms']
+        marker = 'REGRESSION' if ratio > 1 + threshold else ''
+        print(f"{name:<40} {previous['p50_ms']:>10.3f} -> {current['p50_ms']:>10.3f} ms  ({ratio:5.2f}x) {marker}")
+        if marker:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=20000, help='transactions per user')
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--runs', type=int, default=30, help='timed runs per data-layer case')
+    parser.add_argument('--page-runs', type=int, default=5, help='timed renders per page')
+    parser.add_argument('--db', help='reuse an existing generated database instead of a scratch one')
+    parser.add_argument('--with-cache', action='store_true', help='leave the query result cache enabled')
+    parser.add_argument('--skip-pages', action='store_true')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='baseline JSON to compare p50 latencies against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 slowdown before flagging (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if not args.with_cache:
+        cache.configure_cache(size=0)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.db:
+            db.configure_database(args.db)
+            db.initialize_database()
+            with db.get_db_connection() as conn:
+                user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+        else:
+            db.configure_database(os.path.join(scratch, 'bench.db'))
+            started = time.perf_counter()
+            user_ids = datagen.generate(args.users, args.transactions, args.years)
+            print(f"generated {len(user_ids) * args.transactions:,} transactions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        results = {
+            'meta': {
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'users': len(user_ids),
+                'transactions_per_user': args.transactions,
+                'cache': args.with_cache,
+            },
+            'cases': {},
+        }
+        cases = db_cases(user_ids, rng)
+        if not args.skip_pages:
+            cases.update(page_cases(user_ids))
+        for name, func in cases.items():
+            runs = args.page_runs if name.startswith('page.') else args.runs
+            results['cases'][name] = measure(func, runs)
+            print(f"{name:<40} p50 {results['cases'][name]['p50_ms']:>10.3f} ms  "
+                  f"p95 {results['cases'][name]['p95_ms']:>10.3f} ms  peak {results['cases'][name]['peak_kib']:>10.1f} KiB",
+                  file=sys.stderr)
+        db.close_pool()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
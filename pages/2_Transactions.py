@@ -1,15 +1,23 @@
 import streamlit as st
-import pandas as pd
 import datetime
-import io
+import hashlib
+from functools import partial
 
 from setup.db import (
-    get_user_categories,
+    RECURRING_FREQUENCIES,
+    add_recurring_rule,
     add_transaction,
-    update_transaction,
+    delete_recurring_rule,
+    get_recurring_rules,
+    materialize_recurring_transactions,
+    update_transactions_bulk,
     delete_transaction,
-    fetch_transaction_history
+    count_transactions
 )
+from setup.export import DOWNLOAD_MAX_ROWS, EXPORT_FORMATS, export_file_name, export_transactions
+from setup.frames import categories_frame, transaction_page_frame, transaction_search_frame
+from setup.importer import ImportFormatError, import_transactions_file
+from setup.profiling import begin_run, end_run, data_editor
 
 # --- Callbacks for database operations ---
 def add_transaction_callback():
@@ -24,40 +32,106 @@ def add_transaction_callback():
         add_transaction(st.session_state.user_id, category_id, amount, date.strftime("%Y-%m-%d"), note)
         st.success("Transaction added successfully!")
 
-def update_transactions_callback(edited_df):
-    for _, row in edited_df.iterrows():
-        try:
-            category_id = get_category_id_from_name(st.session_state.user_id, row['Category'])
-            date_str = row['Date'].strftime("%Y-%m-%d")
-            update_transaction(row['ID'], category_id, row['Amount'], date_str, row['Note'])
-        except Exception as e:
-            st.error(f"Failed to update transaction {row['ID']}: {e}")
-    st.success("Transactions updated successfully!")
+PAGE_SIZES = [25, 50, 100, 250]
+
+def update_transactions_callback(original_df, category_ids, editor_key):
+    changes = st.session_state.get(editor_key) or {'edited_rows': {}, 'deleted_rows': []}
+    updates = []
+    for row_index, edits in changes['edited_rows'].items():
+        row = original_df.iloc[int(row_index)]
+        category_name = edits.get('Category', row['Category'])
+        date = edits.get('Date', row['Date'])
+        date_str = str(date)[:10] if isinstance(date, str) else date.strftime("%Y-%m-%d")
+        updates.append((int(row['ID']),
+                        category_ids.get(category_name),
+                        float(edits.get('Amount', row['Amount'])),
+                        date_str,
+                        edits.get('Note', row['Note'])))
+    deleted_ids = [int(original_df.iloc[int(row_index)]['ID']) for row_index in changes['deleted_rows']]
+
+    if not updates and not deleted_ids:
+        st.info("No changes to save.")
+        return
+    try:
+        update_transactions_bulk(st.session_state.user_id, updates, deleted_ids)
+    except Exception as e:
+        st.error(f"Failed to update transactions: {e}")
+    else:
+        # The edits are saved; drop them so they cannot be replayed onto other rows.
+        del st.session_state[editor_key]
+        st.success(f"Saved {len(updates)} edited and {len(deleted_ids)} deleted transactions.")
+
+def import_transactions_callback():
+    uploaded_file = st.session_state.import_file
+    if uploaded_file is None:
+        st.error("Please choose a CSV or Excel file to import.")
+        return
+    try:
+        result = import_transactions_file(st.session_state.user_id, uploaded_file, uploaded_file.name)
+    except ImportFormatError as e:
+        st.error(f"Could not import {uploaded_file.name}: {e}")
+        return
+    except TimeoutError:
+        st.error(f"Importing {uploaded_file.name} timed out. Part of the file may have been imported; "
+                 "check your history before importing it again.")
+        return
+    message = f"Imported {result['imported']:,} transactions ({result['rows_per_sec']:,.0f} rows/sec)."
+    if result['skipped']:
+        message += f" Skipped {result['skipped']:,} invalid rows."
+    if result['created_categories']:
+        message += f" Created categories: {', '.join(result['created_categories'])}."
+    st.success(message)
+
+def add_recurring_rule_callback():
+    amount = st.session_state.recurring_amount
+    end_date = st.session_state.recurring_end if st.session_state.recurring_has_end else None
+    if amount <= 0:
+        st.error("Amount must be positive.")
+        return
+    if end_date is not None and end_date < st.session_state.recurring_start:
+        st.error("End date cannot be before the start date.")
+        return
+    add_recurring_rule(st.session_state.user_id, st.session_state.recurring_cat, amount,
+                       st.session_state.recurring_start.strftime("%Y-%m-%d"), st.session_state.recurring_frequency,
+                       st.session_state.recurring_note or None, end_date.strftime("%Y-%m-%d") if end_date else None)
+    created = materialize_recurring_transactions(user_id=st.session_state.user_id)
+    st.success(f"Recurring transaction added; {created} past occurrence(s) created.")
+
+def delete_recurring_rule_callback():
+    delete_recurring_rule(st.session_state.recurring_select_del)
+    st.success("Recurring transaction stopped. Transactions it already created were kept.")
+
+def next_page_callback():
+    st.session_state.trans_page_cursors.append(st.session_state.trans_next_cursor)
+
+def previous_page_callback():
+    if len(st.session_state.trans_page_cursors) > 1:
+        st.session_state.trans_page_cursors.pop()
+
+def search_next_page_callback():
+    st.session_state.search_page_cursors.append(st.session_state.search_next_cursor)
+
+def search_previous_page_callback():
+    if len(st.session_state.search_page_cursors) > 1:
+        st.session_state.search_page_cursors.pop()
 
 def delete_transaction_callback():
     trans_id_to_del = st.session_state.trans_select_del
     delete_transaction(trans_id_to_del)
     st.success("Transaction deleted.")
 
-# --- Helper function to get category ID ---
-def get_category_id_from_name(user_id, category_name):
-    categories = get_user_categories(user_id)
-    for cat in categories:
-        if cat[1] == category_name:
-            return cat[0]
-    return None
+begin_run("Transactions", st.session_state.get('user_id'))
 
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     st.warning("Please log in to access your Transactions.")
 else:
     st.header("Transactions")
 
-    categories = get_user_categories(st.session_state.user_id)
-    if not categories:
+    categories_df = categories_frame(st.session_state.user_id)
+    if categories_df.empty:
         st.warning("Please add some categories in the 'Manage Categories' page before adding transactions.")
     else:
-        categories_df = pd.DataFrame(categories, columns=['ID', 'Category Name', 'Category Type'])
-        category_map = categories_df.set_index('ID')['Category Name'].to_dict()
+        category_map = dict(zip(categories_df['ID'].tolist(), categories_df['Category Name'].tolist()))
     
         # --- Add New Transaction Form ---
         with st.container():
@@ -70,27 +144,117 @@ else:
                 
                 submitted = st.form_submit_button('Add Transaction', on_click=add_transaction_callback)
 
+        # --- Bulk Import ---
+        with st.expander("Import Transactions from CSV or Excel"):
+            st.caption("Columns: Date, Category, Amount, and optionally Type and Note. Unknown categories are created automatically.")
+            st.file_uploader("Bank statement", type=['csv', 'xlsx'], key='import_file')
+            st.button("Import Transactions", on_click=import_transactions_callback, width='stretch')
+
+        # --- Recurring Transactions ---
+        with st.expander("Recurring Transactions"):
+            st.caption("Recurring transactions are created automatically on each due date, including any missed while the app was not running.")
+            with st.form('recurring_form', clear_on_submit=True):
+                col_cat, col_amount, col_frequency = st.columns(3)
+                col_cat.selectbox('Category', options=list(category_map.keys()), format_func=lambda x: category_map[x], key='recurring_cat')
+                col_amount.number_input('Amount', min_value=0.0, format="%.2f", key='recurring_amount')
+                col_frequency.selectbox('Repeats', RECURRING_FREQUENCIES, format_func=str.capitalize, key='recurring_frequency')
+                col_start, col_end = st.columns(2)
+                col_start.date_input('Starts on', value=datetime.date.today(), key='recurring_start')
+                col_end.date_input('Ends on', value=datetime.date.today() + datetime.timedelta(days=365), key='recurring_end')
+                st.checkbox('Stop on the end date', key='recurring_has_end')
+                st.text_input('Note (optional)', key='recurring_note')
+                st.form_submit_button('Add Recurring Transaction', on_click=add_recurring_rule_callback)
+
+            rules = get_recurring_rules(st.session_state.user_id)
+            if rules:
+                rule_labels = {rule_id: f"{name} · ₹{amount:,.2f} {frequency} from {start}" + (f" to {end}" if end else "")
+                               for rule_id, _, name, amount, frequency, start, end, _ in rules}
+                for label in rule_labels.values():
+                    st.write(f"- {label}")
+                st.selectbox("Select a recurring transaction to stop", options=list(rule_labels.keys()),
+                             format_func=lambda x: rule_labels[x], key='recurring_select_del')
+                st.button("Stop Selected Recurring Transaction", on_click=delete_recurring_rule_callback, width='stretch')
+
+        # --- Search ---
+        with st.expander("Search Transactions"):
+            search_text = st.text_input("Note contains", key='search_text', placeholder="e.g. rent, café, refund")
+            col_cats, col_type = st.columns([2, 1])
+            search_categories = col_cats.multiselect("Categories", options=list(category_map.keys()),
+                                                     format_func=lambda x: category_map[x], key='search_categories')
+            search_type = col_type.selectbox("Type", ['Any', 'expense', 'income', 'savings'], key='search_type')
+            col_min, col_max = st.columns(2)
+            min_amount = col_min.number_input("Min amount", min_value=0.0, value=None, format="%.2f", key='search_min_amount')
+            max_amount = col_max.number_input("Max amount", min_value=0.0, value=None, format="%.2f", key='search_max_amount')
+
+            search_args = (search_text.strip() or None, tuple(sorted(search_categories)),
+                           None if search_type == 'Any' else search_type, min_amount, max_amount)
+            if any(search_args):
+                # Keyset pagination, restarted whenever the search changes.
+                if st.session_state.get('search_key') != search_args:
+                    st.session_state.search_key = search_args
+                    st.session_state.search_page_cursors = [None]
+                results_df, search_next_cursor = transaction_search_frame(
+                    st.session_state.user_id, *search_args, page_size=50, after=st.session_state.search_page_cursors[-1])
+                st.session_state.search_next_cursor = search_next_cursor
+                if results_df.empty:
+                    st.info("No transactions match this search.")
+                else:
+                    st.dataframe(results_df, hide_index=True, width='stretch',
+                                 column_config={"ID": None,
+                                                "Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD"),
+                                                "Amount": st.column_config.NumberColumn("Amount (₹)", format="%.2f")})
+                    search_page = len(st.session_state.search_page_cursors)
+                    col_prev, col_page, col_next = st.columns([1, 2, 1])
+                    col_prev.button("Previous", on_click=search_previous_page_callback, disabled=search_page == 1,
+                                    key='search_previous', width='stretch')
+                    col_page.caption(f"Results page {search_page}")
+                    col_next.button("Next", on_click=search_next_page_callback, disabled=search_next_cursor is None,
+                                    key='search_next', width='stretch')
+
         # --- Transaction History with Editing ---
         with st.container():
             st.subheader("Transaction History")
-            col_date1, col_date2 = st.columns(2)
+            col_date1, col_date2, col_size = st.columns(3)
             today = datetime.date.today()
             start_date = col_date1.date_input('Start Date', value=today - datetime.timedelta(days=30), key='trans_start')
             end_date = col_date2.date_input('End Date', value=today, key='trans_end')
+            page_size = col_size.selectbox('Rows per page', PAGE_SIZES, index=1, key='trans_page_size')
             
             if start_date > end_date:
                 st.error("Start date cannot be after end date.")
             else:
-                transactions = fetch_transaction_history(st.session_state.user_id, start_date.strftime("%Y-%m-%d"), (end_date + datetime.timedelta(days=1)).strftime("%Y-%m-%d"))
+                range_start = start_date.strftime("%Y-%m-%d")
+                range_end = (end_date + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+                # Keyset pagination: keep the cursor of every page visited so far
+                # and start over whenever the range or page size changes.
+                page_key = (range_start, range_end, page_size)
+                if st.session_state.get('trans_page_key') != page_key:
+                    st.session_state.trans_page_key = page_key
+                    st.session_state.trans_page_cursors = [None]
+                page_number = len(st.session_state.trans_page_cursors)
+
+                df, next_cursor = transaction_page_frame(st.session_state.user_id, range_start, range_end,
+                                                         page_size, st.session_state.trans_page_cursors[-1])
+                st.session_state.trans_next_cursor = next_cursor
+                total_transactions = count_transactions(st.session_state.user_id, range_start, range_end)
+                total_pages = max(1, -(-total_transactions // page_size))
+
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                col_prev.button("Previous", on_click=previous_page_callback, disabled=page_number == 1, width='stretch')
+                col_page.caption(f"Page {page_number} of {total_pages} · {total_transactions:,} transactions")
+                col_next.button("Next", on_click=next_page_callback, disabled=next_cursor is None, width='stretch')
                 
-                if transactions:
-                    df = pd.DataFrame(transactions, columns=['ID', 'Date', 'Category', 'Type', 'Amount', 'Note'])
-                    # ADD THIS LINE TO FIX THE ERROR
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    editable_df = st.data_editor(df,
+                if not df.empty:
+                    # Streamlit keeps a keyed editor's edits by row position, so the
+                    # key must change whenever the rows on the page can: with the
+                    # range, page size, cursor or the transactions shown.
+                    editor_state = repr((page_key, st.session_state.trans_page_cursors[-1], df['ID'].tolist()))
+                    editor_key = f"transaction_editor_{hashlib.sha1(editor_state.encode()).hexdigest()[:16]}"
+                    editable_df = data_editor(df,
                                                  width='stretch',
                                                  hide_index=True,
-                                                 key="transaction_editor",
+                                                 key=editor_key,
                                                  column_config={
                                                      "ID": None,
                                                      "Category": st.column_config.SelectboxColumn(
@@ -123,24 +287,34 @@ else:
                                                      "Note": st.column_config.TextColumn("Note")
                                                  })
 
-                    st.button("Save Changes to Transactions", on_click=update_transactions_callback, args=(editable_df,), width='stretch')
+                    st.button("Save Changes to Transactions", on_click=update_transactions_callback, args=(df, {name: cat_id for cat_id, name in category_map.items()}, editor_key), width='stretch')
         
-                    st.download_button(
-                        label="Download Transaction History as CSV",
-                        data=io.StringIO(df.to_csv(index=False)).getvalue(),
-                        file_name=f"transactions_{start_date}_to_{end_date}.csv",
-                        mime="text/csv",
+                    col_format, col_download = st.columns([1, 2], vertical_alignment='bottom')
+                    export_format = col_format.selectbox('Export format', list(EXPORT_FORMATS), key='trans_export_format')
+                    too_large = total_transactions > DOWNLOAD_MAX_ROWS
+                    col_download.download_button(
+                        label=f"Download {total_transactions:,} Transactions ({start_date} to {end_date})",
+                        data=partial(export_transactions, st.session_state.user_id, range_start, range_end, export_format),
+                        file_name=export_file_name(f"transactions_{start_date}_to_{end_date}", export_format),
+                        mime=EXPORT_FORMATS[export_format][1],
+                        disabled=too_large,
                         width='stretch'
                     )
+                    if too_large:
+                        st.caption(f"Downloads are limited to {DOWNLOAD_MAX_ROWS:,} transactions; pick a shorter range, "
+                                   "or export the full history with `python -m setup.manage export transactions`.")
         
                     st.subheader("Delete a Transaction")
-                    transaction_ids = [t[0] for t in transactions]
+                    transaction_labels = {trans_id: f"ID: {trans_id} - {category} - ₹{amount:.2f}"
+                                          for trans_id, category, amount in zip(df['ID'].tolist(), df['Category'].tolist(), df['Amount'].tolist())}
                     trans_id_to_del = st.selectbox(
                         "Select transaction to delete", 
-                        options=transaction_ids, 
-                        format_func=lambda x: f"ID: {x} - {next((t[2] for t in transactions if t[0] == x), 'N/A')} - ₹{next((t[4] for t in transactions if t[0] == x), 'N/A'):.2f}", 
+                        options=list(transaction_labels.keys()), 
+                        format_func=lambda x: transaction_labels[x], 
                         key="trans_select_del")
                     st.button("Delete Selected Transaction", on_click=delete_transaction_callback, width='stretch')
         
                 else:
-                    st.info("No transactions found for the selected date range.")
\ No newline at end of file
+                    st.info("No transactions found for the selected date range.")
+
+end_run()
\ No newline at end of file
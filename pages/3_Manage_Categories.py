@@ -1,13 +1,15 @@
 import streamlit as st
-import pandas as pd
-import io
+from functools import partial
 
 from setup.db import (
-    get_user_categories,
     add_category,
     update_category,
     delete_category
 )
+from setup.export import EXPORT_FORMATS, export_categories, export_file_name
+from setup.frames import categories_frame
+from setup.profiling import begin_run, end_run, data_editor
+from setup.scheduler import request_purge
 
 # --- Callbacks for database operations ---
 def add_category_callback():
@@ -27,6 +29,8 @@ if 'update_submitted' not in st.session_state:
 if 'delete_submitted' not in st.session_state:
     st.session_state.delete_submitted = False
 
+begin_run("Manage Categories", st.session_state.get('user_id'))
+
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     st.warning("Please log in to manage your Categories.")
 else:
@@ -51,16 +55,15 @@ else:
                 
 
     # --- Fetch categories for display ---
-    categories = get_user_categories(st.session_state.user_id)
-    df_categories = pd.DataFrame(categories, columns=['ID', 'Category Name', 'Category Type'])
+    df_categories = categories_frame(st.session_state.user_id)
 
     # --- Editable Category Table ---
     with st.container():
         st.subheader("Your Categories")
-        if not categories:
+        if df_categories.empty:
             st.info("You have no categories yet. Add one above.")
         else:
-            editable_df = st.data_editor(
+            editable_df = data_editor(
                 df_categories,
                 hide_index=True,
                 width='stretch',
@@ -90,8 +93,8 @@ else:
     # --- Delete a Category Section ---
     with st.container():
         st.subheader("Delete a Category")
-        if categories:
-            category_options = {c[1]: c[0] for c in categories}
+        if not df_categories.empty:
+            category_options = dict(zip(df_categories['Category Name'].tolist(), df_categories['ID'].tolist()))
             selected_category_name = st.selectbox(
                 "Select a category to delete",
                 options=list(category_options.keys()),
@@ -106,16 +109,20 @@ else:
         cat_id_to_del = category_options.get(st.session_state.category_select_del)
         if cat_id_to_del:
             delete_category(cat_id_to_del)
+            request_purge()
             st.success("Category and all related transactions deleted.")
         else:
             st.error("Please select a category to delete.")
 
     # Download Button
-    df_categories = pd.DataFrame(get_user_categories(st.session_state.user_id), columns=['ID', 'Category Name', 'Category Type'])
-    st.download_button(
-        label="Download Categories as CSV",
-        data=io.StringIO(df_categories.to_csv(index=False)).getvalue(),
-        file_name=f"categories_{st.session_state.username}.csv",
-        mime="text/csv",
+    col_format, col_download = st.columns([1, 2], vertical_alignment='bottom')
+    export_format = col_format.selectbox('Export format', list(EXPORT_FORMATS), key='category_export_format')
+    col_download.download_button(
+        label="Download Categories",
+        data=partial(export_categories, st.session_state.user_id, export_format),
+        file_name=export_file_name(f"categories_{st.session_state.username}", export_format),
+        mime=EXPORT_FORMATS[export_format][1],
         width='stretch'
-    )
\ No newline at end of file
+    )
+
+end_run()
\ No newline at end of file
@@ -1,24 +1,27 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import datetime
 
-from setup.db import (
-    get_user_categories,
-    set_budget,
-    get_budgets_for_month,
-    get_total_spent_per_category
+from setup.db import copy_budgets, set_budgets_bulk
+from setup.forecast import forecast_month_end
+from setup.frames import (
+    categories_frame,
+    budgets_frame,
+    spent_per_category_frame
 )
+from setup.profiling import begin_run, end_run, plotly_chart
+from setup.resources import plotly_express
+
+begin_run("Budgets", st.session_state.get('user_id'))
 
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     st.warning("Please log in to manage your Budgets.")
 else:
     st.header("Monthly Budgets")
-    categories = get_user_categories(st.session_state.user_id)
-    if not categories:
+    categories_df = categories_frame(st.session_state.user_id)
+    if categories_df.empty:
         st.warning("Please add some categories first.")
     else:
-        categories_df = pd.DataFrame(categories, columns=['ID', 'Category Name', 'Category Type'])
         expense_categories = categories_df[categories_df['Category Type'] == 'expense']
     
         if expense_categories.empty:
@@ -28,8 +31,8 @@ else:
             selected_month = col1.selectbox('Month', list(range(1, 13)), index=datetime.date.today().month - 1)
             selected_year = col2.number_input('Year', min_value=2000, max_value=2100, value=datetime.date.today().year, step=1)
     
-            budgets = get_budgets_for_month(st.session_state.user_id, selected_month, selected_year)
-            budget_dict = {b[3]: b[2] for b in budgets}
+            budgets_df = budgets_frame(st.session_state.user_id, selected_month, selected_year)
+            budget_dict = dict(zip(budgets_df['Category ID'].tolist(), budgets_df['Budget'].tolist()))
     
             with st.container():
                 st.subheader("Set Budgets")
@@ -37,7 +40,7 @@ else:
                     st.write(f"**Set Budgets for {datetime.date(selected_year, selected_month, 1).strftime('%B %Y')}**")
                     budget_inputs = {}
                     for _, row in expense_categories.iterrows():
-                        cat_id = row['ID']
+                        cat_id = int(row['ID'])
                         cat_name = row['Category Name']
                         
                         budget_inputs[cat_id] = st.number_input(
@@ -49,18 +52,31 @@ else:
                     
                     submitted = st.form_submit_button('Save Budgets')
                     if submitted:
-                        for cat_id, amount in budget_inputs.items():
-                            set_budget(st.session_state.user_id, cat_id, selected_month, selected_year, amount)
+                        set_budgets_bulk(st.session_state.user_id, selected_month, selected_year, budget_inputs)
                         st.success("Budgets saved successfully!")
+
+                with st.expander("Copy & Roll Over Budgets"):
+                    previous_month = datetime.date(selected_year, selected_month, 1) - datetime.timedelta(days=1)
+                    overwrite = st.checkbox("Overwrite budgets that are already set", key='budget_copy_overwrite')
+                    copy_col1, copy_col2 = st.columns(2)
+                    if copy_col1.button(f"Copy from {previous_month.strftime('%B %Y')}"):
+                        changed = copy_budgets(st.session_state.user_id, previous_month.month, previous_month.year,
+                                               selected_month, selected_year, overwrite=overwrite)
+                        st.success(f"Copied {changed} budget(s) from {previous_month.strftime('%B %Y')}.")
+                    rollover_months = copy_col2.number_input("Months ahead", min_value=1, max_value=24, value=1, step=1)
+                    if copy_col2.button(f"Apply to next {rollover_months} month(s)"):
+                        next_month = datetime.date(selected_year, selected_month, 28) + datetime.timedelta(days=4)
+                        changed = copy_budgets(st.session_state.user_id, selected_month, selected_year,
+                                               next_month.month, next_month.year, months=int(rollover_months), overwrite=overwrite)
+                        st.success(f"Applied {changed} budget(s) to the next {rollover_months} month(s).")
             
             with st.container():
                 st.subheader("Budget vs. Actual Spending")
-                total_spent_data = get_total_spent_per_category(st.session_state.user_id, selected_month, selected_year)
-                spent_df = pd.DataFrame(total_spent_data, columns=['ID', 'Category', 'Spent']).set_index('ID')
+                spent_df = spent_per_category_frame(st.session_state.user_id, selected_month, selected_year).set_index('ID')
                 
                 chart_data = []
                 for _, row in expense_categories.iterrows():
-                    cat_id = row['ID']
+                    cat_id = int(row['ID'])
                     cat_name = row['Category Name']
                     budget_amount = budget_dict.get(cat_id, 0.0)
                     spent_amount = spent_df.loc[cat_id, 'Spent'] if cat_id in spent_df.index else 0.0
@@ -70,7 +86,7 @@ else:
         
                 if chart_data:
                     df_chart = pd.DataFrame(chart_data)
-                    fig = px.bar(
+                    fig = plotly_express().bar(
                         df_chart,
                         x='Category',
                         y='Amount',
@@ -78,6 +94,33 @@ else:
                         barmode='group',
                         title=f'Budget vs. Spent for {datetime.date(selected_year, selected_month, 1).strftime("%B %Y")}'
                     )
-                    st.plotly_chart(fig, width='stretch')
+                    plotly_chart(fig, width='stretch')
                 else:
-                    st.info("No budgets to display. Set some budgets in the section above!")
\ No newline at end of file
+                    st.info("No budgets to display. Set some budgets in the section above!")
+
+            forecast = forecast_month_end(st.session_state.user_id, selected_month, selected_year)
+            if forecast['days_elapsed'] < forecast['days_in_month']:
+                with st.container():
+                    st.subheader("Month-End Forecast")
+                    st.caption(f"Projected from day {forecast['days_elapsed']} of {forecast['days_in_month']}, "
+                               "using your recent daily spending and the same month in earlier years.")
+                    forecast_df = pd.DataFrame(forecast['categories'],
+                                               columns=['ID', 'Category', 'Budget', 'Spent', 'Projected', 'Overshoot'])
+                    overshooting = forecast_df[forecast_df['Overshoot']]
+                    if not overshooting.empty:
+                        st.warning("Projected to go over budget: " + ", ".join(
+                            f"{row.Category} (₹{row.Projected:,.2f} of ₹{row.Budget:,.2f})"
+                            for row in overshooting.itertuples()))
+                    st.dataframe(
+                        forecast_df.drop(columns=['ID']),
+                        hide_index=True,
+                        width='stretch',
+                        column_config={
+                            'Budget': st.column_config.NumberColumn(format="₹%.2f"),
+                            'Spent': st.column_config.NumberColumn(format="₹%.2f"),
+                            'Projected': st.column_config.NumberColumn(format="₹%.2f"),
+                            'Overshoot': st.column_config.CheckboxColumn("Over Budget"),
+                        },
+                    )
+
+end_run()
\ No newline at end of file
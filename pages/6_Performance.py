@@ -0,0 +1,63 @@
+from functools import partial
+
+import streamlit as st
+import pandas as pd
+
+from setup.cache import cache_stats, reset_cache_stats
+from setup.profiling import clear_runs, export_runs, is_profile_admin, profiling_enabled, recent_runs
+
+if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+    st.warning("Please log in to view Performance diagnostics.")
+elif not profiling_enabled():
+    st.header("Performance")
+    st.info("Profiling is disabled. Start the app with BUDGET_TRACKER_PROFILE=1 to record query and render timings for each rerun.")
+else:
+    st.header("Performance")
+
+    # --- Query Cache ---
+    with st.container():
+        st.subheader("Query Cache")
+        stats = cache_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hits", f"{stats['hits']:,}")
+        col2.metric("Misses", f"{stats['misses']:,}")
+        col3.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+        col4.metric("Entries", f"{stats['size']:,}")
+        st.button("Reset Cache Counters", on_click=reset_cache_stats)
+
+    # --- Recent Reruns ---
+    with st.container():
+        st.subheader("Your Recent Reruns")
+        runs = recent_runs(st.session_state.user_id)
+        if not runs:
+            st.info("No reruns recorded yet. Visit another page to collect timings.")
+        else:
+            df_runs = pd.DataFrame([{
+                'Started': run['started_at'],
+                'Page': run['page'],
+                'Total (ms)': run['total_ms'],
+                'Calls': sum(event['kind'] == 'call' for event in run['events']),
+                'SQL Statements': sum(event['kind'] == 'sql' for event in run['events']),
+                'Connections Borrowed': run['connections_borrowed'],
+                'Connections Opened': run['connections_opened'],
+            } for run in reversed(runs)])
+            st.dataframe(df_runs, hide_index=True, width='stretch')
+
+            run_index = st.selectbox("Inspect rerun", options=list(range(len(df_runs))),
+                                     format_func=lambda i: f"{df_runs.loc[i, 'Started']} - {df_runs.loc[i, 'Page']}",
+                                     key="perf_run_select")
+            events = list(reversed(runs))[run_index]['events']
+            if events:
+                df_events = pd.DataFrame(events).rename(columns={'kind': 'Kind', 'name': 'Name', 'ms': 'Time (ms)', 'rows': 'Rows'})
+                st.dataframe(df_events.sort_values('Time (ms)', ascending=False), hide_index=True, width='stretch')
+
+            st.button("Clear My Recorded Reruns", on_click=partial(clear_runs, st.session_state.user_id))
+
+        # Everyone's runs: only for the operators named in BUDGET_TRACKER_PROFILE_ADMINS.
+        if is_profile_admin(st.session_state.get('username')):
+            st.download_button(
+                label="Download All Users' Profile Log (JSON Lines)",
+                data=export_runs(),
+                file_name="budget_tracker_profile.jsonl",
+                mime="application/x-ndjson"
+            )
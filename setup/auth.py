@@ -0,0 +1,120 @@
+"""Password hashing service backed by a bounded worker pool.
+
+bcrypt releases the GIL while hashing, so a small thread pool spreads
+concurrent logins across cores instead of serializing them on each
+Streamlit script thread. The number of hashes in flight is capped; once the
+pool is saturated, callers wait for a slot rather than queueing unbounded
+CPU work.
+
+The cost factor comes from BUDGET_TRACKER_BCRYPT_ROUNDS. Hashes made with
+a different cost are reported by needs_rehash() so setup.db can upgrade
+them transparently on the next successful login.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get('BUDGET_TRACKER_BCRYPT_ROUNDS', '12'))
+AUTH_WORKERS = int(os.environ.get('BUDGET_TRACKER_AUTH_WORKERS', str(os.cpu_count() or 1)))
+MAX_PENDING = AUTH_WORKERS * 4
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_dummy_hashes = {}
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix='bcrypt')
+            _slots = threading.BoundedSemaphore(MAX_PENDING)
+            # Warm the dummy hash so the first unknown-username login is not slower than the rest.
+            _executor.submit(_dummy_hash)
+        return _executor, _slots
+
+
+def _submit(func, *args):
+    executor, slots = _get_executor()
+    slots.acquire()
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def configure_auth(rounds=None, workers=None):
+    """Change the cost factor and/or resize the worker pool."""
+    global BCRYPT_ROUNDS, AUTH_WORKERS, MAX_PENDING, _executor
+    old_executor = None
+    with _lock:
+        if rounds is not None:
+            BCRYPT_ROUNDS = rounds
+        if workers is not None:
+            AUTH_WORKERS = workers
+            MAX_PENDING = workers * 4
+            old_executor, _executor = _executor, None
+    # Outside the lock: queued tasks such as the _dummy_hash warm-up take it too.
+    if old_executor is not None:
+        old_executor.shutdown(wait=True)
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def submit_hash_password(password):
+    return _submit(_hash, password, BCRYPT_ROUNDS)
+
+
+def submit_check_password(password, hashed):
+    return _submit(_check, password, hashed)
+
+
+def hash_password(password):
+    return submit_hash_password(password).result()
+
+
+def check_password(password, hashed):
+    """Check password against hashed; pass hashed=None for an unknown user.
+
+    Unknown users are checked against a dummy hash of the current cost so a
+    failed login takes the same time whether or not the username exists.
+    """
+    if hashed is None:
+        submit_check_password(password, _dummy_hash()).result()
+        return False
+    return submit_check_password(password, hashed).result()
+
+
+def hash_rounds(hashed):
+    # bcrypt hashes look like $2b$12$<salt+digest>; the cost sits between the second and third $.
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+def _dummy_hash():
+    rounds = BCRYPT_ROUNDS
+    with _lock:
+        hashed = _dummy_hashes.get(rounds)
+    if hashed is None:
+        hashed = _hash('not a real password', rounds)
+        with _lock:
+            hashed = _dummy_hashes.setdefault(rounds, hashed)
+    return hashed
@@ -0,0 +1,70 @@
+"""Storage backends the data layer can open connections against.
+
+setup.db owns pooling, transactions and every query; a backend only knows
+how to open a connection to its store and prepare it for use. The backend
+is chosen from a database URL:
+
+    sqlite:///relative/path.db
+    sqlite:////absolute/path.db
+    path/to/file.db              (a bare path is a SQLite file)
+
+setup.db only runs on SQLite. Its schema and queries depend on SQLite
+features (triggers that maintain monthly_category_totals, strftime date
+bucketing, WITHOUT ROWID tables and the pragmas below), so other engines
+are rejected with a clear error instead of failing on the first query.
+PostgreSQL is reached through setup.repository instead.
+"""
+import sqlite3
+
+# Applied once when a connection is opened, not on every borrow.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class SQLiteBackend:
+    """A SQLite database file shared by every process on the host.
+
+    WAL mode lets several app processes read concurrently while one
+    writes, and the busy timeout makes writers queue instead of failing.
+    (setup.writer turns the busy handler off on its own connection and
+    retries with backoff instead.)
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, pragmas=SQLITE_PRAGMAS, timeout=5.0):
+        self.path = path
+        self.pragmas = pragmas
+        self.timeout = timeout
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    @property
+    def url(self):
+        return f"sqlite:///{self.path}"
+
+    def __repr__(self):
+        return f"SQLiteBackend({self.path!r})"
+
+
+def backend_from_url(url):
+    """Return the backend for a database URL or bare SQLite file path."""
+    scheme, sep, rest = url.partition('://')
+    if not sep:
+        return SQLiteBackend(url)
+    if scheme == 'sqlite':
+        if not rest.startswith('/') or len(rest) < 2:
+            raise ValueError(f"Malformed SQLite URL (expected sqlite:///path): {url}")
+        return SQLiteBackend(rest[1:])
+    raise ValueError(f"Unsupported database backend '{scheme}': setup.db only supports SQLite databases "
+                     "(use setup.repository.get_repository for PostgreSQL)")
@@ -0,0 +1,92 @@
+"""Per-user query result cache invalidated by a data version.
+
+Read functions decorated with @cached_query take user_id as their first
+argument. Their results are kept in a process-wide LRU keyed by
+(user_id, query, args) and tagged with the user's data version. Every
+mutating function in setup.db calls bump_user_version() after it commits,
+so the next read for that user misses and goes back to SQLite, while other
+users' entries stay warm. Entries also expire after a TTL as a backstop.
+
+Cached values are shared between callers and must be treated as read-only.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.environ.get('BUDGET_TRACKER_CACHE_SIZE', '512'))
+CACHE_TTL = float(os.environ.get('BUDGET_TRACKER_CACHE_TTL', '300'))
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_user_versions = {}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached result for user_id."""
+    with _lock:
+        _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+        _stats['invalidations'] += 1
+
+
+def clear_cache():
+    with _lock:
+        _entries.clear()
+        _user_versions.clear()
+
+
+def cache_stats():
+    with _lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {**_stats, 'size': len(_entries), 'hit_rate': _stats['hits'] / lookups if lookups else 0.0}
+
+
+def reset_cache_stats():
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def configure_cache(size=None, ttl=None):
+    global CACHE_SIZE, CACHE_TTL
+    with _lock:
+        if size is not None:
+            CACHE_SIZE = size
+        if ttl is not None:
+            CACHE_TTL = ttl
+        _entries.clear()
+
+
+def cached_query(func):
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(user_id, *args, **kwargs):
+        if CACHE_SIZE <= 0:
+            return func(user_id, *args, **kwargs)
+        key = (user_id, name, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _lock:
+            version = _user_versions.get(user_id, 0)
+            entry = _entries.get(key)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                _entries.move_to_end(key)
+                _stats['hits'] += 1
+                return entry[2]
+            _stats['misses'] += 1
+        # Query outside the lock so slow reads do not serialize other sessions.
+        value = func(user_id, *args, **kwargs)
+        with _lock:
+            # A write that landed while we were querying makes this result stale.
+            if _user_versions.get(user_id, 0) == version:
+                _entries[key] = (version, now + CACHE_TTL, value)
+                _entries.move_to_end(key)
+                while len(_entries) > CACHE_SIZE:
+                    _entries.popitem(last=False)
+                    _stats['evictions'] += 1
+        return value
+
+    wrapper.uncached = func
+    return wrapper
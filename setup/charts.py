@@ -0,0 +1,171 @@
+"""Chart data reduction ahead of Plotly, and the Insights figures built on it.
+
+A figure is serialized to JSON and sent over the Streamlit websocket, so a
+trace with a point per day of a ten-year history costs megabytes although
+a chart CHART_WIDTH_PX wide can draw only so many distinct x positions.
+Before a figure is built its data is cut down to what the viewport shows:
+
+* line charts keep at most one point per PIXELS_PER_POINT pixels, chosen
+  with Largest-Triangle-Three-Buckets (or the minimum and maximum of each
+  bucket), so peaks and troughs survive;
+* bar charts are re-aggregated into coarser calendar periods (weeks,
+  months, quarters, years) until at most one bar per PIXELS_PER_BAR pixels
+  remains, and categories beyond MAX_BAR_CATEGORIES are summed as 'Other'.
+
+That bounds the number of points in every figure whatever the history
+size, and so its payload; benchmarks/check_chart_payloads.py checks the
+figures below against CHART_PAYLOAD_LIMIT.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+CHART_WIDTH_PX = int(os.environ.get('BUDGET_TRACKER_CHART_WIDTH', '1200'))
+PIXELS_PER_POINT = 2
+PIXELS_PER_BAR = 8
+MAX_BAR_CATEGORIES = 10
+OTHER_CATEGORY = 'Other'
+# Upper bound on the JSON of one Insights figure at CHART_WIDTH_PX.
+CHART_PAYLOAD_LIMIT = 256 * 1024
+
+# Calendar periods bars are re-aggregated into, finest first: (label, pandas period code).
+BAR_PERIODS = [('Weekly', 'W'), ('Monthly', 'M'), ('Quarterly', 'Q'), ('Yearly', 'Y')]
+
+
+def line_points(width_px=None):
+    """Return the most points a line chart width_px wide (default CHART_WIDTH_PX) needs."""
+    return max((width_px or CHART_WIDTH_PX) // PIXELS_PER_POINT, 3)
+
+
+def bar_periods(width_px=None):
+    """Return the most periods a bar chart width_px wide (default CHART_WIDTH_PX) shows."""
+    return max((width_px or CHART_WIDTH_PX) // PIXELS_PER_BAR, 1)
+
+
+def lttb(x, y, threshold):
+    """Return the indexes of threshold points of (x, y) chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Every point in between falls
+    into one of threshold - 2 buckets, and from each bucket the point
+    forming the largest triangle with the point kept from the previous
+    bucket and the average of the next bucket is kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Averages of every bucket, with the last point standing in after the final bucket.
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])[1:]
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs((x[previous] - next_x[bucket]) * (by - y[previous])
+                      - (x[previous] - bx) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_indexes(y, buckets):
+    """Return the sorted indexes of the minimum and maximum of y in each of buckets equal buckets."""
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    size = math.ceil(n / buckets)
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    valid = ~np.isnan(padded).all(axis=1)
+    low = np.nanargmin(padded[valid], axis=1) + offsets[valid]
+    high = np.nanargmax(padded[valid], axis=1) + offsets[valid]
+    return np.unique(np.concatenate([low, high]))
+
+
+def downsample_line(df, x, y, max_points=None, method='lttb'):
+    """Return the rows of df (sorted by x) that a line chart of y over x needs.
+
+    max_points defaults to line_points(); method is 'lttb' or 'minmax'.
+    """
+    max_points = max_points or line_points()
+    if len(df) <= max_points:
+        return df
+    if method == 'minmax':
+        indexes = minmax_indexes(df[y].to_numpy(dtype=np.float64), max_points // 2)
+    elif method == 'lttb':
+        xs = df[x].to_numpy()
+        if np.issubdtype(xs.dtype, np.datetime64):
+            xs = xs.astype('datetime64[s]').astype(np.int64)
+        indexes = lttb(xs, df[y].to_numpy(dtype=np.float64), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected 'lttb' or 'minmax'")
+    return df.iloc[indexes]
+
+
+def bucket_bars(df, period, category, value, label, max_periods=None, max_categories=MAX_BAR_CATEGORIES):
+    """Re-aggregate long-form bar data so it fits max_periods periods and max_categories categories.
+
+    Periods are coarsened to the finest calendar period in BAR_PERIODS that
+    fits; categories outside the max_categories - 1 largest are summed as
+    OTHER_CATEGORY. Returns (frame, label) where label names the period
+    actually used, e.g. 'Monthly'.
+    """
+    max_periods = max_periods or bar_periods()
+    if df[category].nunique() > max_categories:
+        totals = df.groupby(category, observed=True)[value].sum().sort_values(ascending=False)
+        keep = set(totals.index[:max_categories - 1])
+        names = df[category].astype(object)
+        df = df.assign(**{category: names.where(names.isin(keep), OTHER_CATEGORY)})
+    periods = df[period]
+    if periods.nunique() > max_periods:
+        for label, code in BAR_PERIODS:
+            periods = df[period].dt.to_period(code).dt.start_time
+            if periods.nunique() <= max_periods:
+                break
+        else:
+            # Longer than max_periods years: equal runs of whole years.
+            years = df[period].dt.year
+            span = math.ceil((years.max() - years.min() + 1) / max_periods)
+            starts = years.min() + (years - years.min()) // span * span
+            periods = pd.to_datetime(pd.DataFrame({'year': starts, 'month': 1, 'day': 1}))
+            label = f'{span}-Yearly'
+    df = df.assign(**{period: periods})
+    grouped = df.groupby([period, category], observed=True, sort=True)[value].sum().reset_index()
+    return grouped, label
+
+
+def balance_figure(df, granularity, width_px=None):
+    """Line chart of the running Balance per Period, downsampled to the viewport."""
+    from setup.resources import plotly_express
+
+    df = downsample_line(df, 'Period', 'Balance', line_points(width_px))
+    fig = plotly_express().line(df, x='Period', y='Balance', title=f'{granularity} Balance Over Time', markers=True)
+    fig.update_layout(xaxis_title="Date", yaxis_title="Balance (₹)", hovermode="x unified")
+    return fig
+
+
+def category_spend_figure(df, granularity, width_px=None):
+    """Stacked bars of expense Amount per Period and Category, re-bucketed to the viewport."""
+    from setup.resources import plotly_express
+
+    df, granularity = bucket_bars(df, 'Period', 'Category', 'Amount', granularity, bar_periods(width_px))
+    fig = plotly_express().bar(
+        df,
+        x='Period',
+        y='Amount',
+        color='Category',
+        title=f'{granularity} Spending by Category',
+        labels={'Amount': 'Amount (₹)', 'Period': 'Date'},
+        hover_data={'Amount': ':.2f', 'Category': True, 'Period': False}
+    )
+    fig.update_layout(barmode='stack', xaxis_title="Date", yaxis_title="Amount (₹)")
+    return fig
@@ -1,268 +1,941 @@
-import sqlite3
-import bcrypt
+import os
+import queue
+import re
+import threading
+import time
 import datetime
+from contextlib import contextmanager
+from decimal import ROUND_HALF_UP, Decimal
 
-DB_FILE = 'budget_tracker.db'
+from setup.auth import check_password, hash_password, needs_rehash
+from setup.backends import backend_from_url
+from setup.cache import bump_user_version, cached_query, clear_cache
+from setup.migrations import MONTHLY_TOTALS_BACKFILL, apply_migrations
+from setup.profiling import connection_borrowed, connection_released, profiled, traced_write
+from setup.writer import WriteQueue
 
+# BUDGET_TRACKER_DATABASE_URL takes a backend URL; BUDGET_TRACKER_DB a plain SQLite file path.
+DATABASE_URL = os.environ.get('BUDGET_TRACKER_DATABASE_URL') or os.environ.get('BUDGET_TRACKER_DB', 'budget_tracker.db')
+POOL_SIZE = int(os.environ.get('BUDGET_TRACKER_POOL_SIZE', '8'))
+
+# --- Connection Pool ---
+_pool_lock = threading.Lock()
+_idle_connections = queue.LifoQueue()
+_pool_slots = threading.BoundedSemaphore(POOL_SIZE) if POOL_SIZE > 0 else None
+_pool_generation = 0
+_backend = backend_from_url(DATABASE_URL)
+
+def open_connection(database=None):
+    """Open a new, unpooled connection to the configured database (or another URL or path)."""
+    backend = backend_from_url(database) if database else _backend
+    return backend.connect()
+
+def _acquire_connection():
+    slots, generation = _pool_slots, _pool_generation
+    if slots is None:
+        return open_connection(), None, generation, True
+    slots.acquire()
+    try:
+        return _idle_connections.get_nowait()[0], slots, generation, False
+    except queue.Empty:
+        pass
+    try:
+        return open_connection(), slots, generation, True
+    except Exception:
+        slots.release()
+        raise
+
+def _release_connection(conn, slots, generation):
+    if conn.in_transaction:
+        conn.rollback()
+    if slots is None:
+        conn.close()
+        return
+    with _pool_lock:
+        if generation == _pool_generation:
+            _idle_connections.put((conn, generation))
+            conn = None
+    if conn is not None:
+        conn.close()
+    slots.release()
+
+@contextmanager
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# --- Table Creation Functions ---
-def create_user_table():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def create_categories_table():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            category_name TEXT NOT NULL,
-            category_type TEXT NOT NULL,
-            UNIQUE(user_id, category_name),
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def create_transactions_table():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            category_id INTEGER,
-            amount REAL NOT NULL,
-            transaction_date TEXT NOT NULL,
-            note TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def create_budgets_table():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS budgets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            budget_amount REAL NOT NULL,
-            month INTEGER NOT NULL,
-            year INTEGER NOT NULL,
-            category_id INTEGER,
-            UNIQUE(user_id, category_id, month, year),
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
-        )
-    """)
-    conn.commit()
-    conn.close()
+    """Borrow a connection from the shared pool for the duration of the block.
+
+    Anything left uncommitted when the block exits is rolled back before the
+    connection goes back to the pool.
+    """
+    conn, slots, generation, opened = _acquire_connection()
+    trace = connection_borrowed(conn, opened)
+    try:
+        yield conn
+    finally:
+        connection_released(conn, trace)
+        _release_connection(conn, slots, generation)
+
+def close_pool():
+    """Close every idle pooled connection and stop the writer; borrowed connections are closed on release."""
+    global _pool_generation
+    _stop_writer()
+    with _pool_lock:
+        _pool_generation += 1
+        while True:
+            try:
+                conn, _ = _idle_connections.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+def configure_database(database=None, pool_size=None):
+    """Point the data layer at another database URL or file and/or resize the pool.
+
+    A pool_size of 0 disables pooling so every call opens and closes its own
+    connection.
+    """
+    global DATABASE_URL, POOL_SIZE, _backend, _pool_slots, _schema_ready
+    close_pool()
+    if database is not None:
+        _backend = backend_from_url(database)
+        DATABASE_URL = database
+        _schema_ready = False
+        clear_cache()
+    if pool_size is not None:
+        POOL_SIZE = pool_size
+        _pool_slots = threading.BoundedSemaphore(pool_size) if pool_size > 0 else None
+
+# --- Writes ---
+# Every write goes through one writer thread per process (see setup.writer),
+# so sessions never race each other for SQLite's write lock. Mutating
+# functions below pass run_write() a function of the writer's connection;
+# it must not commit, and the caller bumps cache versions once it returns.
+_writer_lock = threading.Lock()
+_writer = None
+
+def run_write(work):
+    """Run work(conn) in a group-committed write transaction on the writer thread and return its result."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue(open_connection)
+        writer = _writer
+    return traced_write(writer.run, work)
+
+def writer_stats():
+    """Return the writer's counters (writes, failed, commits, busy_retries, writes_per_commit), or None before any write."""
+    with _writer_lock:
+        writer = _writer
+    return writer.stats() if writer else None
 
+def _stop_writer():
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+# --- Schema ---
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+@profiled
 def initialize_database():
-    """Call all table creation functions to set up the database."""
-    create_user_table()
-    create_categories_table()
-    create_transactions_table()
-    create_budgets_table()
+    """Bring the database schema up to date, once per process."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            with get_db_connection() as conn:
+                apply_migrations(conn)
+            _schema_ready = True
+
+def month_date_range(month, year):
+    """Return the half-open [start, end) ISO date range covering a calendar month."""
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+    return start.isoformat(), end.isoformat()
 
 # --- User Management ---
+@profiled
 def create_user(username, password):
-    conn = get_db_connection()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password.decode('utf-8')))
-    conn.commit()
-    user_id = cursor.lastrowid
-    conn.close()
-    return user_id
+    hashed_password = hash_password(password)
+    return run_write(lambda conn: conn.execute(
+        "INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password)).lastrowid)
 
+@profiled
 def authenticate_user(username, password):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, password FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
-    if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
-        return user
-    return None
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, password FROM users WHERE username = ? AND deleted_at IS NULL", (username,))
+        user = cursor.fetchone()
+    if not check_password(password, user['password'] if user else None):
+        return None
+    if needs_rehash(user['password']):
+        # The cost factor changed since this hash was made; upgrade it while we know the password.
+        new_hash = hash_password(password)
+        run_write(lambda conn: conn.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                                            (new_hash, user['id'], user['password'])))
+    return user
 
+@profiled
+def delete_user(user_id):
+    """Soft-delete an account: it can no longer log in and its data is purged later by purge_deleted()."""
+    run_write(lambda conn: conn.execute("""
+        UPDATE users
+        SET deleted_at = datetime('now'), username = username || ' [deleted ' || id || ']'
+        WHERE id = ? AND deleted_at IS NULL
+    """, (user_id,)))
+    bump_user_version(user_id)
+
+@profiled
+@cached_query
 def get_username_by_id(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
+        result = cursor.fetchone()
     return result[0] if result else None
 
+CATEGORY_TYPES = ('expense', 'income', 'savings')
+
+DEFAULT_CATEGORIES = [
+    ('Groceries', 'expense'), ('Bills', 'expense'), ('Rent', 'expense'),
+    ('Salary', 'income'), ('Freelance', 'income'),
+    ('Savings', 'savings')
+]
+
+@profiled
 def set_default_categories(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    default_categories = [
-        ('Groceries', 'expense'), ('Bills', 'expense'), ('Rent', 'expense'),
-        ('Salary', 'income'), ('Freelance', 'income'),
-        ('Savings', 'savings')
-    ]
-    
-    for cat_name, cat_type in default_categories:
-        cursor.execute("INSERT INTO categories (user_id, category_name, category_type) VALUES (?, ?, ?)", (user_id, cat_name, cat_type))
-    
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.executemany(
+        "INSERT INTO categories (user_id, category_name, category_type) VALUES (?, ?, ?)",
+        [(user_id, cat_name, cat_type) for cat_name, cat_type in DEFAULT_CATEGORIES]))
+    bump_user_version(user_id)
 
 # --- Category Management ---
+@profiled
 def add_category(user_id, category_name, category_type):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO categories (user_id, category_name, category_type) VALUES (?, ?, ?)", (user_id, category_name, category_type))
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.execute(
+        "INSERT INTO categories (user_id, category_name, category_type) VALUES (?, ?, ?)",
+        (user_id, category_name, category_type)))
+    bump_user_version(user_id)
 
+@profiled
 def update_category(category_id, new_name, new_type):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE categories SET category_name = ?, category_type = ? WHERE id = ?", (new_name, new_type, category_id))
-    conn.commit()
-    conn.close()
+    owner = run_write(lambda conn: conn.execute(
+        "UPDATE categories SET category_name = ?, category_type = ? WHERE id = ? RETURNING user_id",
+        (new_name, new_type, category_id)).fetchone())
+    if owner:
+        bump_user_version(owner[0])
 
+@profiled
 def delete_category(category_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM transactions WHERE category_id = ?", (category_id,))
-    cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-    conn.commit()
-    conn.close()
+    """Soft-delete a category; its transactions disappear at once and are purged later by purge_deleted().
 
+    The name gets a unique suffix so the user can create a category with
+    the same name straight away.
+    """
+    owner = run_write(lambda conn: conn.execute("""
+        UPDATE categories
+        SET deleted_at = datetime('now'), category_name = category_name || ' [deleted ' || id || ']'
+        WHERE id = ? AND deleted_at IS NULL
+        RETURNING user_id
+    """, (category_id,)).fetchone())
+    if owner:
+        bump_user_version(owner[0])
+
+@profiled
+@cached_query
 def get_user_categories(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, category_name, category_type FROM categories WHERE user_id = ? ORDER BY category_name ASC", (user_id,))
-    categories = cursor.fetchall()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, category_name, category_type FROM categories WHERE user_id = ? AND deleted_at IS NULL ORDER BY category_name ASC", (user_id,))
+        categories = cursor.fetchall()
     return [tuple(row) for row in categories]
 
+# --- Transaction Storage ---
+# transactions stores amount_minor (integer minor units, i.e. paise) and
+# day (integer days since 1970-01-01). Callers keep passing and receiving
+# float amounts and ISO 'YYYY-MM-DD' dates: writes convert in SQL,
+# predicates convert their parameters up front so indexes compare integers,
+# and reads convert back in the SELECT list (the columnar frames read the
+# integers as they are).
+MINOR_UNITS = 100
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+AMOUNT_TO_MINOR = f"CAST(round({{}} * {MINOR_UNITS}) AS INTEGER)"
+MINOR_TO_AMOUNT = f"({{}} / {MINOR_UNITS}.0)"
+DATE_TO_DAY = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+DAY_TO_DATE = "date({} * 86400, 'unixepoch')"
+
+TRANSACTION_INSERT = f"""
+    INSERT INTO transactions (user_id, category_id, amount_minor, day, note)
+    VALUES (?, ?, {AMOUNT_TO_MINOR.format('?')}, {DATE_TO_DAY.format('?')}, ?)
+"""
+_TRANSACTION_UPDATE = f"""
+    UPDATE transactions
+    SET category_id = ?, amount_minor = {AMOUNT_TO_MINOR.format('?')}, day = {DATE_TO_DAY.format('?')}, note = ?
+"""
+
+def to_minor(amount):
+    # Round half away from zero, as AMOUNT_TO_MINOR's SQL round() does.
+    return int(Decimal(amount * MINOR_UNITS).quantize(Decimal(1), ROUND_HALF_UP))
+
+def to_day(date):
+    return datetime.date.fromisoformat(str(date)[:10]).toordinal() - _EPOCH_ORDINAL
+
+def from_day(day):
+    return datetime.date.fromordinal(day + _EPOCH_ORDINAL).isoformat()
+
+def _transaction_columns(raw):
+    if raw:
+        return "t.id, t.day, c.category_name, c.category_type, t.amount_minor, t.note"
+    return (f"t.id, {DAY_TO_DATE.format('t.day')}, c.category_name, c.category_type, "
+            f"{MINOR_TO_AMOUNT.format('t.amount_minor')}, t.note")
+
 # --- Transaction Management ---
+@profiled
 def add_transaction(user_id, category_id, amount, date, note):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO transactions (user_id, category_id, amount, transaction_date, note) VALUES (?, ?, ?, ?, ?)", (user_id, category_id, amount, date, note))
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.execute(TRANSACTION_INSERT, (user_id, category_id, amount, date, note)))
+    bump_user_version(user_id)
 
+@profiled
 def update_transaction(transaction_id, category_id, amount, date, note):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE transactions SET category_id = ?, amount = ?, transaction_date = ?, note = ? WHERE id = ?", (category_id, amount, date, note, transaction_id))
-    conn.commit()
-    conn.close()
+    owner = run_write(lambda conn: conn.execute(
+        _TRANSACTION_UPDATE + "WHERE id = ? RETURNING user_id",
+        (category_id, amount, date, note, transaction_id)).fetchone())
+    if owner:
+        bump_user_version(owner[0])
+
+@profiled
+def update_transactions_bulk(user_id, updates, deleted_ids=()):
+    """Apply edited (transaction_id, category_id, amount, date, note) rows and deletions in one transaction."""
+    def write(conn):
+        conn.executemany(
+            _TRANSACTION_UPDATE + "WHERE id = ? AND user_id = ?",
+            [(category_id, amount, date, note, transaction_id, user_id)
+             for transaction_id, category_id, amount, date, note in updates])
+        conn.executemany("DELETE FROM transactions WHERE id = ? AND user_id = ?",
+                         [(transaction_id, user_id) for transaction_id in deleted_ids])
+    run_write(write)
+    bump_user_version(user_id)
 
+@profiled
 def delete_transaction(transaction_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-    conn.commit()
-    conn.close()
+    owner = run_write(lambda conn: conn.execute(
+        "DELETE FROM transactions WHERE id = ? RETURNING user_id", (transaction_id,)).fetchone())
+    if owner:
+        bump_user_version(owner[0])
 
-def fetch_transaction_history(user_id, start_date=None, end_date=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT t.id, t.transaction_date, c.category_name, c.category_type, t.amount, t.note 
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.user_id = ?
+@profiled
+def import_transactions(user_id, row_batches):
+    """Insert batches of (date, category_name, category_type, amount, note) rows, one write per batch.
+
+    Each batch is read from row_batches (parsed, for a file) on the calling
+    thread and committed on its own, so other sessions' writes get in
+    between batches; if a batch fails, the ones before it stay imported.
+    Unknown category names are created with the row's category_type.
+    Returns a dict with the number of rows imported, the categories created
+    and throughput.
     """
+    started = time.perf_counter()
+    category_ids = {}
+    created_categories = []
+    imported = 0
+
+    def write_batch(batch):
+        # Category ids found or created here are only cached once the batch commits.
+        def write(conn):
+            cursor = conn.cursor()
+            resolved, created, params = {}, [], []
+            for date, category_name, category_type, amount, note in batch:
+                category_id = category_ids.get(category_name) or resolved.get(category_name)
+                if category_id is None:
+                    row = cursor.execute("SELECT id FROM categories WHERE user_id = ? AND category_name = ? AND deleted_at IS NULL",
+                                         (user_id, category_name)).fetchone()
+                    if row is None:
+                        cursor.execute("INSERT INTO categories (user_id, category_name, category_type) VALUES (?, ?, ?)",
+                                       (user_id, category_name, category_type))
+                        row = (cursor.lastrowid,)
+                        created.append(category_name)
+                    category_id = resolved[category_name] = row[0]
+                params.append((user_id, category_id, amount, date, note))
+            cursor.executemany(TRANSACTION_INSERT, params)
+            return len(params), resolved, created
+        return write
+
+    try:
+        for batch in row_batches:
+            count, resolved, created = run_write(write_batch(batch))
+            imported += count
+            category_ids.update(resolved)
+            created_categories.extend(created)
+    finally:
+        if imported or created_categories:
+            bump_user_version(user_id)
+    elapsed = time.perf_counter() - started
+    return {
+        'imported': imported,
+        'created_categories': created_categories,
+        'seconds': elapsed,
+        'rows_per_sec': imported / elapsed if elapsed else 0.0,
+    }
+
+def _transaction_range_filter(user_id, start_date, end_date):
+    clause = "t.user_id = ?"
     params = [user_id]
-    
-    if start_date and end_date:
-        query += " AND t.transaction_date BETWEEN ? AND ?"
-        params.extend([start_date, end_date])
-    
-    query += " ORDER BY t.transaction_date DESC"
-    
-    cursor.execute(query, params)
-    transactions = cursor.fetchall()
-    conn.close()
+    if start_date:
+        clause += " AND t.day >= ?"
+        params.append(to_day(start_date))
+    if end_date:
+        clause += " AND t.day < ?"
+        params.append(to_day(end_date))
+    return clause, params
+
+def transaction_history_query(user_id, start_date=None, end_date=None, limit=None, after=None, raw=False):
+    """Build the (sql, params) for transaction history, newest first.
+
+    `after` is a (transaction_date, id) keyset cursor; rows strictly older
+    than it are returned. With raw=True dates and amounts come back as the
+    stored day numbers and minor units.
+    """
+    clause, params = _transaction_range_filter(user_id, start_date, end_date)
+    return _transaction_query("transactions t", clause, params, limit, after, raw)
+
+def _transaction_query(source, clause, params, limit, after, raw):
+    """Finish a newest-first transaction query: keyset cursor, SELECT list, ORDER BY and LIMIT."""
+    if after is not None:
+        clause += " AND (t.day, t.id) < (?, ?)"
+        params.extend((to_day(after[0]), after[1]))
+    query = f"""
+        SELECT {_transaction_columns(raw)}
+        FROM {source}
+        JOIN categories c ON t.category_id = c.id AND c.deleted_at IS NULL
+        WHERE {clause}
+        ORDER BY t.day DESC, t.id DESC
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+def split_page(rows, page_size, cursor_for):
+    """Trim the look-ahead row off page_size + 1 rows and return (rows, next_cursor).
+
+    cursor_for(rows) gives the cursor after the last of the trimmed rows; the
+    cursor is None when there was no look-ahead row, i.e. on the last page.
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, cursor_for(rows)
+
+def row_cursor(rows):
+    """The (date, id) keyset cursor after the last of a page of history rows."""
+    return rows[-1][1], rows[-1][0]
+
+def _fetch_page(query, params, page_size):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        transactions = [tuple(row) for row in cursor.fetchall()]
+    return split_page(transactions, page_size, row_cursor)
+
+@profiled
+@cached_query
+def fetch_transaction_history(user_id, start_date=None, end_date=None):
+    query, params = transaction_history_query(user_id, start_date, end_date)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        transactions = cursor.fetchall()
     return [tuple(row) for row in transactions]
 
+@profiled
+@cached_query
+def fetch_transaction_page(user_id, start_date=None, end_date=None, page_size=50, after=None):
+    """Return one page of transaction history, newest first, and the cursor for the next page.
+
+    Pages are keyset-paginated on (transaction_date, id): pass the cursor
+    returned for the previous page as `after`. The returned cursor is None
+    on the last page.
+    """
+    # One extra row tells us whether another page follows.
+    query, params = transaction_history_query(user_id, start_date, end_date, page_size + 1, after)
+    return _fetch_page(query, params, page_size)
+
+# Text searches matching at most this many notes are driven from the FTS
+# index; broader ones walk the user's history newest-first instead.
+FTS_DRIVE_LIMIT = 20000
+
+def _search_words(text):
+    return [word.lower() for word in re.findall(r"\w+", text or '')]
+
+def _fts_match(words):
+    """Turn words into an FTS5 query: every word must match, as a prefix."""
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+def estimate_text_matches(text):
+    """Upper bound on the number of notes matching text, from the FTS vocabulary."""
+    words = _search_words(text)
+    if not words:
+        return 0
+    with get_db_connection() as conn:
+        counts = [conn.execute("SELECT COALESCE(SUM(doc), 0) FROM transactions_fts_vocab WHERE term >= ? AND term < ?",
+                               (word, word + '\U0010ffff')).fetchone()[0] for word in words]
+    return min(counts)
+
+def transaction_search_query(user_id, text=None, category_ids=(), category_type=None, min_amount=None,
+                             max_amount=None, start_date=None, end_date=None, limit=None, after=None, raw=False):
+    """Build the (sql, params) for a filtered transaction search, newest first.
+
+    text is matched against notes through the transactions_fts index; the
+    other arguments are optional facets. Results use the same columns and
+    (transaction_date, id) keyset cursor and raw option as
+    transaction_history_query.
+    """
+    clause, params = _transaction_range_filter(user_id, start_date, end_date)
+    source = "transactions t"
+    match = _fts_match(_search_words(text))
+    if match:
+        clause += " AND t.id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)"
+        params.append(match)
+        if estimate_text_matches(text) <= FTS_DRIVE_LIMIT:
+            # Few matches: look them up by rowid and sort, rather than walk
+            # every transaction the user has probing the match set.
+            source = "transactions t NOT INDEXED"
+    if category_ids:
+        clause += f" AND t.category_id IN ({', '.join('?' * len(category_ids))})"
+        params.extend(category_ids)
+    if category_type:
+        clause += " AND c.category_type = ?"
+        params.append(category_type)
+    if min_amount is not None:
+        clause += " AND t.amount_minor >= ?"
+        params.append(to_minor(min_amount))
+    if max_amount is not None:
+        clause += " AND t.amount_minor <= ?"
+        params.append(to_minor(max_amount))
+    return _transaction_query(source, clause, params, limit, after, raw)
+
+@profiled
+@cached_query
+def search_transactions(user_id, text=None, category_ids=(), category_type=None, min_amount=None,
+                        max_amount=None, start_date=None, end_date=None, page_size=50, after=None):
+    """Return one page of search results and the cursor for the next page (None on the last page)."""
+    query, params = transaction_search_query(user_id, text, category_ids, category_type, min_amount,
+                                             max_amount, start_date, end_date, page_size + 1, after)
+    return _fetch_page(query, params, page_size)
+
+@profiled
+@cached_query
+def count_transactions(user_id, start_date=None, end_date=None):
+    clause, params = _transaction_range_filter(user_id, start_date, end_date)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM transactions t
+            WHERE {clause} AND t.category_id IS NOT NULL
+              AND t.category_id NOT IN (SELECT id FROM categories WHERE deleted_at IS NOT NULL)
+        """, params)
+        return cursor.fetchone()[0]
+
+@profiled
 def get_transaction_by_id(transaction_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT category_id, amount, transaction_date, note FROM transactions WHERE id = ?", (transaction_id,))
-    transaction = cursor.fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT category_id, {MINOR_TO_AMOUNT.format('amount_minor')}, {DAY_TO_DATE.format('day')}, note
+            FROM transactions WHERE id = ?
+        """, (transaction_id,))
+        transaction = cursor.fetchone()
     return tuple(transaction) if transaction else None
 
+# --- Recurring Transactions ---
+# Date of occurrence number n of a rule, always counted from start_date so
+# monthly rules on the 29th-31st clamp to short months without drifting.
+_OCCURRENCE_DATE = """
+    CASE {rule}.frequency
+        WHEN 'weekly' THEN date({rule}.start_date, '+' || (7 * ({n})) || ' days')
+        ELSE MIN(date({rule}.start_date, 'start of month', '+' || ({n}) || ' months',
+                      '+' || (CAST(strftime('%d', {rule}.start_date) AS INTEGER) - 1) || ' days'),
+                 date({rule}.start_date, 'start of month', '+' || ({n} + 1) || ' months', '-1 day'))
+    END
+"""
+
+RECURRING_FREQUENCIES = ('monthly', 'weekly')
+
+@profiled
+def add_recurring_rule(user_id, category_id, amount, start_date, frequency='monthly', note=None, end_date=None):
+    if frequency not in RECURRING_FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    rule_id = run_write(lambda conn: conn.execute("""
+        INSERT INTO recurring_rules (user_id, category_id, amount, note, frequency, start_date, end_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (user_id, category_id, amount, note, frequency, start_date, end_date)).lastrowid)
+    bump_user_version(user_id)
+    return rule_id
+
+@profiled
+@cached_query
+def get_recurring_rules(user_id):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.id, r.category_id, c.category_name, r.amount, r.frequency, r.start_date, r.end_date, r.note
+            FROM recurring_rules r
+            JOIN categories c ON r.category_id = c.id AND c.deleted_at IS NULL
+            WHERE r.user_id = ?
+            ORDER BY r.start_date, r.id
+        """, (user_id,))
+        rules = cursor.fetchall()
+    return [tuple(row) for row in rules]
+
+@profiled
+def delete_recurring_rule(rule_id):
+    """Stop a rule; transactions it already created are kept."""
+    owner = run_write(lambda conn: conn.execute(
+        "DELETE FROM recurring_rules WHERE id = ? RETURNING user_id", (rule_id,)).fetchone())
+    if owner:
+        bump_user_version(owner[0])
+
+@profiled
+def materialize_recurring_transactions(today=None, user_id=None):
+    """Create the transactions for every recurring occurrence due on or before today.
+
+    All rules (or one user's) are caught up in a single write transaction:
+    a recursive CTE generates each rule's missing occurrence dates, one
+    INSERT ... SELECT creates the transactions and the rules' next_index
+    watermarks move past them. The unique (recurring_rule_id,
+    occurrence_day) index makes overlapping runs harmless. Returns the
+    number of transactions created.
+    """
+    today = str(today or datetime.date.today())
+    rule_filter, params = ("AND r.user_id = ?", [user_id]) if user_id is not None else ("", [])
+
+    def write(conn):
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS temp.due_occurrences")
+        cursor.execute(f"""
+            CREATE TEMP TABLE due_occurrences AS
+            WITH RECURSIVE due (rule_id, n, occurrence_date) AS (
+                SELECT r.id, r.next_index, {_OCCURRENCE_DATE.format(rule='r', n='r.next_index')}
+                FROM recurring_rules r
+                WHERE r.category_id NOT IN (SELECT id FROM categories WHERE deleted_at IS NOT NULL)
+                  AND r.user_id NOT IN (SELECT id FROM users WHERE deleted_at IS NOT NULL) {rule_filter}
+                UNION ALL
+                SELECT d.rule_id, d.n + 1, {_OCCURRENCE_DATE.format(rule='r', n='d.n + 1')}
+                FROM due d JOIN recurring_rules r ON r.id = d.rule_id
+                WHERE d.occurrence_date <= ? AND (r.end_date IS NULL OR d.occurrence_date <= r.end_date)
+            )
+            SELECT d.rule_id, d.n, d.occurrence_date
+            FROM due d JOIN recurring_rules r ON r.id = d.rule_id
+            WHERE d.occurrence_date <= ? AND (r.end_date IS NULL OR d.occurrence_date <= r.end_date)
+        """, params + [today, today])
+        cursor.execute(f"""
+            INSERT INTO transactions (user_id, category_id, amount_minor, day, note, recurring_rule_id, occurrence_day)
+            SELECT r.user_id, r.category_id, {AMOUNT_TO_MINOR.format('r.amount')}, d.occurrence_day, r.note, r.id,
+                   d.occurrence_day
+            FROM (SELECT rule_id, {DATE_TO_DAY.format('occurrence_date')} AS occurrence_day FROM due_occurrences) d
+            JOIN recurring_rules r ON r.id = d.rule_id
+            ORDER BY d.occurrence_day
+            ON CONFLICT (recurring_rule_id, occurrence_day) WHERE recurring_rule_id IS NOT NULL DO NOTHING
+        """)
+        created = cursor.rowcount
+        cursor.execute("""
+            UPDATE recurring_rules
+            SET next_index = (SELECT MAX(n) + 1 FROM due_occurrences WHERE rule_id = recurring_rules.id)
+            WHERE id IN (SELECT rule_id FROM due_occurrences)
+        """)
+        cursor.execute("""
+            SELECT DISTINCT r.user_id FROM due_occurrences d JOIN recurring_rules r ON r.id = d.rule_id
+        """)
+        affected_users = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DROP TABLE temp.due_occurrences")
+        return created, affected_users
+
+    created, affected_users = run_write(write)
+    for affected_user in affected_users:
+        bump_user_version(affected_user)
+    return created
+
 # --- Budget Management ---
+BUDGET_UPSERT = """
+    INSERT INTO budgets (user_id, category_id, budget_amount, month, year)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, category_id, month, year) DO UPDATE
+    SET budget_amount = excluded.budget_amount
+    WHERE budget_amount != excluded.budget_amount
+"""
+
+@profiled
 def set_budget(user_id, category_id, month, year, amount):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO budgets (user_id, category_id, budget_amount, month, year)
-        VALUES (?, ?, ?, ?, ?)
-    """, (user_id, category_id, amount, month, year))
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.execute(BUDGET_UPSERT, (user_id, category_id, amount, month, year)))
+    bump_user_version(user_id)
+
+@profiled
+def set_budgets_bulk(user_id, month, year, amounts):
+    """Upsert {category_id: amount} budgets for one month in one transaction.
 
+    Existing rows keep their id and are only rewritten when the amount
+    changed. Returns the number of rows inserted or updated.
+    """
+    def write(conn):
+        changes_before = conn.total_changes
+        conn.executemany(BUDGET_UPSERT, [(user_id, category_id, amount, month, year)
+                                         for category_id, amount in amounts.items()])
+        return conn.total_changes - changes_before
+
+    changed = run_write(write)
+    if changed:
+        bump_user_version(user_id)
+    return changed
+
+@profiled
+def copy_budgets(user_id, from_month, from_year, to_month, to_year, months=1, overwrite=False):
+    """Copy every budget of from_month/from_year to `months` consecutive months starting at to_month/to_year.
+
+    Runs as a single INSERT ... SELECT over a recursive CTE of target months.
+    Budgets already set in a target month are kept unless overwrite is true.
+    Returns the number of rows inserted or updated.
+    """
+    def write(conn):
+        changes_before = conn.total_changes
+        conn.execute("""
+            WITH RECURSIVE targets (n, month, year) AS (
+                SELECT 1, ?, ?
+                UNION ALL
+                SELECT n + 1,
+                       CASE WHEN month = 12 THEN 1 ELSE month + 1 END,
+                       CASE WHEN month = 12 THEN year + 1 ELSE year END
+                FROM targets WHERE n < ?
+            )
+            INSERT INTO budgets (user_id, category_id, budget_amount, month, year)
+            SELECT b.user_id, b.category_id, b.budget_amount, t.month, t.year
+            FROM budgets b CROSS JOIN targets t
+            WHERE b.user_id = ? AND b.month = ? AND b.year = ?
+              AND NOT (t.month = b.month AND t.year = b.year)
+            ON CONFLICT (user_id, category_id, month, year) DO UPDATE
+            SET budget_amount = excluded.budget_amount
+            WHERE ? AND budget_amount != excluded.budget_amount
+        """, (to_month, to_year, months, user_id, from_month, from_year, bool(overwrite)))
+        return conn.total_changes - changes_before
+
+    changed = run_write(write)
+    if changed:
+        bump_user_version(user_id)
+    return changed
+
+@profiled
+@cached_query
 def get_budgets_for_month(user_id, month, year):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT b.id, b.user_id, b.budget_amount, b.category_id, c.category_name
-        FROM budgets b
-        JOIN categories c ON b.category_id = c.id
-        WHERE b.user_id = ? AND b.month = ? AND b.year = ?
-    """, (user_id, month, year))
-    budgets = cursor.fetchall()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT b.id, b.user_id, b.budget_amount, b.category_id, c.category_name
+            FROM budgets b
+            JOIN categories c ON b.category_id = c.id AND c.deleted_at IS NULL
+            WHERE b.user_id = ? AND b.month = ? AND b.year = ?
+        """, (user_id, month, year))
+        budgets = cursor.fetchall()
     return [tuple(row) for row in budgets]
 
+@profiled
+@cached_query
 def get_total_spent_per_category(user_id, month, year):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT c.id, c.category_name, SUM(t.amount) as total_spent
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.user_id = ? AND c.category_type = 'expense'
-        AND strftime('%m', t.transaction_date) = ? AND strftime('%Y', t.transaction_date) = ?
-        GROUP BY c.id
-    """, (user_id, f'{month:02}', str(year)))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT c.id, c.category_name, {MINOR_TO_AMOUNT.format('m.total_minor')} as total_spent
+            FROM monthly_category_totals m
+            JOIN categories c ON m.category_id = c.id AND c.deleted_at IS NULL
+            WHERE m.user_id = ? AND m.year = ? AND m.month = ? AND c.category_type = 'expense'
+        """, (user_id, year, month))
     
-    spent_data = cursor.fetchall()
-    conn.close()
+        spent_data = cursor.fetchall()
     return [tuple(row) for row in spent_data]
 
 # --- Dashboard Data ---
+def _month_index(date):
+    return date.year * 12 + date.month - 1
+
+def split_full_months(start_date, end_date):
+    """Split a half-open [start, end) range into raw edges and whole months.
+
+    Returns (head, tail, months): head and tail are ISO date ranges that must
+    be read from raw transactions, months is a half-open range of
+    year * 12 + month - 1 indexes that the monthly rollup can serve.
+    """
+    start = datetime.date.fromisoformat(str(start_date)[:10])
+    end = datetime.date.fromisoformat(str(end_date)[:10])
+    first_full = start if start.day == 1 else (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    last_full = end.replace(day=1)
+    if first_full >= last_full:
+        return (start.isoformat(), end.isoformat()), (end.isoformat(), end.isoformat()), (0, 0)
+    return ((start.isoformat(), first_full.isoformat()),
+            (last_full.isoformat(), end.isoformat()),
+            (_month_index(first_full), _month_index(last_full)))
+
+def summary_query(user_id, start_date, end_date):
+    """Build the (sql, params) for per-type totals over a half-open date range."""
+    head, tail, months = split_full_months(start_date, end_date)
+    # Summed in minor units and converted once, so totals are exact.
+    query = f"""
+        SELECT category_type, {MINOR_TO_AMOUNT.format('SUM(total_minor)')} as total
+        FROM (
+            SELECT c.category_type, t.amount_minor AS total_minor
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.id AND c.deleted_at IS NULL
+            WHERE t.user_id = ? AND t.day >= ? AND t.day < ?
+            UNION ALL
+            SELECT c.category_type, t.amount_minor AS total_minor
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.id AND c.deleted_at IS NULL
+            WHERE t.user_id = ? AND t.day >= ? AND t.day < ?
+            UNION ALL
+            SELECT c.category_type, m.total_minor
+            FROM monthly_category_totals m
+            JOIN categories c ON m.category_id = c.id AND c.deleted_at IS NULL
+            WHERE m.user_id = ? AND m.year * 12 + m.month - 1 >= ? AND m.year * 12 + m.month - 1 < ?
+        )
+        GROUP BY category_type
+    """
+    return query, (user_id, *map(to_day, head), user_id, *map(to_day, tail), user_id, *months)
+
+@profiled
+@cached_query
 def fetch_summary_data(user_id, start_date, end_date):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT c.category_type, SUM(t.amount) as total
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.user_id = ? AND t.transaction_date BETWEEN ? AND ?
-        GROUP BY c.category_type
-    """, (user_id, start_date, end_date))
-    data = cursor.fetchall()
-    conn.close()
-    return [tuple(row) for row in data]
\ No newline at end of file
+    query, params = summary_query(user_id, start_date, end_date)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        data = cursor.fetchall()
+    return [tuple(row) for row in data]
+
+@profiled
+@cached_query
+def get_dashboard_snapshot(user_id, start_date, end_date, month, year):
+    """Return everything the Dashboard shows, read in a single transaction.
+
+    The result is a dict with 'totals' (category_type -> total over the
+    half-open [start_date, end_date) range) and 'budgets', a list of
+    (category_id, category_name, budget_amount, spent) for every budget set
+    in month/year, with spent = 0 where nothing has been spent yet.
+    """
+    query, params = summary_query(user_id, start_date, end_date)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        # A read transaction gives both queries the same snapshot of the data.
+        cursor.execute("BEGIN")
+        cursor.execute(query, params)
+        totals = {category_type: total for category_type, total in cursor.fetchall()}
+        cursor.execute(f"""
+            SELECT b.category_id, c.category_name, b.budget_amount,
+                   {MINOR_TO_AMOUNT.format('COALESCE(m.total_minor, 0)')} as spent
+            FROM budgets b
+            JOIN categories c ON b.category_id = c.id AND c.deleted_at IS NULL
+            LEFT JOIN monthly_category_totals m
+                ON m.user_id = b.user_id AND m.category_id = b.category_id
+                AND m.year = b.year AND m.month = b.month
+            WHERE b.user_id = ? AND b.month = ? AND b.year = ?
+            ORDER BY c.category_name
+        """, (user_id, month, year))
+        budgets = [tuple(row) for row in cursor.fetchall()]
+        conn.commit()
+    return {'totals': totals, 'budgets': budgets}
+
+# --- Purging Soft-Deleted Data ---
+PURGE_BATCH_SIZE = 5000
+
+def _purge_in_batches(delete_batch, params, batch_size, pause):
+    """Run delete_batch (a DELETE limited to ? rows) in separate short write transactions until nothing is left."""
+    purged = 0
+    while True:
+        deleted = run_write(lambda conn: conn.execute(delete_batch, (*params, batch_size)).rowcount)
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+        # Let queued writes and other processes' writers in between batches.
+        time.sleep(pause)
+
+def pending_purges():
+    """Return ([category ids], [user ids]) that are soft-deleted but not yet purged."""
+    with get_db_connection() as conn:
+        categories = [row[0] for row in conn.execute("SELECT id FROM categories WHERE deleted_at IS NOT NULL")]
+        users = [row[0] for row in conn.execute("SELECT id FROM users WHERE deleted_at IS NOT NULL")]
+    return categories, users
+
+@profiled
+def purge_deleted(batch_size=PURGE_BATCH_SIZE, pause=0.01):
+    """Permanently remove soft-deleted categories and accounts, batch_size transactions at a time.
+
+    Transactions go first, in short write transactions, so the rollup and
+    search triggers keep derived tables consistent without holding the
+    write lock for long. Once a category or user has no transactions left,
+    deleting the row itself cascades to budgets, recurring rules and
+    rollup rows. Returns the number of transactions purged.
+    """
+    purged = 0
+    categories, users = pending_purges()
+    for category_id in categories:
+        purged += _purge_in_batches(
+            "DELETE FROM transactions WHERE id IN (SELECT id FROM transactions WHERE category_id = ? LIMIT ?)",
+            (category_id,), batch_size, pause)
+        owner = run_write(lambda conn: conn.execute(
+            "DELETE FROM categories WHERE id = ? AND deleted_at IS NOT NULL RETURNING user_id",
+            (category_id,)).fetchone())
+        if owner:
+            bump_user_version(owner[0])
+    for user_id in users:
+        purged += _purge_in_batches(
+            "DELETE FROM transactions WHERE id IN (SELECT id FROM transactions WHERE user_id = ? LIMIT ?)",
+            (user_id,), batch_size, pause)
+        run_write(lambda conn: conn.execute("DELETE FROM users WHERE id = ? AND deleted_at IS NOT NULL", (user_id,)))
+        bump_user_version(user_id)
+    return purged
+
+# --- Rollup Maintenance ---
+@profiled
+def rebuild_monthly_totals():
+    """Recompute the monthly_category_totals rollup from raw transactions."""
+    def write(conn):
+        conn.execute("DELETE FROM monthly_category_totals")
+        conn.execute(MONTHLY_TOTALS_BACKFILL)
+    run_write(write)
+    clear_cache()
+
+@profiled
+def verify_monthly_totals():
+    """Return rollup rows that disagree with raw transactions.
+
+    Totals are integer minor units, so they must match exactly. Each
+    mismatch is (user_id, category_id, year, month, rollup_total,
+    raw_total, rollup_count, raw_count).
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            WITH raw (user_id, category_id, year, month, total_minor, count) AS (
+                SELECT user_id, category_id,
+                       CAST(strftime('%Y', day * 86400, 'unixepoch') AS INTEGER),
+                       CAST(strftime('%m', day * 86400, 'unixepoch') AS INTEGER),
+                       SUM(amount_minor), COUNT(*)
+                FROM transactions
+                WHERE category_id IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            ),
+            keys AS (
+                SELECT user_id, category_id, year, month FROM raw
+                UNION
+                SELECT user_id, category_id, year, month FROM monthly_category_totals
+            )
+            SELECT k.user_id, k.category_id, k.year, k.month,
+                   {MINOR_TO_AMOUNT.format('m.total_minor')}, {MINOR_TO_AMOUNT.format('r.total_minor')},
+                   m.count, r.count
+            FROM keys k
+            LEFT JOIN raw r USING (user_id, category_id, year, month)
+            LEFT JOIN monthly_category_totals m USING (user_id, category_id, year, month)
+            WHERE m.count IS NOT r.count OR m.total_minor IS NOT r.total_minor
+        """)
+        mismatches = cursor.fetchall()
+    return [tuple(row) for row in mismatches]
@@ -0,0 +1,115 @@
+"""Streaming exports of transaction history and categories.
+
+write_export() sends rows straight from a SQLite cursor to the output file
+in fetchmany chunks, so at most one chunk of rows is in memory whatever the
+size of the history; `python -m setup.manage export` uses it. The page
+downloads are returned as bytes, because st.download_button keeps the whole
+file in memory, so transaction downloads are capped at DOWNLOAD_MAX_ROWS.
+CSV and gzip-compressed CSV use the csv module; Parquet is written one row
+group per chunk with pyarrow, which is imported only when a Parquet export
+is requested.
+"""
+import csv
+import datetime
+import gzip
+import io
+import os
+
+from setup.db import get_db_connection, transaction_history_query
+from setup.profiling import profiled
+
+# label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+TRANSACTION_EXPORT_COLUMNS = [('ID', 'int'), ('Date', 'date'), ('Category', 'string'),
+                              ('Type', 'string'), ('Amount', 'float'), ('Note', 'string')]
+CATEGORY_EXPORT_COLUMNS = [('ID', 'int'), ('Category Name', 'string'), ('Category Type', 'string')]
+CATEGORY_EXPORT_QUERY = "SELECT id, category_name, category_type FROM categories WHERE user_id = ? AND deleted_at IS NULL ORDER BY category_name ASC"
+
+EXPORT_CHUNK_SIZE = 10000
+GZIP_LEVEL = 6
+# Larger transaction exports are left to the command line.
+DOWNLOAD_MAX_ROWS = int(os.environ.get('BUDGET_TRACKER_DOWNLOAD_MAX_ROWS', '200000'))
+
+
+def iter_chunks(query, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of plain row tuples, at most chunk_size at a time."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+def _write_csv(file, chunks, columns, compress):
+    raw = gzip.GzipFile(fileobj=file, mode='wb', compresslevel=GZIP_LEVEL) if compress else file
+    text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(text)
+        writer.writerow([name for name, _ in columns])
+        for rows in chunks:
+            writer.writerows(rows)
+    finally:
+        # Detach instead of closing so the caller's file stays open.
+        text.flush()
+        text.detach()
+        if compress:
+            raw.close()
+
+
+def _write_parquet(file, chunks, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'int': pa.int64(), 'float': pa.float64(), 'string': pa.string(), 'date': pa.date32()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    with pq.ParquetWriter(file, schema) as writer:
+        for rows in chunks:
+            arrays = []
+            for (_, kind), values in zip(columns, zip(*rows)):
+                if kind == 'date':
+                    values = [datetime.date.fromisoformat(value) for value in values]
+                arrays.append(pa.array(values, type=types[kind]))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def write_export(file, export_format, query, params, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream the rows of query into the binary file object in export_format."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    chunks = iter_chunks(query, params, chunk_size)
+    if export_format == 'Parquet':
+        _write_parquet(file, chunks, columns)
+    else:
+        _write_csv(file, chunks, columns, compress=export_format == 'CSV (gzip)')
+
+
+def _export_bytes(query, params, columns, export_format):
+    with io.BytesIO() as file:
+        write_export(file, export_format, query, params, columns)
+        return file.getvalue()
+
+
+@profiled
+def export_transactions(user_id, start_date=None, end_date=None, export_format='CSV'):
+    """Export transaction history for the half-open [start_date, end_date) range as bytes."""
+    query, params = transaction_history_query(user_id, start_date, end_date)
+    return _export_bytes(query, params, TRANSACTION_EXPORT_COLUMNS, export_format)
+
+
+@profiled
+def export_categories(user_id, export_format='CSV'):
+    """Export the user's categories as bytes."""
+    return _export_bytes(CATEGORY_EXPORT_QUERY, (user_id,), CATEGORY_EXPORT_COLUMNS, export_format)
+
+
+def export_file_name(stem, export_format):
+    return f"{stem}.{EXPORT_FORMATS[export_format][0]}"
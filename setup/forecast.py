@@ -0,0 +1,163 @@
+"""Month-end spend forecasts for every expense category at once, from spend-curve pace and seasonality."""
+import datetime
+
+import numpy as np
+
+from setup.cache import cached_query
+from setup.db import MINOR_UNITS, get_db_connection, to_day
+from setup.profiling import profiled
+
+HISTORY_MONTHS = 3
+SEASON_YEARS = 10
+MAX_MONTH_DAYS = 31
+
+
+def _month_start(index):
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _positions(category_ids, cats):
+    """Map category ids to row positions in category_ids; returns (positions, known mask)."""
+    order = np.argsort(category_ids)
+    found = np.minimum(np.searchsorted(category_ids, cats, sorter=order), len(category_ids) - 1)
+    positions = order[found]
+    return positions, category_ids[positions] == cats
+
+
+def daily_spend_cube(category_ids, rows, first_month, months):
+    """Sum (category_id, day, amount_minor) transactions into a (categories, months, 31) array.
+
+    Month 0 is the month index first_month (year * 12 + month - 1); rows for
+    unknown categories or outside the months are dropped.
+    """
+    shape = (len(category_ids), months, MAX_MONTH_DAYS)
+    if not rows or not len(category_ids):
+        return np.zeros(shape, dtype=np.int64)
+    cats, days, amounts = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    positions, known = _positions(category_ids, cats)
+    dates = days.astype('datetime64[D]')
+    month_starts = dates.astype('datetime64[M]')
+    month = month_starts.astype(np.int64) + 1970 * 12 - first_month
+    day_of_month = (dates - month_starts).astype(np.int64)
+    keep = known & (month >= 0) & (month < months)
+    flat = np.ravel_multi_index((positions[keep], month[keep], day_of_month[keep]), shape)
+    # float64 weights are exact for any realistic sum of minor units.
+    return np.bincount(flat, weights=amounts[keep], minlength=np.prod(shape)).astype(np.int64).reshape(shape)
+
+
+def seasonal_factor(windows):
+    """Return per-category seasonal factors from a (categories, years, 1 + months) array.
+
+    windows[:, k - 1] holds, for k years before the target, the total of
+    the target's calendar month followed by the totals of the months just
+    before it. The factor is that month over the average preceding month,
+    pooled over the years where the preceding months had any spend;
+    categories without such a year get 1.0.
+    """
+    month, before = windows[:, :, 0].astype(np.float64), windows[:, :, 1:].mean(axis=2)
+    observed = before > 0
+    pooled = (before * observed).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(pooled > 0, (month * observed).sum(axis=1) / pooled, 1.0)
+
+
+def project_month_end(cube, days_elapsed, days_in_month, expected):
+    """Project month-end totals from a (categories, history + 1, 31) cube whose last month is the target.
+
+    Returns (spent, projected) arrays in minor units.
+    """
+    history, current = cube[:, :-1], cube[:, -1]
+    spent = current[:, :days_elapsed].sum(axis=1).astype(np.float64)
+    if days_elapsed >= days_in_month:
+        return spent, spent
+    if days_elapsed == 0:
+        return spent, spent + expected
+    to_date = history[:, :, :days_elapsed].sum(axis=(1, 2))
+    whole = history.sum(axis=(1, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = np.where(whole > 0, to_date / whole, days_elapsed / days_in_month)
+    # Guard against curves that say the month was already over by now.
+    share = np.clip(share, days_elapsed / (days_in_month * 4), 1.0)
+    # Blend the pace-implied total (spent / share) with the seasonal
+    # expectation, weighted by share; share * (spent / share) is just spent.
+    blended = spent + (1 - share) * expected
+    return spent, spent + (1 - share) * blended
+
+
+@cached_query
+def _forecast(user_id, month, year, today):
+    target = year * 12 + month - 1
+    # A future month is forecast from the months before the current one.
+    anchor = min(target, today.year * 12 + today.month - 1)
+    first = anchor - HISTORY_MONTHS
+    month_start = _month_start(target)
+    days_in_month = (_month_start(target + 1) - month_start).days
+    days_elapsed = min(max((today - month_start).days + 1, 0), days_in_month)
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # One read transaction keeps the four reads consistent.
+        cursor.execute("BEGIN")
+        categories = cursor.execute("""
+            SELECT id, category_name FROM categories
+            WHERE user_id = ? AND category_type = 'expense' AND deleted_at IS NULL
+            ORDER BY category_name
+        """, (user_id,)).fetchall()
+        # Summed by np.bincount below, which is cheaper than a GROUP BY here.
+        daily = cursor.execute("""
+            SELECT category_id, day, amount_minor FROM transactions
+            WHERE user_id = ? AND day >= ? AND day < ?
+        """, (user_id, to_day(_month_start(first)), to_day(_month_start(anchor + 1)))).fetchall()
+        # Only the target's calendar month and the HISTORY_MONTHS before it,
+        # in each earlier year.
+        monthly = cursor.execute("""
+            SELECT category_id, ? - (year * 12 + month - 1), total_minor FROM monthly_category_totals
+            WHERE user_id = ? AND year * 12 + month - 1 BETWEEN ? AND ?
+              AND (? - (year * 12 + month - 1)) % 12 <= ?
+        """, (target, user_id, target - 12 * SEASON_YEARS - HISTORY_MONTHS, target - 12,
+              target, HISTORY_MONTHS)).fetchall()
+        budgets = dict(cursor.execute(
+            "SELECT category_id, budget_amount FROM budgets WHERE user_id = ? AND month = ? AND year = ?",
+            (user_id, month, year)).fetchall())
+        conn.commit()
+
+    category_ids = np.array([category_id for category_id, _ in categories], dtype=np.int64)
+    cube = daily_spend_cube(category_ids, daily, first, HISTORY_MONTHS + 1)
+    if anchor != target:
+        cube[:, -1] = 0
+
+    # windows[c, k - 1, j]: total j months before the target's calendar month, k years back.
+    windows = np.zeros((len(category_ids), SEASON_YEARS, HISTORY_MONTHS + 1), dtype=np.int64)
+    if monthly and len(category_ids):
+        cats, months_back, totals = (np.array(column, dtype=np.int64) for column in zip(*monthly))
+        positions, known = _positions(category_ids, cats)
+        years_back, offset = np.divmod(months_back[known], 12)
+        windows[positions[known], years_back - 1, offset] = totals[known]
+    recent = cube[:, :-1].sum(axis=2).mean(axis=1)
+    expected = recent * seasonal_factor(windows)
+
+    spent, projected = project_month_end(cube, days_elapsed, days_in_month, expected)
+    budget = np.array([budgets.get(category_id, 0.0) or 0.0 for category_id, _ in categories], dtype=np.float64)
+    spent, projected = spent / MINOR_UNITS, np.round(projected) / MINOR_UNITS
+    overshoot = (budget > 0) & (projected > budget)
+    return {
+        'days_elapsed': days_elapsed,
+        'days_in_month': days_in_month,
+        'categories': [
+            (int(category_id), name, float(budget[i]), float(spent[i]), float(projected[i]), bool(overshoot[i]))
+            for i, (category_id, name) in enumerate(categories)
+        ],
+    }
+
+
+@profiled
+def forecast_month_end(user_id, month, year, today=None):
+    """Forecast month-end expense spend per category for month/year as of today.
+
+    Returns a dict with 'days_elapsed', 'days_in_month' and
+    'categories': a list of (category_id, category_name, budget, spent,
+    projected, overshoot) for every expense category, where budget is 0.0
+    when none is set and overshoot is true when projected exceeds a budget.
+    """
+    return _forecast(user_id, month, year, today or datetime.date.today())
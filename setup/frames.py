@@ -0,0 +1,159 @@
+"""Columnar read path that builds typed DataFrames straight from SQLite.
+
+Rows are fetched as plain tuples (no sqlite3.Row objects), transposed once
+into per-column sequences and converted to NumPy-backed columns: stored
+day numbers become datetime64 and minor-unit amounts float64 with one
+array operation each (ISO dates from computed periods are parsed once),
+and repeated labels such as category names and types become pandas
+categoricals. Frames shown in st.data_editor keep category names as plain
+strings and give types every CATEGORY_TYPES value as a category, since
+the editor writes edited values into a copy that keeps the dtype. Column
+names live here instead of being repeated on every page.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from setup.cache import cached_query
+from setup.db import (
+    CATEGORY_TYPES,
+    MINOR_UNITS,
+    get_db_connection,
+    split_page,
+    summary_query,
+    transaction_history_query,
+    transaction_search_query
+)
+from setup.profiling import profiled
+
+TRANSACTION_COLUMNS = [('ID', 'int'), ('Date', 'day'), ('Category', 'category'),
+                       ('Type', 'category'), ('Amount', 'minor'), ('Note', 'object')]
+# Editable pages of TRANSACTION_COLUMNS.
+TRANSACTION_PAGE_COLUMNS = [('ID', 'int'), ('Date', 'day'), ('Category', 'object'),
+                            ('Type', 'type'), ('Amount', 'minor'), ('Note', 'object')]
+CATEGORY_COLUMNS = [('ID', 'int'), ('Category Name', 'object'), ('Category Type', 'type')]
+BUDGET_COLUMNS = [('Category ID', 'int'), ('Category', 'object'), ('Budget', 'float')]
+SPENT_COLUMNS = [('ID', 'int'), ('Category', 'object'), ('Spent', 'minor')]
+SUMMARY_COLUMNS = [('Type', 'category'), ('Total', 'float')]
+
+FETCH_CHUNK_SIZE = 50000
+
+
+def _column(values, kind):
+    if kind == 'int':
+        return np.array(values, dtype=np.int64)
+    if kind == 'float':
+        return np.array(values, dtype=np.float64)
+    if kind == 'minor':
+        return np.array(values, dtype=np.int64) / MINOR_UNITS
+    if kind == 'day':
+        # Day numbers count from 1970-01-01, which is datetime64's epoch.
+        return pd.to_datetime(np.array(values, dtype=np.int64).astype('datetime64[D]'))
+    if kind == 'date':
+        # ISO 'YYYY-MM-DD' strings parse in C when cast to datetime64[D].
+        return pd.to_datetime(np.array(values, dtype='datetime64[D]'))
+    if kind == 'category':
+        return pd.Categorical(values)
+    if kind == 'type':
+        return pd.Categorical(values, categories=CATEGORY_TYPES)
+    return np.array(values, dtype=object)
+
+
+def _concat(parts, kind):
+    if kind == 'category':
+        return union_categoricals(parts) if len(parts) > 1 else parts[0]
+    if kind == 'type':
+        return pd.Categorical(np.concatenate([np.asarray(part) for part in parts]), categories=CATEGORY_TYPES)
+    if kind in ('date', 'day'):
+        return parts[0].append(parts[1:]) if len(parts) > 1 else parts[0]
+    return np.concatenate(parts)
+
+
+def read_frame(query, params, columns, chunk_size=FETCH_CHUNK_SIZE):
+    """Run query and return a DataFrame typed according to columns, a list of (name, kind).
+
+    Rows are converted chunk by chunk so at most chunk_size row tuples are
+    alive at once, however large the result is.
+    """
+    parts = [[] for _ in columns]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for part, (_, kind), values in zip(parts, columns, zip(*rows)):
+                part.append(_column(values, kind))
+            del rows
+    if not parts[0]:
+        parts = [[_column((), kind)] for _, kind in columns]
+    return pd.DataFrame({name: _concat(part, kind) for (name, kind), part in zip(columns, parts)})
+
+
+@profiled
+@cached_query
+def transactions_frame(user_id, start_date=None, end_date=None):
+    query, params = transaction_history_query(user_id, start_date, end_date, raw=True)
+    return read_frame(query, params, TRANSACTION_COLUMNS)
+
+
+@profiled
+@cached_query
+def transaction_page_frame(user_id, start_date=None, end_date=None, page_size=50, after=None):
+    """Columnar counterpart of db.fetch_transaction_page: returns (frame, next_cursor)."""
+    query, params = transaction_history_query(user_id, start_date, end_date, page_size + 1, after, raw=True)
+    return split_page(read_frame(query, params, TRANSACTION_PAGE_COLUMNS), page_size, _frame_cursor)
+
+
+@profiled
+@cached_query
+def transaction_search_frame(user_id, text=None, category_ids=(), category_type=None, min_amount=None,
+                             max_amount=None, start_date=None, end_date=None, page_size=50, after=None):
+    """Columnar counterpart of db.search_transactions: returns (frame, next_cursor)."""
+    query, params = transaction_search_query(user_id, text, category_ids, category_type, min_amount,
+                                             max_amount, start_date, end_date, page_size + 1, after, raw=True)
+    return split_page(read_frame(query, params, TRANSACTION_PAGE_COLUMNS), page_size, _frame_cursor)
+
+
+def _frame_cursor(df):
+    last = df.iloc[-1]
+    return last['Date'].strftime('%Y-%m-%d'), int(last['ID'])
+
+
+@profiled
+@cached_query
+def categories_frame(user_id):
+    return read_frame(
+        "SELECT id, category_name, category_type FROM categories WHERE user_id = ? AND deleted_at IS NULL ORDER BY category_name ASC",
+        (user_id,), CATEGORY_COLUMNS)
+
+
+@profiled
+@cached_query
+def budgets_frame(user_id, month, year):
+    return read_frame("""
+        SELECT b.category_id, c.category_name, b.budget_amount
+        FROM budgets b
+        JOIN categories c ON b.category_id = c.id AND c.deleted_at IS NULL
+        WHERE b.user_id = ? AND b.month = ? AND b.year = ?
+    """, (user_id, month, year), BUDGET_COLUMNS)
+
+
+@profiled
+@cached_query
+def spent_per_category_frame(user_id, month, year):
+    return read_frame("""
+        SELECT c.id, c.category_name, m.total_minor
+        FROM monthly_category_totals m
+        JOIN categories c ON m.category_id = c.id AND c.deleted_at IS NULL
+        WHERE m.user_id = ? AND m.year = ? AND m.month = ? AND c.category_type = 'expense'
+    """, (user_id, year, month), SPENT_COLUMNS)
+
+
+@profiled
+@cached_query
+def summary_frame(user_id, start_date, end_date):
+    query, params = summary_query(user_id, start_date, end_date)
+    return read_frame(query, params, SUMMARY_COLUMNS)
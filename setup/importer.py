@@ -0,0 +1,124 @@
+"""Streaming parsers for bank-statement style CSV and Excel imports.
+
+Files are read row by row and handed to db.import_transactions in fixed-size
+chunks, so memory use depends on the chunk size rather than the file size.
+The expected columns match the Transactions page CSV export: Date,
+Category, Amount and optionally Type and Note (matched case-insensitively).
+Without a Type, a new category is created as an expense for a negative
+amount and as income for a positive one. Files that cannot be decoded or
+opened raise ImportFormatError like any other malformed file.
+"""
+import csv
+import datetime
+import io
+import zipfile
+
+from setup.db import CATEGORY_TYPES, import_transactions
+
+REQUIRED_COLUMNS = ('date', 'category', 'amount')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _column_positions(header):
+    positions = {str(name).strip().lower(): i for i, name in enumerate(header) if name is not None}
+    missing = [name for name in REQUIRED_COLUMNS if name not in positions]
+    if missing:
+        raise ImportFormatError(f"Missing required column(s): {', '.join(missing)}")
+    return positions
+
+
+def _iter_csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='') if not isinstance(file, io.TextIOBase) else file
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError as e:
+        raise ImportFormatError("The file is not UTF-8 text; save it as UTF-8 CSV and try again.") from e
+    except csv.Error as e:
+        raise ImportFormatError(f"The file is not valid CSV: {e}") from e
+
+
+def _iter_excel_rows(file):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as e:
+        raise ImportFormatError(f"The file is not a readable Excel workbook: {e}") from e
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    except (zipfile.BadZipFile, KeyError, SyntaxError) as e:
+        # SyntaxError covers malformed sheet XML (xml.etree's ParseError).
+        raise ImportFormatError(f"The workbook is damaged: {e}") from e
+    finally:
+        workbook.close()
+
+
+def _parse_row(row, positions):
+    def cell(name):
+        i = positions.get(name)
+        return row[i] if i is not None and i < len(row) else None
+
+    raw_date = cell('date')
+    if isinstance(raw_date, (datetime.date, datetime.datetime)):
+        date = raw_date.strftime('%Y-%m-%d')
+    else:
+        date = datetime.date.fromisoformat(str(raw_date).strip()[:10]).isoformat()
+
+    category_name = str(cell('category') or '').strip()
+    if not category_name:
+        raise ValueError("empty category")
+
+    amount = float(str(cell('amount')).replace(',', '').strip())
+    category_type = str(cell('type') or '').strip().lower() or None
+    if category_type is None:
+        category_type = 'expense' if amount < 0 else 'income'
+    if category_type not in CATEGORY_TYPES:
+        raise ValueError(f"unknown type {category_type!r}")
+    amount = abs(amount)
+    if amount == 0:
+        raise ValueError("zero amount")
+
+    note = cell('note')
+    note = str(note).strip() if note not in (None, '') else None
+    return date, category_name, category_type, amount, note
+
+
+def _iter_chunks(rows, chunk_size, stats):
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("The file is empty.")
+    positions = _column_positions(header)
+    chunk = []
+    for row in rows:
+        if not any(value not in (None, '') for value in row):
+            continue
+        try:
+            chunk.append(_parse_row(row, positions))
+        except (TypeError, ValueError):
+            stats['skipped'] += 1
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_transactions_file(user_id, file, file_name, chunk_size=10000):
+    """Stream-parse a CSV or Excel file and bulk insert it for user_id.
+
+    Rows that cannot be parsed are skipped and counted rather than failing
+    the whole import.
+    """
+    if file_name.lower().endswith(('.xlsx', '.xlsm')):
+        rows = _iter_excel_rows(file)
+    else:
+        rows = _iter_csv_rows(file)
+    stats = {'skipped': 0}
+    result = import_transactions(user_id, _iter_chunks(iter(rows), chunk_size, stats))
+    result['skipped'] = stats['skipped']
+    return result
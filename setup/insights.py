@@ -0,0 +1,89 @@
+"""Aggregated data for the Insights page.
+
+All grouping happens in SQL (or in the monthly rollup), so the frames
+handed to the charts have one row per period, or one per period and
+category, however many transactions a user has.
+"""
+from setup.cache import cached_query
+from setup.frames import read_frame
+from setup.profiling import profiled
+
+GRANULARITIES = {'Daily': 'D', 'Weekly': 'W', 'Monthly': 'M'}
+
+# Income adds to the balance; expenses and money moved to savings reduce it.
+_SIGNED_AMOUNT = "CASE c.category_type WHEN 'income' THEN {amount} ELSE -{amount} END"
+
+# Periods of raw transactions are day numbers (days since 1970-01-01).
+_RAW_PERIODS = {
+    'D': "t.day",
+    # Weeks start on Monday; day 0 was a Thursday, so day + 3 counts from a Monday.
+    'W': "t.day - (t.day + 3) % 7",
+}
+_ROLLUP_PERIOD = "printf('%04d-%02d-01', m.year, m.month)"
+
+
+def _validate(freq):
+    if freq not in GRANULARITIES.values():
+        raise ValueError(f"Unknown granularity {freq!r}; expected one of {sorted(GRANULARITIES.values())}")
+
+
+@profiled
+@cached_query
+def net_balance_frame(user_id, freq='D'):
+    """Return Period, Net and running Balance with one row per period that has activity."""
+    _validate(freq)
+    if freq == 'M':
+        query = f"""
+            SELECT {_ROLLUP_PERIOD} AS period, SUM({_SIGNED_AMOUNT.format(amount='m.total_minor')})
+            FROM monthly_category_totals m
+            JOIN categories c ON m.category_id = c.id AND c.deleted_at IS NULL
+            WHERE m.user_id = ?
+            GROUP BY period
+            ORDER BY period
+        """
+    else:
+        query = f"""
+            SELECT {_RAW_PERIODS[freq]} AS period, SUM({_SIGNED_AMOUNT.format(amount='t.amount_minor')})
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.id AND c.deleted_at IS NULL
+            WHERE t.user_id = ?
+            GROUP BY period
+            ORDER BY period
+        """
+    df = read_frame(query, (user_id,), [('Period', 'date' if freq == 'M' else 'day'), ('Net', 'minor')])
+    df['Balance'] = df['Net'].cumsum()
+    return df
+
+
+@profiled
+@cached_query
+def category_spend_frame(user_id, freq='M'):
+    """Return expense totals in long form: Period, Category, Amount."""
+    _validate(freq)
+    if freq == 'M':
+        query = f"""
+            SELECT {_ROLLUP_PERIOD} AS period, c.category_name, SUM(m.total_minor)
+            FROM monthly_category_totals m
+            JOIN categories c ON m.category_id = c.id AND c.deleted_at IS NULL
+            WHERE m.user_id = ? AND c.category_type = 'expense'
+            GROUP BY period, c.id
+            ORDER BY period
+        """
+    else:
+        query = f"""
+            SELECT {_RAW_PERIODS[freq]} AS period, c.category_name, SUM(t.amount_minor)
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.id AND c.deleted_at IS NULL
+            WHERE t.user_id = ? AND c.category_type = 'expense'
+            GROUP BY period, c.id
+            ORDER BY period
+        """
+    return read_frame(query, (user_id,), [('Period', 'date' if freq == 'M' else 'day'), ('Category', 'category'),
+                                          ('Amount', 'minor')])
+
+
+def category_spend_matrix(user_id, freq='M'):
+    """Return the category-by-period spend matrix: one row per period, one column per category."""
+    df = category_spend_frame(user_id, freq)
+    return df.pivot_table(index='Period', columns='Category', values='Amount', aggfunc='sum',
+                          fill_value=0.0, observed=True)
@@ -0,0 +1,93 @@
+"""Maintenance commands for the budget tracker database.
+
+    python -m setup.manage migrate
+    python -m setup.manage rollups verify
+    python -m setup.manage rollups rebuild
+    python -m setup.manage recurring run
+    python -m setup.manage export transactions --user 1 --format Parquet out.parquet
+"""
+import argparse
+import sys
+
+from setup import db, export
+
+
+def migrate(args):
+    db.initialize_database()
+    with db.get_db_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    print(f"Schema is at version {version}.")
+    return 0
+
+
+def rollups(args):
+    db.initialize_database()
+    if args.action == 'rebuild':
+        db.rebuild_monthly_totals()
+        print("Rebuilt monthly_category_totals.")
+        return 0
+    mismatches = db.verify_monthly_totals()
+    for user_id, category_id, year, month, rollup_total, raw_total, rollup_count, raw_count in mismatches:
+        print(f"user {user_id} category {category_id} {year}-{month:02}: "
+              f"rollup {rollup_total} ({rollup_count} rows) != raw {raw_total} ({raw_count} rows)")
+    print(f"{len(mismatches)} mismatched rollup rows.")
+    return 1 if mismatches else 0
+
+
+def recurring(args):
+    db.initialize_database()
+    created = db.materialize_recurring_transactions(args.today)
+    print(f"Created {created} recurring transactions.")
+    return 0
+
+
+def export_data(args):
+    db.initialize_database()
+    if args.what == 'transactions':
+        query, params = db.transaction_history_query(args.user, args.start, args.end)
+        columns = export.TRANSACTION_EXPORT_COLUMNS
+    else:
+        query, params = export.CATEGORY_EXPORT_QUERY, (args.user,)
+        columns = export.CATEGORY_EXPORT_COLUMNS
+    with open(args.output, 'wb') as file:
+        export.write_export(file, args.format, query, params, columns)
+    print(f"Wrote {args.what} for user {args.user} to {args.output}.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m setup.manage', description='Budget tracker maintenance commands.')
+    parser.add_argument('--db', help='database URL or file (defaults to BUDGET_TRACKER_DATABASE_URL, BUDGET_TRACKER_DB or budget_tracker.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('migrate', help='apply pending schema migrations').set_defaults(func=migrate)
+
+    rollup_parser = commands.add_parser('rollups', help='check or rebuild the monthly totals rollup')
+    rollup_parser.add_argument('action', choices=['verify', 'rebuild'])
+    rollup_parser.set_defaults(func=rollups)
+
+    recurring_parser = commands.add_parser('recurring', help='create recurring transactions that are due')
+    recurring_parser.add_argument('action', choices=['run'])
+    recurring_parser.add_argument('--today', help='materialize up to this date instead of today (YYYY-MM-DD)')
+    recurring_parser.set_defaults(func=recurring)
+
+    export_parser = commands.add_parser('export', help='stream transactions or categories to a file')
+    export_parser.add_argument('what', choices=['transactions', 'categories'])
+    export_parser.add_argument('output', help='file to write')
+    export_parser.add_argument('--user', type=int, required=True, help='user id')
+    export_parser.add_argument('--format', choices=list(export.EXPORT_FORMATS), default='CSV')
+    export_parser.add_argument('--start', help='first date to include (YYYY-MM-DD)')
+    export_parser.add_argument('--end', help='first date to exclude (YYYY-MM-DD)')
+    export_parser.set_defaults(func=export_data)
+
+    args = parser.parse_args(argv)
+    if args.db:
+        db.configure_database(args.db)
+    try:
+        return args.func(args)
+    finally:
+        db.close_pool()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
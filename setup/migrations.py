@@ -0,0 +1,397 @@
+"""Versioned schema migrations tracked with PRAGMA user_version.
+
+Each migration is registered with the schema version it produces and runs
+inside its own write transaction. Databases created before versioning
+report user_version 0, so the first migration only uses IF NOT EXISTS and
+is safe to replay over an existing budget_tracker.db.
+"""
+
+MIGRATIONS = {}
+
+def migration(version):
+    def register(func):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS[version] = func
+        return func
+    return register
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def latest_version():
+    return max(MIGRATIONS, default=0)
+
+def apply_migrations(conn):
+    """Apply every registered migration newer than the database and return the new version."""
+    for version in sorted(MIGRATIONS):
+        # IMMEDIATE takes the write lock up front so concurrent processes
+        # serialize here and re-check the version once they hold the lock.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return get_schema_version(conn)
+
+# --- Migrations ---
+@migration(1)
+def create_base_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            category_name TEXT NOT NULL,
+            category_type TEXT NOT NULL,
+            UNIQUE(user_id, category_name),
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            category_id INTEGER,
+            amount REAL NOT NULL,
+            transaction_date TEXT NOT NULL,
+            note TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            budget_amount REAL NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            category_id INTEGER,
+            UNIQUE(user_id, category_id, month, year),
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+        )
+    """)
+
+@migration(2)
+def add_query_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, transaction_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date ON transactions (user_id, category_id, transaction_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_budgets_user_period ON budgets (user_id, year, month)")
+
+@migration(3)
+def add_monthly_category_totals(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_category_totals (
+            user_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, category_id, year, month),
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    # The triggers keep the rollup in the same transaction as the write, so
+    # every path (single edits, bulk inserts, FK cascades) stays consistent.
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_totals_insert
+        AFTER INSERT ON transactions
+        WHEN NEW.category_id IS NOT NULL
+        BEGIN
+            INSERT INTO monthly_category_totals (user_id, category_id, year, month, total, count)
+            VALUES (NEW.user_id, NEW.category_id,
+                    CAST(strftime('%Y', NEW.transaction_date) AS INTEGER),
+                    CAST(strftime('%m', NEW.transaction_date) AS INTEGER),
+                    NEW.amount, 1)
+            ON CONFLICT (user_id, category_id, year, month)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_totals_delete
+        AFTER DELETE ON transactions
+        WHEN OLD.category_id IS NOT NULL
+        BEGIN
+            UPDATE monthly_category_totals
+            SET total = total - OLD.amount, count = count - 1
+            WHERE user_id = OLD.user_id AND category_id = OLD.category_id
+              AND year = CAST(strftime('%Y', OLD.transaction_date) AS INTEGER)
+              AND month = CAST(strftime('%m', OLD.transaction_date) AS INTEGER);
+            DELETE FROM monthly_category_totals
+            WHERE user_id = OLD.user_id AND category_id = OLD.category_id
+              AND year = CAST(strftime('%Y', OLD.transaction_date) AS INTEGER)
+              AND month = CAST(strftime('%m', OLD.transaction_date) AS INTEGER)
+              AND count <= 0;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_totals_update
+        AFTER UPDATE OF user_id, category_id, amount, transaction_date ON transactions
+        BEGIN
+            UPDATE monthly_category_totals
+            SET total = total - OLD.amount, count = count - 1
+            WHERE OLD.category_id IS NOT NULL
+              AND user_id = OLD.user_id AND category_id = OLD.category_id
+              AND year = CAST(strftime('%Y', OLD.transaction_date) AS INTEGER)
+              AND month = CAST(strftime('%m', OLD.transaction_date) AS INTEGER);
+            DELETE FROM monthly_category_totals
+            WHERE OLD.category_id IS NOT NULL
+              AND user_id = OLD.user_id AND category_id = OLD.category_id
+              AND year = CAST(strftime('%Y', OLD.transaction_date) AS INTEGER)
+              AND month = CAST(strftime('%m', OLD.transaction_date) AS INTEGER)
+              AND count <= 0;
+            INSERT INTO monthly_category_totals (user_id, category_id, year, month, total, count)
+            SELECT NEW.user_id, NEW.category_id,
+                   CAST(strftime('%Y', NEW.transaction_date) AS INTEGER),
+                   CAST(strftime('%m', NEW.transaction_date) AS INTEGER),
+                   NEW.amount, 1
+            WHERE NEW.category_id IS NOT NULL
+            ON CONFLICT (user_id, category_id, year, month)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;
+        END
+    """)
+    conn.execute("DELETE FROM monthly_category_totals")
+    conn.execute("""
+        INSERT INTO monthly_category_totals (user_id, category_id, year, month, total, count)
+        SELECT user_id, category_id,
+               CAST(strftime('%Y', transaction_date) AS INTEGER),
+               CAST(strftime('%m', transaction_date) AS INTEGER),
+               SUM(amount), COUNT(*)
+        FROM transactions
+        WHERE category_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+
+@migration(4)
+def add_transaction_search(conn):
+    # External-content FTS5 index over notes: the text lives only in
+    # transactions, the index maps terms to transaction ids (rowids).
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            note,
+            content = 'transactions',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    # Per-term document counts, used to decide how to plan a text search.
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts_vocab USING fts5vocab(transactions_fts, 'row')")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, note) VALUES (NEW.id, NEW.note);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF note ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+            INSERT INTO transactions_fts (rowid, note) VALUES (NEW.id, NEW.note);
+        END
+    """)
+    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+@migration(5)
+def add_recurring_rules(conn):
+    # next_index counts the occurrences already materialized, so each run
+    # only generates dates after it and deleted occurrences stay deleted.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            note TEXT,
+            frequency TEXT NOT NULL CHECK (frequency IN ('weekly', 'monthly')),
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            next_index INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recurring_rules_user ON recurring_rules (user_id)")
+    conn.execute("ALTER TABLE transactions ADD COLUMN recurring_rule_id INTEGER REFERENCES recurring_rules (id) ON DELETE SET NULL")
+    conn.execute("ALTER TABLE transactions ADD COLUMN occurrence_date TEXT")
+    # At most one transaction per rule and occurrence, however often or
+    # concurrently the scheduler runs.
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_recurring_occurrence
+        ON transactions (recurring_rule_id, occurrence_date)
+        WHERE recurring_rule_id IS NOT NULL
+    """)
+
+@migration(6)
+def add_soft_delete(conn):
+    # Deleting a category or account only stamps deleted_at; the rows that
+    # hang off it are purged later in small batches.
+    conn.execute("ALTER TABLE categories ADD COLUMN deleted_at TEXT")
+    conn.execute("ALTER TABLE users ADD COLUMN deleted_at TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_categories_deleted ON categories (deleted_at) WHERE deleted_at IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_deleted ON users (deleted_at) WHERE deleted_at IS NOT NULL")
+
+# Year and month of a stored day number (days since 1970-01-01).
+_YEAR = "CAST(strftime('%Y', {day} * 86400, 'unixepoch') AS INTEGER)"
+_MONTH = "CAST(strftime('%m', {day} * 86400, 'unixepoch') AS INTEGER)"
+
+MONTHLY_TOTALS_BACKFILL = f"""
+    INSERT INTO monthly_category_totals (user_id, category_id, year, month, total_minor, count)
+    SELECT user_id, category_id, {_YEAR.format(day='day')}, {_MONTH.format(day='day')},
+           SUM(amount_minor), COUNT(*)
+    FROM transactions
+    WHERE category_id IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+"""
+
+_ROLLUP_ADD = f"""
+    INSERT INTO monthly_category_totals (user_id, category_id, year, month, total_minor, count)
+    SELECT NEW.user_id, NEW.category_id, {_YEAR.format(day='NEW.day')}, {_MONTH.format(day='NEW.day')},
+           NEW.amount_minor, 1
+    WHERE NEW.category_id IS NOT NULL
+    ON CONFLICT (user_id, category_id, year, month)
+    DO UPDATE SET total_minor = total_minor + excluded.total_minor, count = count + 1;
+"""
+
+_ROLLUP_REMOVE = f"""
+    UPDATE monthly_category_totals
+    SET total_minor = total_minor - OLD.amount_minor, count = count - 1
+    WHERE OLD.category_id IS NOT NULL
+      AND user_id = OLD.user_id AND category_id = OLD.category_id
+      AND year = {_YEAR.format(day='OLD.day')} AND month = {_MONTH.format(day='OLD.day')};
+    DELETE FROM monthly_category_totals
+    WHERE OLD.category_id IS NOT NULL
+      AND user_id = OLD.user_id AND category_id = OLD.category_id
+      AND year = {_YEAR.format(day='OLD.day')} AND month = {_MONTH.format(day='OLD.day')}
+      AND count <= 0;
+"""
+
+@migration(7)
+def compact_transaction_storage(conn):
+    # Amounts become integer minor units (paise) and dates integer day
+    # numbers since 1970-01-01: rows and the date indexes shrink, range
+    # predicates compare integers and every total is exact. SQLite cannot
+    # change a column's type, so the table is rebuilt with the same ids,
+    # which keeps the external-content FTS index valid as it is.
+    for trigger in ('trg_transactions_totals_insert', 'trg_transactions_totals_delete',
+                    'trg_transactions_totals_update', 'trg_transactions_fts_insert',
+                    'trg_transactions_fts_delete', 'trg_transactions_fts_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("""
+        CREATE TABLE transactions_compact (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            category_id INTEGER,
+            amount_minor INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            note TEXT,
+            recurring_rule_id INTEGER REFERENCES recurring_rules (id) ON DELETE SET NULL,
+            occurrence_day INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute("""
+        INSERT INTO transactions_compact
+            (id, user_id, category_id, amount_minor, day, note, recurring_rule_id, occurrence_day)
+        SELECT id, user_id, category_id, CAST(round(amount * 100) AS INTEGER),
+               CAST(julianday(transaction_date) - 2440587.5 AS INTEGER), note, recurring_rule_id,
+               CAST(julianday(occurrence_date) - 2440587.5 AS INTEGER)
+        FROM transactions
+        ORDER BY id
+    """)
+    conn.execute("DROP TABLE transactions")
+    conn.execute("ALTER TABLE transactions_compact RENAME TO transactions")
+    conn.execute("CREATE INDEX idx_transactions_user_date ON transactions (user_id, day)")
+    conn.execute("CREATE INDEX idx_transactions_user_category_date ON transactions (user_id, category_id, day)")
+    conn.execute("CREATE INDEX idx_transactions_category ON transactions (category_id)")
+    conn.execute("""
+        CREATE UNIQUE INDEX idx_transactions_recurring_occurrence
+        ON transactions (recurring_rule_id, occurrence_day)
+        WHERE recurring_rule_id IS NOT NULL
+    """)
+
+    conn.execute("DROP TABLE monthly_category_totals")
+    conn.execute("""
+        CREATE TABLE monthly_category_totals (
+            user_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            total_minor INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, category_id, year, month),
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    conn.execute(MONTHLY_TOTALS_BACKFILL)
+    conn.execute(f"""
+        CREATE TRIGGER trg_transactions_totals_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            {_ROLLUP_ADD}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_transactions_totals_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            {_ROLLUP_REMOVE}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_transactions_totals_update
+        AFTER UPDATE OF user_id, category_id, amount_minor, day ON transactions
+        BEGIN
+            {_ROLLUP_REMOVE}
+            {_ROLLUP_ADD}
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, note) VALUES (NEW.id, NEW.note);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER trg_transactions_fts_update
+        AFTER UPDATE OF note ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+            INSERT INTO transactions_fts (rowid, note) VALUES (NEW.id, NEW.note);
+        END
+    """)
@@ -0,0 +1,220 @@
+"""Opt-in timing of data-layer calls, SQL statements and chart renders per rerun (BUDGET_TRACKER_PROFILE=1)."""
+import datetime
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+PROFILING_ENABLED = os.environ.get('BUDGET_TRACKER_PROFILE', '') not in ('', '0', 'false', 'False')
+PROFILE_LOG = os.environ.get('BUDGET_TRACKER_PROFILE_LOG')
+PROFILE_ADMINS = frozenset(name.strip() for name in os.environ.get('BUDGET_TRACKER_PROFILE_ADMINS', '').split(',')
+                           if name.strip())
+MAX_RUNS = 50
+
+_local = threading.local()
+_runs_lock = threading.Lock()
+_finished_runs = {}
+
+# String and blob literals, then numbers that are not part of an identifier.
+_SQL_LITERAL = re.compile(r"[xX]?'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w])")
+
+
+def set_profiling(enabled):
+    global PROFILING_ENABLED
+    PROFILING_ENABLED = enabled
+
+
+def profiling_enabled():
+    return PROFILING_ENABLED
+
+
+def is_profile_admin(username):
+    return username in PROFILE_ADMINS
+
+
+def _current_run():
+    return getattr(_local, 'run', None) if PROFILING_ENABLED else None
+
+
+def begin_run(page, user_id=None):
+    """Start recording user_id's rerun of page on this thread, finishing any run left open."""
+    if not PROFILING_ENABLED:
+        return
+    if getattr(_local, 'run', None) is not None:
+        end_run()
+    _local.run = {
+        'page': page,
+        'user_id': user_id,
+        'started_at': datetime.datetime.now().isoformat(timespec='milliseconds'),
+        '_started': time.perf_counter(),
+        'connections_borrowed': 0,
+        'connections_opened': 0,
+        'events': [],
+    }
+
+
+def end_run():
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    _local.run = None
+    run['total_ms'] = round((time.perf_counter() - run.pop('_started')) * 1000, 3)
+    with _runs_lock:
+        _finished_runs.setdefault(run['user_id'], deque(maxlen=MAX_RUNS)).append(run)
+    if PROFILE_LOG:
+        with _runs_lock, open(PROFILE_LOG, 'a') as log:
+            log.write(json.dumps(run) + '\n')
+    return run
+
+
+def recent_runs(user_id):
+    with _runs_lock:
+        return list(_finished_runs.get(user_id, ()))
+
+
+def all_runs():
+    with _runs_lock:
+        runs = [run for user_runs in _finished_runs.values() for run in user_runs]
+    return sorted(runs, key=lambda run: run['started_at'])
+
+
+def clear_runs(user_id):
+    with _runs_lock:
+        _finished_runs.pop(user_id, None)
+
+
+def export_runs():
+    """Return every user's finished runs as JSON lines, oldest first."""
+    return ''.join(json.dumps(run) + '\n' for run in all_runs())
+
+
+def _record(kind, name, started, rows=None):
+    run = _current_run()
+    if run is not None:
+        run['events'].append({'kind': kind, 'name': name,
+                              'ms': round((time.perf_counter() - started) * 1000, 3), 'rows': rows})
+
+
+def _row_count(result):
+    if isinstance(result, tuple) and result and hasattr(result[0], '__len__'):
+        result = result[0]
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def profiled(func):
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_run() is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        _record('call', name, started, _row_count(result))
+        return result
+
+    return wrapper
+
+
+# --- Connection and SQL hooks used by setup.db ---
+def normalize_sql(sql):
+    """Collapse whitespace and replace literals with ? (the trace callback sees bound values expanded)."""
+    return ' '.join(_SQL_LITERAL.sub('?', sql).split())
+
+
+def _start_trace(conn):
+    statements = []
+    conn.set_trace_callback(lambda sql: statements.append((time.perf_counter(), sql)))
+    return statements
+
+
+def _stop_trace(conn, statements):
+    """Stop tracing and return an event per statement, timed until the next one (or now)."""
+    conn.set_trace_callback(None)
+    ends = [started for started, _ in statements[1:]] + [time.perf_counter()]
+    return [{'kind': 'sql', 'name': normalize_sql(sql)[:500], 'ms': round((ended - started) * 1000, 3), 'rows': None}
+            for (started, sql), ended in zip(statements, ends)]
+
+
+def connection_borrowed(conn, opened):
+    """Count a pool checkout and start tracing its statements; returns a token for connection_released."""
+    run = _current_run()
+    if run is None:
+        return None
+    run['connections_borrowed'] += 1
+    run['connections_opened'] += int(opened)
+    return _start_trace(conn)
+
+
+def connection_released(conn, statements):
+    """Stop tracing and record each statement's time until the next one (or the release)."""
+    if statements is None:
+        return
+    events = _stop_trace(conn, statements)
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        run['events'].extend(events)
+
+
+def traced_write(submit, work):
+    """Return submit(work), recording the SQL work runs on the writer's connection against this thread's run.
+
+    The writer thread has no run of its own, so the statements are
+    collected there and added to the submitting thread's run once the
+    write is done (the group's shared COMMIT is not included).
+    """
+    run = _current_run()
+    if run is None:
+        return submit(work)
+    events = []
+
+    def traced(conn):
+        statements = _start_trace(conn)
+        try:
+            return work(conn)
+        finally:
+            events.extend(_stop_trace(conn, statements))
+
+    try:
+        return submit(traced)
+    finally:
+        run['connections_borrowed'] += 1
+        run['events'].extend(events)
+
+
+# --- Render wrappers used by the pages ---
+def _trace_points(trace):
+    for attribute in ('x', 'values', 'y'):
+        values = getattr(trace, attribute, None)
+        if values is not None:
+            return len(values)
+    return 0
+
+
+def plotly_chart(fig, **kwargs):
+    import streamlit as st
+
+    if _current_run() is None:
+        return st.plotly_chart(fig, **kwargs)
+    started = time.perf_counter()
+    result = st.plotly_chart(fig, **kwargs)
+    _record('render', f"plotly_chart: {fig.layout.title.text or 'untitled'}", started,
+            sum(_trace_points(trace) for trace in fig.data))
+    return result
+
+
+def data_editor(data, **kwargs):
+    import streamlit as st
+
+    if _current_run() is None:
+        return st.data_editor(data, **kwargs)
+    started = time.perf_counter()
+    result = st.data_editor(data, **kwargs)
+    _record('render', f"data_editor: {kwargs.get('key', 'unnamed')}", started, len(data))
+    return result
@@ -0,0 +1,467 @@
+"""Repository interface over users, categories, transactions and budgets.
+
+Repository names the storage operations an app replica needs, with the
+argument and return shapes setup.db already uses (float amounts, ISO
+'YYYY-MM-DD' dates, rows as tuples). There are two implementations:
+
+* SQLiteRepository delegates to setup.db, so it shares that module's
+  connection pool, writer queue, query cache and rollup triggers. setup.db
+  is configured per process, so there is one SQLite database per process
+  and the repository never reconfigures it.
+* SQLAlchemyRepository runs the same operations through SQLAlchemy Core and
+  is meant for PostgreSQL through psycopg, where several replicas behind a
+  load balancer share one server. The engine keeps a QueuePool of
+  pool_size connections (checked with a ping before use) and
+  iter_transactions() reads through a server-side cursor. It creates its
+  own portable schema (the same integer amount_minor and day columns, no
+  triggers, rollup table or FTS index: monthly totals are aggregated from
+  the (user_id, category_id, day) index), deletes categories and accounts
+  outright instead of soft-deleting them and does not cache. SQLAlchemy
+  and psycopg are optional and only imported when it is used.
+
+get_repository() picks the implementation from a database URL.
+
+The Streamlit pages are not wired through the repository: they also use
+the SQLite-only rollup, full-text search, columnar frames and query cache,
+which the interface does not cover, so the app itself runs on SQLite only.
+"""
+from abc import ABC, abstractmethod
+
+from setup import db
+from setup.auth import check_password, hash_password, needs_rehash
+from setup.export import iter_chunks
+
+STREAM_CHUNK_SIZE = 1000
+POSTGRES_SCHEMES = ('postgres', 'postgresql')
+
+
+class Repository(ABC):
+    """Storage operations for users, categories, transactions and budgets."""
+
+    @abstractmethod
+    def initialize(self):
+        """Create or upgrade the schema."""
+
+    @abstractmethod
+    def close(self):
+        """Release pooled connections."""
+
+    # --- Users ---
+    @abstractmethod
+    def create_user(self, username, password):
+        """Create an account and return its id."""
+
+    @abstractmethod
+    def authenticate_user(self, username, password):
+        """Return the user (indexable by 'id') when the password matches, otherwise None."""
+
+    @abstractmethod
+    def get_username_by_id(self, user_id):
+        """Return the account's username, or None."""
+
+    @abstractmethod
+    def delete_user(self, user_id):
+        """Delete an account and everything it owns; the username becomes free at once."""
+
+    # --- Categories ---
+    @abstractmethod
+    def set_default_categories(self, user_id):
+        """Give a new account the default categories."""
+
+    @abstractmethod
+    def add_category(self, user_id, category_name, category_type):
+        """Create a category."""
+
+    @abstractmethod
+    def update_category(self, category_id, new_name, new_type):
+        """Rename a category and/or change its type."""
+
+    @abstractmethod
+    def delete_category(self, category_id):
+        """Delete a category with its transactions and budgets; the name becomes free at once."""
+
+    @abstractmethod
+    def get_user_categories(self, user_id):
+        """Return [(id, name, type)] sorted by name."""
+
+    # --- Transactions ---
+    @abstractmethod
+    def add_transaction(self, user_id, category_id, amount, date, note):
+        """Record a transaction."""
+
+    @abstractmethod
+    def update_transaction(self, transaction_id, category_id, amount, date, note):
+        """Replace a transaction's fields."""
+
+    @abstractmethod
+    def delete_transaction(self, transaction_id):
+        """Delete a transaction."""
+
+    @abstractmethod
+    def get_transaction_by_id(self, transaction_id):
+        """Return (category_id, amount, date, note) or None."""
+
+    @abstractmethod
+    def count_transactions(self, user_id, start_date=None, end_date=None):
+        """Count transactions with start_date <= date < end_date."""
+
+    @abstractmethod
+    def fetch_transaction_page(self, user_id, start_date=None, end_date=None, page_size=50, after=None):
+        """Return one page of (id, date, category, type, amount, note), newest first, and the next cursor."""
+
+    @abstractmethod
+    def iter_transactions(self, user_id, start_date=None, end_date=None, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield every transaction row in the range, newest first, without loading them all at once.
+
+        A connection stays checked out until the generator is exhausted or closed.
+        """
+
+    # --- Budgets ---
+    @abstractmethod
+    def set_budget(self, user_id, category_id, month, year, amount):
+        """Create or replace one category's budget for a month."""
+
+    @abstractmethod
+    def set_budgets_bulk(self, user_id, month, year, amounts):
+        """Upsert {category_id: amount} for one month and return the number of rows changed."""
+
+    @abstractmethod
+    def get_budgets_for_month(self, user_id, month, year):
+        """Return [(id, user_id, amount, category_id, category_name)]."""
+
+    @abstractmethod
+    def get_total_spent_per_category(self, user_id, month, year):
+        """Return [(category_id, category_name, total)] for expense categories with transactions that month."""
+
+
+class SQLiteRepository(Repository):
+    """The setup.db data layer behind the Repository interface.
+
+    It uses whatever database setup.db is configured with (see
+    db.configure_database).
+    """
+
+    def initialize(self):
+        db.initialize_database()
+
+    def close(self):
+        db.close_pool()
+
+    def create_user(self, username, password):
+        return db.create_user(username, password)
+
+    def authenticate_user(self, username, password):
+        return db.authenticate_user(username, password)
+
+    def get_username_by_id(self, user_id):
+        return db.get_username_by_id(user_id)
+
+    def delete_user(self, user_id):
+        db.delete_user(user_id)
+
+    def set_default_categories(self, user_id):
+        db.set_default_categories(user_id)
+
+    def add_category(self, user_id, category_name, category_type):
+        db.add_category(user_id, category_name, category_type)
+
+    def update_category(self, category_id, new_name, new_type):
+        db.update_category(category_id, new_name, new_type)
+
+    def delete_category(self, category_id):
+        db.delete_category(category_id)
+
+    def get_user_categories(self, user_id):
+        return db.get_user_categories(user_id)
+
+    def add_transaction(self, user_id, category_id, amount, date, note):
+        db.add_transaction(user_id, category_id, amount, date, note)
+
+    def update_transaction(self, transaction_id, category_id, amount, date, note):
+        db.update_transaction(transaction_id, category_id, amount, date, note)
+
+    def delete_transaction(self, transaction_id):
+        db.delete_transaction(transaction_id)
+
+    def get_transaction_by_id(self, transaction_id):
+        return db.get_transaction_by_id(transaction_id)
+
+    def count_transactions(self, user_id, start_date=None, end_date=None):
+        return db.count_transactions(user_id, start_date, end_date)
+
+    def fetch_transaction_page(self, user_id, start_date=None, end_date=None, page_size=50, after=None):
+        return db.fetch_transaction_page(user_id, start_date, end_date, page_size, after)
+
+    def iter_transactions(self, user_id, start_date=None, end_date=None, chunk_size=STREAM_CHUNK_SIZE):
+        query, params = db.transaction_history_query(user_id, start_date, end_date)
+        for rows in iter_chunks(query, params, chunk_size):
+            yield from rows
+
+    def set_budget(self, user_id, category_id, month, year, amount):
+        db.set_budget(user_id, category_id, month, year, amount)
+
+    def set_budgets_bulk(self, user_id, month, year, amounts):
+        return db.set_budgets_bulk(user_id, month, year, amounts)
+
+    def get_budgets_for_month(self, user_id, month, year):
+        return db.get_budgets_for_month(user_id, month, year)
+
+    def get_total_spent_per_category(self, user_id, month, year):
+        return db.get_total_spent_per_category(user_id, month, year)
+
+
+def _define_tables(sa):
+    metadata = sa.MetaData()
+    users = sa.Table(
+        'users', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('username', sa.Text, nullable=False, unique=True),
+        sa.Column('password', sa.Text, nullable=False),
+    )
+    categories = sa.Table(
+        'categories', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('category_name', sa.Text, nullable=False),
+        sa.Column('category_type', sa.Text, nullable=False),
+        sa.UniqueConstraint('user_id', 'category_name'),
+    )
+    transactions = sa.Table(
+        'transactions', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('category_id', sa.Integer, sa.ForeignKey('categories.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('amount_minor', sa.BigInteger, nullable=False),
+        sa.Column('day', sa.Integer, nullable=False),
+        sa.Column('note', sa.Text),
+        sa.Index('idx_transactions_user_date', 'user_id', 'day'),
+        sa.Index('idx_transactions_user_category_date', 'user_id', 'category_id', 'day'),
+        sa.Index('idx_transactions_category', 'category_id'),
+    )
+    budgets = sa.Table(
+        'budgets', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('category_id', sa.Integer, sa.ForeignKey('categories.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('budget_amount', sa.Float, nullable=False),
+        sa.Column('month', sa.Integer, nullable=False),
+        sa.Column('year', sa.Integer, nullable=False),
+        sa.UniqueConstraint('user_id', 'category_id', 'month', 'year'),
+        sa.Index('idx_budgets_user_period', 'user_id', 'year', 'month'),
+    )
+    return metadata, users, categories, transactions, budgets
+
+
+class SQLAlchemyRepository(Repository):
+    """The Repository on a SQLAlchemy engine: PostgreSQL via psycopg, or a SQLite file for local testing.
+
+    pool_size (default db.POOL_SIZE) connections are kept open and at most
+    max_overflow more are opened under load; a connection that the server
+    dropped is replaced on checkout.
+    """
+
+    def __init__(self, url, pool_size=None, max_overflow=0):
+        import sqlalchemy as sa
+
+        self._sa = sa
+        self.engine = sa.create_engine(
+            url, pool_size=db.POOL_SIZE if pool_size is None else pool_size,
+            max_overflow=max_overflow, pool_pre_ping=True)
+        dialect = self.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+
+            # SQLite only enforces the ON DELETE CASCADE foreign keys when asked to.
+            sa.event.listen(self.engine, 'connect',
+                            lambda conn, record: conn.execute("PRAGMA foreign_keys = ON"))
+        else:
+            raise ValueError(f"Unsupported database backend '{dialect}': expected PostgreSQL or SQLite")
+        self._insert = insert
+        self.metadata, self.users, self.categories, self.transactions, self.budgets = _define_tables(sa)
+
+    def initialize(self):
+        self.metadata.create_all(self.engine)
+
+    def close(self):
+        self.engine.dispose()
+
+    def _scalar(self, statement):
+        with self.engine.connect() as conn:
+            return conn.execute(statement).scalar()
+
+    def _rows(self, statement):
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(statement)]
+
+    def _write(self, statement):
+        with self.engine.begin() as conn:
+            return conn.execute(statement)
+
+    # --- Users ---
+    def create_user(self, username, password):
+        result = self._write(self.users.insert().values(username=username, password=hash_password(password)))
+        return result.inserted_primary_key[0]
+
+    def authenticate_user(self, username, password):
+        users = self.users
+        with self.engine.connect() as conn:
+            user = conn.execute(self._sa.select(users.c.id, users.c.password)
+                                .where(users.c.username == username)).mappings().first()
+        if not check_password(password, user['password'] if user else None):
+            return None
+        if needs_rehash(user['password']):
+            self._write(users.update()
+                        .where(users.c.id == user['id'], users.c.password == user['password'])
+                        .values(password=hash_password(password)))
+        return dict(user)
+
+    def get_username_by_id(self, user_id):
+        return self._scalar(self._sa.select(self.users.c.username).where(self.users.c.id == user_id))
+
+    def delete_user(self, user_id):
+        self._write(self.users.delete().where(self.users.c.id == user_id))
+
+    # --- Categories ---
+    def set_default_categories(self, user_id):
+        with self.engine.begin() as conn:
+            conn.execute(self.categories.insert(), [
+                {'user_id': user_id, 'category_name': name, 'category_type': kind}
+                for name, kind in db.DEFAULT_CATEGORIES])
+
+    def add_category(self, user_id, category_name, category_type):
+        self._write(self.categories.insert().values(
+            user_id=user_id, category_name=category_name, category_type=category_type))
+
+    def update_category(self, category_id, new_name, new_type):
+        self._write(self.categories.update().where(self.categories.c.id == category_id)
+                    .values(category_name=new_name, category_type=new_type))
+
+    def delete_category(self, category_id):
+        self._write(self.categories.delete().where(self.categories.c.id == category_id))
+
+    def get_user_categories(self, user_id):
+        c = self.categories.c
+        return self._rows(self._sa.select(c.id, c.category_name, c.category_type)
+                          .where(c.user_id == user_id).order_by(c.category_name))
+
+    # --- Transactions ---
+    def add_transaction(self, user_id, category_id, amount, date, note):
+        self._write(self.transactions.insert().values(
+            user_id=user_id, category_id=category_id, amount_minor=db.to_minor(amount),
+            day=db.to_day(date), note=note))
+
+    def update_transaction(self, transaction_id, category_id, amount, date, note):
+        self._write(self.transactions.update().where(self.transactions.c.id == transaction_id).values(
+            category_id=category_id, amount_minor=db.to_minor(amount), day=db.to_day(date), note=note))
+
+    def delete_transaction(self, transaction_id):
+        self._write(self.transactions.delete().where(self.transactions.c.id == transaction_id))
+
+    def get_transaction_by_id(self, transaction_id):
+        t = self.transactions.c
+        rows = self._rows(self._sa.select(t.category_id, t.amount_minor, t.day, t.note).where(t.id == transaction_id))
+        if not rows:
+            return None
+        category_id, amount_minor, day, note = rows[0]
+        return category_id, amount_minor / db.MINOR_UNITS, db.from_day(day), note
+
+    def _range_filter(self, user_id, start_date, end_date):
+        t = self.transactions.c
+        clauses = [t.user_id == user_id]
+        if start_date:
+            clauses.append(t.day >= db.to_day(start_date))
+        if end_date:
+            clauses.append(t.day < db.to_day(end_date))
+        return clauses
+
+    def count_transactions(self, user_id, start_date=None, end_date=None):
+        return self._scalar(self._sa.select(self._sa.func.count()).select_from(self.transactions)
+                            .where(*self._range_filter(user_id, start_date, end_date)))
+
+    def _history(self, user_id, start_date, end_date):
+        t, c = self.transactions.c, self.categories.c
+        return (self._sa.select(t.id, t.day, c.category_name, c.category_type, t.amount_minor, t.note)
+                .join_from(self.transactions, self.categories, t.category_id == c.id)
+                .where(*self._range_filter(user_id, start_date, end_date))
+                .order_by(t.day.desc(), t.id.desc()))
+
+    @staticmethod
+    def _history_row(row):
+        transaction_id, day, category_name, category_type, amount_minor, note = row
+        return transaction_id, db.from_day(day), category_name, category_type, amount_minor / db.MINOR_UNITS, note
+
+    def fetch_transaction_page(self, user_id, start_date=None, end_date=None, page_size=50, after=None):
+        t = self.transactions.c
+        query = self._history(user_id, start_date, end_date)
+        if after is not None:
+            query = query.where(self._sa.tuple_(t.day, t.id) < self._sa.tuple_(db.to_day(after[0]), after[1]))
+        # One extra row tells us whether another page follows.
+        transactions = [self._history_row(row) for row in self._rows(query.limit(page_size + 1))]
+        return db.split_page(transactions, page_size, db.row_cursor)
+
+    def iter_transactions(self, user_id, start_date=None, end_date=None, chunk_size=STREAM_CHUNK_SIZE):
+        # stream_results makes psycopg use a named (server-side) cursor, so
+        # rows arrive chunk_size at a time instead of all on execute().
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+                self._history(user_id, start_date, end_date))
+            for row in result:
+                yield self._history_row(row)
+
+    # --- Budgets ---
+    def _budget_upsert(self, rows):
+        insert = self._insert(self.budgets).values(rows)
+        return insert.on_conflict_do_update(
+            index_elements=['user_id', 'category_id', 'month', 'year'],
+            set_={'budget_amount': insert.excluded.budget_amount},
+            where=self.budgets.c.budget_amount != insert.excluded.budget_amount)
+
+    def set_budget(self, user_id, category_id, month, year, amount):
+        self.set_budgets_bulk(user_id, month, year, {category_id: amount})
+
+    def set_budgets_bulk(self, user_id, month, year, amounts):
+        if not amounts:
+            return 0
+        # One multi-row INSERT ... ON CONFLICT, so rowcount covers every row.
+        upsert = self._budget_upsert([
+            {'user_id': user_id, 'category_id': category_id, 'month': month, 'year': year, 'budget_amount': amount}
+            for category_id, amount in amounts.items()])
+        with self.engine.begin() as conn:
+            return conn.execution_options(preserve_rowcount=True).execute(upsert).rowcount
+
+    def get_budgets_for_month(self, user_id, month, year):
+        b, c = self.budgets.c, self.categories.c
+        return self._rows(self._sa.select(b.id, b.user_id, b.budget_amount, b.category_id, c.category_name)
+                          .join_from(self.budgets, self.categories, b.category_id == c.id)
+                          .where(b.user_id == user_id, b.month == month, b.year == year))
+
+    def get_total_spent_per_category(self, user_id, month, year):
+        t, c = self.transactions.c, self.categories.c
+        start, end = db.month_date_range(month, year)
+        query = (self._sa.select(c.id, c.category_name, self._sa.func.sum(t.amount_minor))
+                 .join_from(self.transactions, self.categories, t.category_id == c.id)
+                 .where(t.user_id == user_id, t.day >= db.to_day(start), t.day < db.to_day(end),
+                        c.category_type == 'expense')
+                 .group_by(c.id, c.category_name))
+        return [(category_id, name, total / db.MINOR_UNITS) for category_id, name, total in self._rows(query)]
+
+
+def get_repository(url=None, pool_size=None):
+    """Return the repository for a database URL (default: the one setup.db is configured with).
+
+    postgres:// and postgresql:// URLs get a SQLAlchemyRepository on psycopg
+    with a pool of pool_size connections. Anything else must be the SQLite
+    database setup.db is already configured with, and gets a
+    SQLiteRepository on its shared pool.
+    """
+    url = url or db.DATABASE_URL
+    scheme, sep, rest = url.partition('://')
+    dialect, _, driver = scheme.partition('+')
+    if sep and dialect in POSTGRES_SCHEMES:
+        return SQLAlchemyRepository(f"postgresql+{driver or 'psycopg'}://{rest}", pool_size)
+    if url != db.DATABASE_URL:
+        raise ValueError(f"setup.db is configured for '{db.DATABASE_URL}', not '{url}': "
+                         "call db.configure_database() first")
+    return SQLiteRepository()
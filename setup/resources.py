@@ -0,0 +1,68 @@
+"""Process-wide resources built once per Streamlit server with st.cache_resource.
+
+The login screen only needs Streamlit and setup.db. pandas and Plotly
+together add a few hundred milliseconds of import time. They are imported
+on a background thread while the user logs in, and chart pages get
+plotly.express through plotly_express(), which waits for that thread,
+imports plotly.express only on first use and builds the default figure
+template once.
+"""
+import importlib
+import threading
+
+import streamlit as st
+
+from setup.db import initialize_database
+
+# Imported ahead of time so the first chart page does not pay for them.
+PRELOAD_MODULES = ('numpy', 'pandas', 'plotly.express')
+
+
+@st.cache_resource(show_spinner=False)
+def database():
+    """Apply pending migrations and open the first pooled connection."""
+    from setup.db import get_db_connection
+
+    initialize_database()
+    with get_db_connection():
+        pass
+    return True
+
+
+def _import_all(modules):
+    for name in modules:
+        importlib.import_module(name)
+
+
+@st.cache_resource(show_spinner=False)
+def preload_modules(modules=PRELOAD_MODULES):
+    """Start importing heavy modules on a daemon thread and return it.
+
+    Join the thread before using any of them: plotly looks pandas up in
+    sys.modules, where it can find the half-imported module the thread is
+    still initializing.
+    """
+    thread = threading.Thread(target=_import_all, args=(modules,), name='preload-modules', daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource(show_spinner=False)
+def recurring_scheduler():
+    """Start the background thread that creates due recurring transactions."""
+    from setup.scheduler import start_scheduler
+
+    return start_scheduler()
+
+
+@st.cache_resource(show_spinner=False)
+def plotly_express():
+    """Return plotly.express with the default figure template already built."""
+    preload_modules().join()
+    import plotly.express as px
+    import plotly.io as pio
+
+    # Templates are loaded lazily from JSON on first access; do it once here
+    # rather than inside the first figure a user waits for.
+    pio.templates[pio.templates.default]
+    return px
@@ -0,0 +1,102 @@
+"""Background threads for recurring transactions and purging deleted data.
+
+One pass catches every user up with db.materialize_recurring_transactions
+and purges soft-deleted categories and accounts with db.purge_deleted.
+Both are idempotent, so running them from several app processes at once or
+after a restart is safe. The interval comes from
+BUDGET_TRACKER_RECURRING_INTERVAL (seconds, 0 disables the thread).
+
+request_purge() starts a purge straight away on its own thread, so a
+deletion does not wait for the next scheduled pass.
+"""
+import logging
+import os
+import threading
+
+from setup.db import materialize_recurring_transactions, purge_deleted
+
+RECURRING_INTERVAL = float(os.environ.get('BUDGET_TRACKER_RECURRING_INTERVAL', '3600'))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_thread = None
+_stop = threading.Event()
+_purge_thread = None
+_purge_requested = threading.Event()
+
+
+def run_once():
+    """Materialize recurring transactions due today, purge deleted data and return the number created."""
+    created = materialize_recurring_transactions()
+    if created:
+        logger.info("Created %d recurring transactions", created)
+    _purge()
+    return created
+
+
+def _purge():
+    purged = purge_deleted()
+    if purged:
+        logger.info("Purged %d transactions of deleted categories and accounts", purged)
+    return purged
+
+
+def _purge_loop():
+    global _purge_thread
+    while True:
+        _purge_requested.clear()
+        try:
+            _purge()
+        except Exception:
+            logger.exception("Purge of deleted data failed")
+        with _lock:
+            # A request that arrived during the pass gets another pass.
+            if not _purge_requested.is_set():
+                _purge_thread = None
+                return
+
+
+def request_purge():
+    """Purge soft-deleted data in the background, starting a worker if none is running."""
+    global _purge_thread
+    with _lock:
+        _purge_requested.set()
+        if _purge_thread is None:
+            _purge_thread = threading.Thread(target=_purge_loop, name='purge-deleted', daemon=True)
+            _purge_thread.start()
+        return _purge_thread
+
+
+def _loop(interval):
+    while not _stop.is_set():
+        try:
+            run_once()
+        except Exception:
+            # A locked or unavailable database should not kill the thread;
+            # the next pass catches up whatever this one missed.
+            logger.exception("Scheduled maintenance pass failed")
+        _stop.wait(interval)
+
+
+def start_scheduler(interval=None):
+    """Start the scheduler thread once per process and return it (None when disabled)."""
+    global _thread
+    interval = RECURRING_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return None
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=_loop, args=(interval,), name='recurring-scheduler', daemon=True)
+            _thread.start()
+        return _thread
+
+
+def stop_scheduler(timeout=None):
+    global _thread
+    with _lock:
+        thread, _thread = _thread, None
+    _stop.set()
+    if thread is not None:
+        thread.join(timeout)
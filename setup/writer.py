@@ -0,0 +1,204 @@
+"""Single writer thread that serializes and group-commits every database write.
+
+Work functions run on the writer thread and must not begin, commit or roll back themselves.
+"""
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+WRITE_BATCH_SIZE = int(os.environ.get('BUDGET_TRACKER_WRITE_BATCH', '64'))
+WRITE_LOCK_TIMEOUT = float(os.environ.get('BUDGET_TRACKER_WRITE_LOCK_TIMEOUT', '5.0'))
+WRITE_TIMEOUT = float(os.environ.get('BUDGET_TRACKER_WRITE_TIMEOUT', '60'))
+WRITE_BACKOFF = 0.001
+WRITE_BACKOFF_MAX = 0.05
+
+_STOP = object()
+
+
+def configure_writer(batch_size=None, lock_timeout=None):
+    """Change the defaults for writers started from now on (setup.db restarts its writer on configure_database)."""
+    global WRITE_BATCH_SIZE, WRITE_LOCK_TIMEOUT
+    if batch_size is not None:
+        WRITE_BATCH_SIZE = batch_size
+    if lock_timeout is not None:
+        WRITE_LOCK_TIMEOUT = lock_timeout
+
+
+def is_busy_error(exc):
+    """True when exc is SQLite reporting a locked or busy database."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    name = getattr(exc, 'sqlite_errorname', None)
+    if name is not None:
+        return name.startswith(('SQLITE_BUSY', 'SQLITE_LOCKED'))
+    # Python < 3.11 does not expose the error code; fall back to SQLite's messages.
+    message = str(exc).lower()
+    return 'is locked' in message or 'busy' in message
+
+
+class WriteQueue:
+    """A thread that runs submitted work(conn) functions in group-committed write transactions.
+
+    connect opens the writer's connection; the thread and connection are
+    started on the first submit() and closed by stop().
+    """
+
+    def __init__(self, connect, batch_size=None, lock_timeout=None, backoff=None, backoff_max=None):
+        self.connect = connect
+        self.batch_size = max(batch_size or WRITE_BATCH_SIZE, 1)
+        self.lock_timeout = WRITE_LOCK_TIMEOUT if lock_timeout is None else lock_timeout
+        self.backoff = backoff or WRITE_BACKOFF
+        self.backoff_max = backoff_max or WRITE_BACKOFF_MAX
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'writes': 0, 'failed': 0, 'commits': 0, 'busy_retries': 0}
+
+    def submit(self, work):
+        """Queue work(conn) and return a Future for its return value, set once it is committed."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("A write cannot submit another write; it would wait on itself")
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name='db-writer', daemon=True)
+                self._thread.start()
+            self._queue.put((work, future))
+        return future
+
+    def run(self, work, timeout=None):
+        """Submit work and wait up to timeout (default WRITE_TIMEOUT) seconds for its result.
+
+        Raises TimeoutError when no result arrives in time. A write that had
+        not started yet is cancelled; one already running may still commit.
+        """
+        future = self.submit(work)
+        timeout = WRITE_TIMEOUT if timeout is None else timeout
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise TimeoutError(f"The writer did not start this write within {timeout}s; it was cancelled") from None
+            raise TimeoutError(f"This write did not finish within {timeout}s and may still commit") from None
+
+    def stop(self, timeout=None):
+        """Finish every write already queued, then stop the thread and close its connection."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['writes_per_commit'] = stats['writes'] / stats['commits'] if stats['commits'] else 0.0
+        return stats
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, n in increments.items():
+                self._stats[name] += n
+
+    def _run(self, pending):
+        try:
+            conn = self.connect()
+            # Lock waits are handled by _begin()'s backoff, not SQLite's busy handler.
+            conn.execute("PRAGMA busy_timeout = 0")
+        except BaseException as exc:
+            self._abandon(pending, exc)
+            return
+        try:
+            stopping = False
+            while not stopping:
+                item = pending.get()
+                if item is _STOP:
+                    break
+                group = [item]
+                while len(group) < self.batch_size:
+                    try:
+                        item = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    group.append(item)
+                self._write_group(conn, group)
+        finally:
+            conn.close()
+
+    def _abandon(self, pending, exc):
+        """Fail every write in this thread's queue with exc and let the next submit() start a new writer."""
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+                self._queue = queue.SimpleQueue()
+        failed = 0
+        while True:
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(exc)
+                failed += 1
+        self._count(writes=failed, failed=failed)
+
+    def _begin(self, conn):
+        deadline = time.monotonic() + self.lock_timeout
+        delay = self.backoff
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if not is_busy_error(exc) or remaining <= 0:
+                    raise
+            self._count(busy_retries=1)
+            time.sleep(min(random.uniform(0, delay), remaining))
+            delay = min(delay * 2, self.backoff_max)
+
+    def _write_group(self, conn, group):
+        group = [(work, future) for work, future in group if future.set_running_or_notify_cancel()]
+        if not group:
+            return
+        done = []
+        # A write alone in its group needs no savepoint: if it fails the whole
+        # transaction is rolled back. Savepoints copy every page a write touches
+        # to the statement journal first, which large writes pay for heavily.
+        isolate = len(group) > 1
+        try:
+            self._begin(conn)
+            for work, future in group:
+                if not isolate:
+                    done.append((future, work(conn)))
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    result = work(conn)
+                except BaseException as exc:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    future.set_exception(exc)
+                    continue
+                conn.execute("RELEASE write")
+                done.append((future, result))
+            conn.commit()
+        except BaseException as exc:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(exc)
+            self._count(writes=len(group), failed=len(group))
+            return
+        for future, result in done:
+            future.set_result(result)
+        self._count(writes=len(group), failed=len(group) - len(done), commits=1)
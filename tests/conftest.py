@@ -0,0 +1,55 @@
+import datetime
+
+import pytest
+
+from setup import auth, cache, db
+
+
+@pytest.fixture(scope='session', autouse=True)
+def fast_password_hashing():
+    # Cost 4 keeps create_user/authenticate_user fast; the cost is not under test.
+    auth.configure_auth(rounds=4)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A fresh, migrated database file used by setup.db for one test."""
+    path = str(tmp_path / 'budget_tracker.db')
+    db.configure_database(path)
+    db.initialize_database()
+    yield path
+    db.close_pool()
+
+
+@pytest.fixture
+def uncached():
+    """Send every @cached_query call to SQLite for the duration of a test."""
+    size = cache.CACHE_SIZE
+    cache.configure_cache(size=0)
+    yield
+    cache.configure_cache(size=size)
+
+
+@pytest.fixture
+def user_id(database):
+    """A user with the default categories."""
+    user_id = db.create_user('alice', 'secret')
+    db.set_default_categories(user_id)
+    return user_id
+
+
+def category_id(user_id, name):
+    return next(cat_id for cat_id, cat_name, _ in db.get_user_categories(user_id) if cat_name == name)
+
+
+def add_history(user_id, category, count, start=datetime.date(2024, 1, 1)):
+    """Add `count` daily expenses from `start`."""
+    for n in range(count):
+        db.add_transaction(user_id, category, (n % 7 + 1) * 1.25, str(start + datetime.timedelta(days=n)),
+                           f"groceries purchase {n}")
+
+
+def assert_derived_tables_consistent():
+    assert db.verify_monthly_totals() == []
+    with db.get_db_connection() as conn:
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('integrity-check')")
@@ -0,0 +1,15 @@
+"""Resizing the hashing pool while work is queued on it."""
+import os
+import subprocess
+import sys
+
+
+def test_resizing_the_pool_after_use_does_not_deadlock():
+    # A fresh process, so the first submit also queues the dummy-hash warm-up.
+    script = ("from setup import auth\n"
+              "auth.configure_auth(rounds=4)\n"
+              "auth.submit_hash_password('pw')\n"
+              "auth.configure_auth(workers=2)\n"
+              "assert auth.check_password('pw', auth.hash_password('pw'))\n")
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=30,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,19 @@
+"""Every Insights figure stays under charts.CHART_PAYLOAD_LIMIT, however long the history."""
+import pytest
+
+from benchmarks import datagen
+from benchmarks.check_chart_payloads import figure_payloads, payload_limit
+from setup import charts
+
+
+@pytest.fixture
+def long_history(database, uncached):
+    user_id, = datagen.generate(users=1, transactions=40000, years=10, username_prefix='charts')
+    return user_id
+
+
+def test_figures_fit_the_payload_limit(long_history):
+    oversized = [(granularity, name, width or charts.CHART_WIDTH_PX, size)
+                 for granularity, name, width, size, _ in figure_payloads(long_history)
+                 if size > payload_limit(width)]
+    assert oversized == []
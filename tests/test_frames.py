@@ -0,0 +1,37 @@
+"""Frames handed to st.data_editor accept every value their select columns offer."""
+import pytest
+
+from setup import db, frames
+from tests.conftest import category_id
+
+
+def apply_editor_edits(df, edited_rows):
+    """Apply edits the way st.data_editor does when it reruns with pending changes."""
+    data_editor = pytest.importorskip('streamlit.elements.widgets.data_editor')
+    import pyarrow as pa
+    from streamlit.elements.lib.column_config_utils import determine_dataframe_schema
+
+    edited = df.copy()
+    schema = determine_dataframe_schema(edited, pa.Table.from_pandas(edited).schema)
+    data_editor._apply_cell_edits(edited, edited_rows, schema)
+    return edited
+
+
+def test_category_can_change_to_a_type_no_category_has_yet(database, uncached):
+    user_id = db.create_user('alice', 'secret')
+    db.add_category(user_id, 'Groceries', 'expense')
+    df = frames.categories_frame(user_id)
+
+    for category_type in db.CATEGORY_TYPES:
+        edited = apply_editor_edits(df, {0: {'Category Type': category_type}})
+        assert edited.loc[0, 'Category Type'] == category_type
+
+
+def test_transaction_can_move_to_a_category_not_on_the_page(user_id, uncached):
+    db.add_transaction(user_id, category_id(user_id, 'Groceries'), 12.5, '2024-01-01', None)
+    df, _ = frames.transaction_page_frame(user_id)
+
+    edited = apply_editor_edits(df, {0: {'Category': 'Rent', 'Type': 'savings'}})
+    assert (edited.loc[0, 'Category'], edited.loc[0, 'Type']) == ('Rent', 'savings')
+    df, _ = frames.transaction_search_frame(user_id, 'x')
+    apply_editor_edits(df, {})
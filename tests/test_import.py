@@ -0,0 +1,57 @@
+"""Bulk imports run one write per batch and leave the writer free in between."""
+import threading
+
+from setup import db
+from setup.importer import import_transactions_file
+from tests.conftest import category_id
+
+
+def test_other_writes_run_between_batches(user_id):
+    groceries = category_id(user_id, 'Groceries')
+    finished = []
+
+    def batches():
+        for n in range(3):
+            yield [('2024-01-%02d' % (n + 1), 'Imported', 'expense', 10.0, f"batch {n}")] * 100
+            # The import is paused in its parser here: another session's save must not wait for it.
+            other = threading.Thread(target=lambda: finished.append(
+                db.add_transaction(user_id, groceries, 1.0, '2024-02-01', 'meanwhile')))
+            other.start()
+            other.join(5)
+            assert not other.is_alive()
+
+    result = db.import_transactions(user_id, batches())
+    assert result['imported'] == 300 and result['created_categories'] == ['Imported']
+    assert len(finished) == 3
+    assert db.count_transactions(user_id) == 303
+
+
+def test_failed_batch_keeps_earlier_batches(user_id):
+    def batches():
+        yield [('2024-01-01', 'Rent', 'expense', 900.0, None)]
+        yield [('2024-01-02', 'Brand new', 'expense', 5.0, None), ('not a date', 'Rent', 'expense', 1.0, None)]
+
+    try:
+        db.import_transactions(user_id, batches())
+    except Exception:
+        pass
+    else:
+        raise AssertionError("the malformed batch should fail")
+    assert db.count_transactions(user_id) == 1
+    assert 'Brand new' not in [name for _, name, _ in db.get_user_categories(user_id)]
+
+
+def test_csv_import(user_id, tmp_path):
+    path = tmp_path / 'statement.csv'
+    path.write_text("Date,Category,Amount,Note\n2024-03-01,Groceries,-12.50,shop\n2024-03-02,Salary,2500,pay\n"
+                    "bad,Groceries,1,skip me\n")
+    with open(path, 'rb') as file:
+        result = import_transactions_file(user_id, file, 'statement.csv', chunk_size=1)
+    assert (result['imported'], result['skipped']) == (2, 1)
+
+
+def test_amounts_round_like_sql(database):
+    with db.get_db_connection() as conn:
+        for amount in (0.125, 0.005, 2.675, -0.125, 1.005, 19.995):
+            sql = conn.execute(f"SELECT {db.AMOUNT_TO_MINOR.format('?')}", (amount,)).fetchone()[0]
+            assert db.to_minor(amount) == sql, amount
@@ -0,0 +1,44 @@
+"""Profiled runs keep no user data and are only visible to the user who made them."""
+import pytest
+
+from setup import db, profiling
+
+
+@pytest.fixture
+def profiling_on():
+    profiling.set_profiling(True)
+    yield
+    profiling.set_profiling(False)
+    for user_id in (None, 1, 2):
+        profiling.clear_runs(user_id)
+
+
+def test_statements_are_recorded_without_values(database, profiling_on):
+    profiling.begin_run('Signup')
+    user_id = db.create_user('alice', 'secret')
+    db.add_category(user_id, 'Groceries', 'expense')
+    category_id = db.get_user_categories(user_id)[0][0]
+    db.add_transaction(user_id, category_id, 1234.56, '2024-02-29', 'birthday present for bob')
+    run = profiling.end_run()
+
+    statements = [event['name'] for event in run['events'] if event['kind'] == 'sql']
+    assert any(statement.startswith('INSERT INTO users') for statement in statements)
+    recorded = ' '.join(statements)
+    for value in ('alice', '$2b$', 'Groceries', '1234.56', '2024-02-29', 'bob'):
+        assert value not in recorded
+
+
+def test_runs_are_kept_per_user(profiling_on):
+    for user_id in (1, 2, 1):
+        profiling.begin_run('Dashboard', user_id)
+        profiling.end_run()
+    assert len(profiling.recent_runs(1)) == 2
+    assert len(profiling.recent_runs(2)) == 1
+    profiling.clear_runs(1)
+    assert profiling.recent_runs(1) == [] and len(profiling.recent_runs(2)) == 1
+    assert len(profiling.export_runs().splitlines()) == 1
+
+
+def test_normalize_sql():
+    assert profiling.normalize_sql("SELECT t.id FROM t1 WHERE note = 'it''s' AND day >= -19000 LIMIT 51") == \
+        "SELECT t.id FROM t1 WHERE note = ? AND day >= ? LIMIT ?"
@@ -0,0 +1,50 @@
+"""Purging soft-deleted data keeps the rollup and search index consistent."""
+from setup import db
+from tests.conftest import add_history, assert_derived_tables_consistent, category_id
+
+
+def table_counts(**where):
+    with db.get_db_connection() as conn:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {clause}", params).fetchone()[0]
+                for table, (clause, params) in where.items()}
+
+
+def test_deleted_category_is_purged_in_batches(user_id):
+    groceries, bills = category_id(user_id, 'Groceries'), category_id(user_id, 'Bills')
+    add_history(user_id, groceries, 40)
+    add_history(user_id, bills, 10)
+    db.set_budget(user_id, groceries, 1, 2024, 200)
+    db.add_recurring_rule(user_id, groceries, 10.0, '2024-01-01')
+
+    db.delete_category(groceries)
+    assert db.count_transactions(user_id) == 10
+    assert db.purge_deleted(batch_size=7, pause=0) == 40
+
+    remaining = table_counts(
+        transactions=("category_id = ?", (groceries,)),
+        budgets=("category_id = ?", (groceries,)),
+        recurring_rules=("category_id = ?", (groceries,)),
+        monthly_category_totals=("category_id = ?", (groceries,)),
+        categories=("id = ?", (groceries,)))
+    assert remaining == dict.fromkeys(remaining, 0)
+    assert db.count_transactions(user_id) == 10
+    assert db.pending_purges() == ([], [])
+    assert_derived_tables_consistent()
+
+
+def test_deleted_user_is_purged(user_id):
+    other = db.create_user('bob', 'secret')
+    db.set_default_categories(other)
+    add_history(user_id, category_id(user_id, 'Groceries'), 25)
+    add_history(other, category_id(other, 'Groceries'), 5)
+    db.set_budget(user_id, category_id(user_id, 'Rent'), 1, 2024, 900)
+
+    db.delete_user(user_id)
+    assert db.purge_deleted(batch_size=4, pause=0) == 25
+
+    remaining = table_counts(**{table: ("user_id = ?", (user_id,))
+                                for table in ('transactions', 'budgets', 'categories', 'monthly_category_totals')},
+                             users=("id = ?", (user_id,)))
+    assert remaining == dict.fromkeys(remaining, 0)
+    assert db.count_transactions(other) == 5
+    assert_derived_tables_consistent()
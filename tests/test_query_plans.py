@@ -0,0 +1,27 @@
+"""No hot data-layer query may plan a full table or index scan."""
+import pytest
+
+from benchmarks import datagen
+from benchmarks.check_query_plans import HOT_CALLS, capture_statements, full_scans
+from setup import db
+
+
+@pytest.fixture
+def plan_database(tmp_path, uncached):
+    # A single pooled connection guarantees the hot calls reuse the traced one.
+    db.configure_database(str(tmp_path / 'plans.db'), pool_size=1)
+    datagen.generate(users=2, transactions=500, years=1)
+    yield
+    db.close_pool()
+    db.configure_database(pool_size=db.POOL_SIZE)
+
+
+@pytest.mark.parametrize('func, args', HOT_CALLS,
+                         ids=[f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}-{n}"
+                              for n, (func, _) in enumerate(HOT_CALLS)])
+def test_hot_query_uses_indexes(plan_database, func, args):
+    statements = capture_statements(func, args)
+    assert statements, "the call issued no SELECT to check"
+    with db.get_db_connection() as conn:
+        scans = {statement: full_scans(conn, statement) for statement in statements}
+    assert not any(scans.values()), {' '.join(s.split())[:200]: d for s, d in scans.items() if d}
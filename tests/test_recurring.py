@@ -0,0 +1,59 @@
+"""Materializing recurring rules creates each occurrence exactly once."""
+import threading
+
+from setup import db
+from tests.conftest import category_id
+
+
+def recurring_rows(user_id):
+    with db.get_db_connection() as conn:
+        return conn.execute("""
+            SELECT recurring_rule_id, occurrence_day, amount_minor FROM transactions
+            WHERE user_id = ? AND recurring_rule_id IS NOT NULL ORDER BY occurrence_day
+        """, (user_id,)).fetchall()
+
+
+def test_rerunning_creates_nothing(user_id):
+    rent = category_id(user_id, 'Rent')
+    db.add_recurring_rule(user_id, rent, 800.0, '2024-01-15', 'monthly', 'rent')
+    db.add_recurring_rule(user_id, rent, 20.0, '2024-01-01', 'weekly', 'parking', end_date='2024-01-31')
+
+    assert db.materialize_recurring_transactions(today='2024-03-20') == 3 + 5
+    assert db.materialize_recurring_transactions(today='2024-03-20') == 0
+    assert len(recurring_rows(user_id)) == 8
+    # Only the occurrences that have fallen due since are added.
+    assert db.materialize_recurring_transactions(today='2024-04-15') == 1
+    assert db.verify_monthly_totals() == []
+
+
+def test_deleted_occurrence_stays_deleted(user_id):
+    rule_id = db.add_recurring_rule(user_id, category_id(user_id, 'Bills'), 50.0, '2024-01-01')
+    db.materialize_recurring_transactions(today='2024-02-01')
+    with db.get_db_connection() as conn:
+        first = conn.execute("SELECT MIN(id) FROM transactions WHERE recurring_rule_id = ?", (rule_id,)).fetchone()[0]
+    db.delete_transaction(first)
+    assert db.materialize_recurring_transactions(today='2024-02-01') == 0
+    assert len(recurring_rows(user_id)) == 1
+
+
+def test_concurrent_runs_do_not_duplicate(user_id):
+    db.add_recurring_rule(user_id, category_id(user_id, 'Salary'), 3000.0, '2020-01-01')
+    created = []
+    threads = [threading.Thread(target=lambda: created.append(
+        db.materialize_recurring_transactions(today='2024-12-31', user_id=user_id))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rows = recurring_rows(user_id)
+    assert sum(created) == len(rows) == 60
+    assert len({(rule, day) for rule, day, _ in rows}) == len(rows)
+    assert db.verify_monthly_totals() == []
+
+
+def test_rules_of_deleted_categories_are_skipped(user_id):
+    freelance = category_id(user_id, 'Freelance')
+    db.add_recurring_rule(user_id, freelance, 100.0, '2024-01-01')
+    db.delete_category(freelance)
+    assert db.materialize_recurring_transactions(today='2024-06-01') == 0
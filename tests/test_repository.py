@@ -0,0 +1,174 @@
+"""One behaviour suite run against every Repository implementation.
+
+sqlite runs setup.db itself. sqlalchemy runs SQLAlchemyRepository on a
+SQLite file, and postgresql runs it on PostgreSQL: the server at
+BUDGET_TRACKER_TEST_POSTGRES_URL if set, otherwise a throwaway local server
+started with pgserver. Implementations whose packages are missing are
+skipped.
+"""
+import os
+import threading
+
+import pytest
+
+from setup import db
+from setup.repository import Repository, SQLAlchemyRepository, SQLiteRepository, get_repository
+
+
+@pytest.fixture(scope='session')
+def postgres_url(tmp_path_factory):
+    pytest.importorskip('sqlalchemy')
+    pytest.importorskip('psycopg')
+    url = os.environ.get('BUDGET_TRACKER_TEST_POSTGRES_URL')
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(tmp_path_factory.mktemp('postgres'), cleanup_mode='stop')
+    yield server.get_uri()
+    server.cleanup()
+
+
+@pytest.fixture(params=['sqlite', 'sqlalchemy', 'postgresql'])
+def repository(request, tmp_path):
+    if request.param == 'sqlite':
+        db.configure_database(str(tmp_path / 'repository.db'))
+        repository = SQLiteRepository()
+    elif request.param == 'sqlalchemy':
+        pytest.importorskip('sqlalchemy')
+        repository = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'repository.db'}", pool_size=2)
+    else:
+        repository = get_repository(request.getfixturevalue('postgres_url'), pool_size=2)
+        # Every test starts from an empty schema on the shared server.
+        repository.metadata.drop_all(repository.engine)
+    repository.initialize()
+    yield repository
+    repository.close()
+
+
+@pytest.fixture
+def user(repository):
+    user_id = repository.create_user('alice', 'secret')
+    repository.set_default_categories(user_id)
+    categories = {name: category_id for category_id, name, _ in repository.get_user_categories(user_id)}
+    return user_id, categories
+
+
+def test_users(repository):
+    user_id = repository.create_user('alice', 'secret')
+    assert repository.get_username_by_id(user_id) == 'alice'
+    assert repository.authenticate_user('alice', 'secret')['id'] == user_id
+    assert repository.authenticate_user('alice', 'wrong') is None
+    assert repository.authenticate_user('nobody', 'secret') is None
+
+    repository.delete_user(user_id)
+    assert repository.authenticate_user('alice', 'secret') is None
+    # The username can be registered again straight away.
+    repository.create_user('alice', 'other')
+    assert repository.authenticate_user('alice', 'other')
+
+
+def test_categories(repository, user):
+    user_id, categories = user
+    assert [name for _, name, _ in repository.get_user_categories(user_id)] == sorted(categories)
+    repository.add_category(user_id, 'Travel', 'expense')
+    repository.update_category(categories['Bills'], 'Utilities', 'expense')
+    repository.delete_category(categories['Savings'])
+    assert [(name, kind) for _, name, kind in repository.get_user_categories(user_id)] == [
+        ('Freelance', 'income'), ('Groceries', 'expense'), ('Rent', 'expense'),
+        ('Salary', 'income'), ('Travel', 'expense'), ('Utilities', 'expense')]
+    repository.add_category(user_id, 'Savings', 'savings')
+
+
+def test_transactions(repository, user):
+    user_id, categories = user
+    repository.add_transaction(user_id, categories['Groceries'], 12.34, '2024-01-31', 'shop')
+    repository.add_transaction(user_id, categories['Salary'], 2500.0, '2024-02-01', 'pay')
+    repository.add_transaction(user_id, categories['Rent'], 800.1, '2024-02-01', 'rent')
+    assert repository.count_transactions(user_id) == 3
+    assert repository.count_transactions(user_id, '2024-02-01', '2024-03-01') == 2
+
+    page, cursor = repository.fetch_transaction_page(user_id, page_size=2)
+    rent_id = page[0][0]
+    assert [row[1:] for row in page] == [('2024-02-01', 'Rent', 'expense', 800.1, 'rent'),
+                                         ('2024-02-01', 'Salary', 'income', 2500.0, 'pay')]
+    rest, last = repository.fetch_transaction_page(user_id, page_size=2, after=cursor)
+    assert [row[4] for row in rest] == [12.34] and last is None
+
+    assert repository.get_transaction_by_id(rent_id) == (categories['Rent'], 800.1, '2024-02-01', 'rent')
+    repository.update_transaction(rent_id, categories['Bills'], 75.5, '2024-01-15', 'power')
+    assert repository.get_transaction_by_id(rent_id) == (categories['Bills'], 75.5, '2024-01-15', 'power')
+    repository.delete_transaction(rent_id)
+    assert repository.get_transaction_by_id(rent_id) is None
+
+    repository.delete_category(categories['Groceries'])
+    assert repository.count_transactions(user_id) == 1
+
+
+def test_iter_transactions_streams_in_chunks(repository, user):
+    user_id, categories = user
+    for n in range(25):
+        repository.add_transaction(user_id, categories['Groceries'], 1.0 + n, f'2024-03-{n + 1:02d}', f'item {n}')
+    rows = repository.iter_transactions(user_id, '2024-03-05', '2024-03-25', chunk_size=4)
+    assert next(rows)[1:] == ('2024-03-24', 'Groceries', 'expense', 24.0, 'item 23')
+    assert len(list(rows)) == 19
+    assert list(repository.iter_transactions(user_id, '2025-01-01')) == []
+
+
+def test_budgets(repository, user):
+    user_id, categories = user
+    repository.set_budget(user_id, categories['Groceries'], 1, 2024, 300)
+    assert repository.set_budgets_bulk(user_id, 1, 2024, {categories['Groceries']: 300,
+                                                          categories['Rent']: 900}) == 1
+    assert repository.set_budgets_bulk(user_id, 1, 2024, {categories['Groceries']: 350}) == 1
+    budgets = sorted(row[2:] for row in repository.get_budgets_for_month(user_id, 1, 2024))
+    assert budgets == sorted([(350.0, categories['Groceries'], 'Groceries'), (900.0, categories['Rent'], 'Rent')])
+    assert repository.get_budgets_for_month(user_id, 2, 2024) == []
+
+    repository.add_transaction(user_id, categories['Groceries'], 20.25, '2024-01-03', None)
+    repository.add_transaction(user_id, categories['Groceries'], 4.75, '2024-01-31', None)
+    repository.add_transaction(user_id, categories['Groceries'], 100.0, '2024-02-01', None)
+    repository.add_transaction(user_id, categories['Salary'], 1000.0, '2024-01-05', None)
+    assert repository.get_total_spent_per_category(user_id, 1, 2024) == [
+        (categories['Groceries'], 'Groceries', 25.0)]
+
+    repository.delete_category(categories['Rent'])
+    assert [row[4] for row in repository.get_budgets_for_month(user_id, 1, 2024)] == ['Groceries']
+
+
+def test_concurrent_writes(repository, user):
+    user_id, categories = user
+
+    def session(n):
+        for k in range(20):
+            repository.add_transaction(user_id, categories['Groceries'], 1.0, f'2024-05-{k + 1:02d}', f"{n}-{k}")
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert repository.count_transactions(user_id) == 120
+
+
+def test_get_repository_picks_the_backend(tmp_path):
+    pytest.importorskip('sqlalchemy')
+    pytest.importorskip('psycopg')
+    repository = get_repository('postgresql://budget@db.internal/budget')
+    assert isinstance(repository, SQLAlchemyRepository)
+    assert repository.engine.url.drivername == 'postgresql+psycopg'
+    repository.close()
+
+
+def test_get_repository_leaves_setup_db_alone(database, tmp_path):
+    configured = db.DATABASE_URL
+    assert isinstance(get_repository(), SQLiteRepository)
+    assert isinstance(get_repository(configured), SQLiteRepository)
+    with pytest.raises(ValueError):
+        get_repository(str(tmp_path / 'other.db'))
+    assert db.DATABASE_URL == configured
+
+
+def test_repository_is_abstract():
+    with pytest.raises(TypeError):
+        Repository()
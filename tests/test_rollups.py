@@ -0,0 +1,31 @@
+"""Triggers keep monthly_category_totals equal to the raw transactions through every kind of edit."""
+import pytest
+
+from setup import db
+from tests.conftest import add_history, assert_derived_tables_consistent, category_id
+
+
+@pytest.mark.parametrize('edit', ['update', 'delete', 'bulk'])
+def test_edits_keep_rollup_consistent(user_id, edit):
+    groceries, bills = category_id(user_id, 'Groceries'), category_id(user_id, 'Bills')
+    add_history(user_id, groceries, 45)
+    ids = [row[0] for row in db.search_transactions(user_id, 'groceries', page_size=100)[0]]
+    if edit == 'update':
+        db.update_transaction(ids[0], bills, 99.99, '2023-12-31', 'moved to bills')
+    elif edit == 'delete':
+        db.delete_transaction(ids[0])
+    else:
+        db.update_transactions_bulk(user_id, [(ids[1], groceries, 12.5, '2024-03-01', 'refund'),
+                                              (ids[2], bills, 3.0, '2024-01-02', 'bill')], [ids[3]])
+    assert_derived_tables_consistent()
+
+
+def test_rebuild_matches_incremental_totals(user_id):
+    add_history(user_id, category_id(user_id, 'Groceries'), 60)
+    with db.get_db_connection() as conn:
+        before = conn.execute("SELECT * FROM monthly_category_totals ORDER BY 1, 2, 3, 4").fetchall()
+    db.rebuild_monthly_totals()
+    with db.get_db_connection() as conn:
+        after = conn.execute("SELECT * FROM monthly_category_totals ORDER BY 1, 2, 3, 4").fetchall()
+    assert [tuple(row) for row in after] == [tuple(row) for row in before]
+    assert_derived_tables_consistent()
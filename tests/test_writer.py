@@ -0,0 +1,136 @@
+"""WriteQueue failure handling: one bad write, connection or caller never takes the others down."""
+import sqlite3
+import threading
+
+import pytest
+
+from setup import db
+from setup.writer import WriteQueue, is_busy_error
+
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / 'writer.db')
+    setup = sqlite3.connect(path)
+    setup.execute("CREATE TABLE items (value INTEGER UNIQUE)")
+    setup.close()
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+
+@pytest.fixture
+def writer(connect):
+    writer = WriteQueue(connect, batch_size=16)
+    yield writer
+    writer.stop(timeout=5)
+
+
+def insert(value):
+    return lambda conn: conn.execute("INSERT INTO items (value) VALUES (?)", (value,)).lastrowid
+
+
+def stored(connect):
+    conn = connect()
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT value FROM items"))
+    finally:
+        conn.close()
+
+
+def test_failing_write_does_not_affect_its_group(writer, connect):
+    release = threading.Event()
+    blocker = writer.submit(lambda conn: release.wait(5))
+    # Queued behind the blocker, so these share one group commit.
+    futures = [writer.submit(insert(value)) for value in (1, 2, 1, 3)]
+    release.set()
+
+    assert blocker.result(5)
+    assert [future.exception(5) is None for future in futures] == [True, True, False, True]
+    assert isinstance(futures[2].exception(), sqlite3.IntegrityError)
+    assert stored(connect) == [1, 2, 3]
+    stats = writer.stats()
+    assert (stats['writes'], stats['failed']) == (5, 1)
+    assert stats['commits'] < 5
+
+
+def test_result_arrives_after_commit(writer, connect):
+    writer.run(insert(7))
+    assert stored(connect) == [7]
+
+
+def test_connect_failure_fails_queued_writes_and_recovers(connect):
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return connect()
+
+    writer = WriteQueue(flaky_connect)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="unable to open"):
+            writer.run(insert(1), timeout=5)
+        # The next write starts a fresh writer thread.
+        assert writer.run(insert(2), timeout=5)
+        assert stored(connect) == [2]
+    finally:
+        writer.stop(timeout=5)
+
+
+def test_write_cannot_submit_another(writer):
+    with pytest.raises(RuntimeError, match="cannot submit"):
+        writer.run(lambda conn: writer.submit(insert(1)), timeout=5)
+
+
+def test_timeout_cancels_a_write_that_has_not_started(writer, connect):
+    started, release = threading.Event(), threading.Event()
+    blocker = writer.submit(lambda conn: started.set() or release.wait(5))
+    # Once the blocker runs its group is taken, so the next write has to wait.
+    started.wait(5)
+    with pytest.raises(TimeoutError, match="cancelled"):
+        writer.run(insert(1), timeout=0.05)
+    release.set()
+    blocker.result(5)
+    writer.run(insert(2), timeout=5)
+    assert stored(connect) == [2]
+
+
+def test_locked_database_is_retried(writer, connect):
+    holder = connect()
+    holder.execute("BEGIN IMMEDIATE")
+    future = writer.submit(insert(1))
+    threading.Timer(0.1, holder.commit).start()
+    future.result(5)
+    holder.close()
+    assert stored(connect) == [1]
+    assert writer.stats()['busy_retries'] > 0
+
+
+def test_lock_timeout_fails_the_group(connect):
+    writer = WriteQueue(connect, lock_timeout=0.05)
+    holder = connect()
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            writer.run(insert(1), timeout=5)
+    finally:
+        holder.rollback()
+        holder.close()
+        writer.stop(timeout=5)
+
+
+def test_bad_database_path_raises_instead_of_hanging(tmp_path):
+    db.configure_database(str(tmp_path / 'missing' / 'budget_tracker.db'))
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            db.run_write(lambda conn: None)
+    finally:
+        db.close_pool()
+
+
+def test_busy_errors_are_recognized_without_error_codes():
+    # Python 3.10 raises OperationalError without sqlite_errorname.
+    assert is_busy_error(sqlite3.OperationalError("database is locked"))
+    assert is_busy_error(sqlite3.OperationalError("database table is locked"))
+    assert not is_busy_error(sqlite3.OperationalError("no such table: items"))
+    assert not is_busy_error(ValueError("database is locked"))